@@ -1,5 +1,7 @@
 """AI module for QuikSafe Bot."""
 
 from .gemini_client import GeminiClient
+from .llm_cache import LLMCache, MemoryBackend, FileBackend
+from .semantic_cache import SemanticCache
 
-__all__ = ['GeminiClient']
+__all__ = ['GeminiClient', 'LLMCache', 'MemoryBackend', 'FileBackend', 'SemanticCache']
@@ -3,33 +3,346 @@ QuikSafe Bot - Gemini AI Client
 Integrates with Google Gemini API (free tier) for smart search and summarization.
 """
 
-import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from jinja2 import Environment, FileSystemLoader
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from src.ai.llm_cache import LLMCache, MemoryBackend
+from src.ai.semantic_cache import get_semantic_cache
+from src.utils.search_blob import get_search_blob
+from functools import lru_cache
+from operator import itemgetter
+import asyncio
+import hashlib
 import logging
 import json
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Items per batched tag-suggestion prompt
+TAG_BATCH_SIZE = 10
+
+# Queries with at most this many words skip the LLM when they match literally
+TRIVIAL_QUERY_MAX_WORDS = 2
+
+# Maximum concurrent async Gemini requests per client
+MAX_CONCURRENT_REQUESTS = 8
+
+# Static per-task instructions. These are sent as the model's system
+# instruction so each request only carries the dynamic part of the prompt.
+SEARCH_INSTRUCTION = """You rank a user's saved items against a search query.
+Each item is on its own line, prefixed with its number.
+Return the numbers of the most relevant items as a JSON array of strings, ranked by relevance.
+If no items match, return an empty array.
+
+Example response: ["1", "3", "5"] or []"""
+
+SUMMARY_INSTRUCTION = """Summarize the user's tasks in a concise, helpful way.
+
+Provide:
+1. Total number of tasks
+2. Breakdown by status
+3. Priority items that need attention
+4. Brief overview
+
+Keep it under 200 words."""
+
+TAGS_INSTRUCTION = """Suggest 3-5 relevant tags for the given item.
+Return the tags as a JSON array of lowercase strings, no hashtags.
+Example: ["work", "important", "finance"]"""
+
+TAGS_BATCH_INSTRUCTION = """Suggest 3-5 relevant tags for each of the given numbered items.
+Return a JSON array with one list of lowercase tags per item, in item order, no hashtags.
+Example: [["work", "email"], ["finance", "important"]]"""
+
+# Per-call prompt templates, compiled once at import
+_PROMPT_ENV = Environment(
+    loader=FileSystemLoader(Path(__file__).parent / 'prompts'),
+    cache_size=-1,
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True
+)
+SEARCH_TMPL = _PROMPT_ENV.get_template('search.jinja')
+SEARCH_ALL_TMPL = _PROMPT_ENV.get_template('search_all.jinja')
+SUMMARY_TMPL = _PROMPT_ENV.get_template('summary.jinja')
+TAGS_TMPL = _PROMPT_ENV.get_template('tags.jinja')
+TAGS_BATCH_TMPL = _PROMPT_ENV.get_template('tags_batch.jinja')
+
+# Structured-output schemas for JSON mode
+STRING_LIST_SCHEMA = {'type': 'array', 'items': {'type': 'string'}}
+NESTED_STRING_LIST_SCHEMA = {'type': 'array', 'items': STRING_LIST_SCHEMA}
+
+# Task name -> (system instruction, uses heavy model, response schema or None for text)
+TASKS: Dict[str, Tuple[str, bool, Optional[Dict[str, Any]]]] = {
+    'search': (SEARCH_INSTRUCTION, False, STRING_LIST_SCHEMA),
+    'summary': (SUMMARY_INSTRUCTION, True, None),
+    'tags': (TAGS_INSTRUCTION, False, STRING_LIST_SCHEMA),
+    'tags_batch': (TAGS_BATCH_INSTRUCTION, False, NESTED_STRING_LIST_SCHEMA),
+}
+
+# Process-wide model objects, shared by every GeminiClient instance
+_MODELS: Dict[Tuple[str, Optional[str], Optional[str]], Any] = {}
+_MODEL_LOCK = threading.Lock()
+_configured_key: Optional[str] = None
+
+# google.generativeai is imported on first use to keep it off the startup path
+_genai = None
+_GENAI_LOCK = threading.Lock()
+
+
+def _load_genai():
+    """Import the Gemini SDK once, on first use."""
+    global _genai
+    if _genai is None:
+        with _GENAI_LOCK:
+            if _genai is None:
+                import google.generativeai as genai
+                _genai = genai
+    return _genai
+
+
+def _configure(api_key: str):
+    """Configure the Gemini SDK, skipping the call if the key is unchanged."""
+    global _configured_key
+    with _MODEL_LOCK:
+        if api_key != _configured_key:
+            _load_genai().configure(api_key=api_key)
+            _configured_key = api_key
+            _MODELS.clear()
+
+
+def _get_model(name: str, system_instruction: Optional[str] = None,
+               response_schema: Optional[Dict[str, Any]] = None) -> Any:
+    """
+    Get the shared model object for a model name, creating it on first use.
+    
+    Args:
+        name: Gemini model name
+        system_instruction: Optional static instruction bound to the model
+        response_schema: Optional JSON schema; enables JSON output mode
+        
+    Returns:
+        Shared GenerativeModel instance
+    """
+    schema_key = json.dumps(response_schema, sort_keys=True) if response_schema else None
+    key = (name, system_instruction, schema_key)
+    model = _MODELS.get(key)
+    if model is None:
+        with _MODEL_LOCK:
+            model = _MODELS.get(key)
+            if model is None:
+                generation_config = None
+                if response_schema:
+                    generation_config = {
+                        'response_mime_type': 'application/json',
+                        'response_schema': response_schema
+                    }
+                model = _MODELS[key] = _load_genai().GenerativeModel(
+                    name,
+                    system_instruction=system_instruction,
+                    generation_config=generation_config
+                )
+    return model
+
+
+# ==================== Search Row Formatting ====================
+
+_get_password_fields = itemgetter('service_name', 'tags')
+_get_task_fields = itemgetter('encrypted_content', 'priority')
+_get_file_fields = itemgetter('file_name', 'file_type')
+
+
+def _password_row(item: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract the hashable search row for a password."""
+    name, tags = _get_password_fields(item)
+    return name, ', '.join(tags or ())
+
+
+def _task_row(item: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract the hashable search row for a (decrypted) task."""
+    return _get_task_fields(item)
+
+
+def _file_row(item: Dict[str, Any]) -> Tuple[str, str]:
+    """Extract the hashable search row for a file."""
+    return _get_file_fields(item)
+
+
+_SEARCH_ROW_EXTRACTORS = {
+    'passwords': _password_row,
+    'tasks': _task_row,
+    'files': _file_row,
+}
+
+_SEARCH_LINE_FORMATS = {
+    'passwords': "{0}. Service: {1}, Tags: {2}",
+    'tasks': "{0}. Task: {1}, Priority: {2}",
+    'files': "{0}. File: {1}, Type: {2}",
+}
+
+
+@lru_cache(maxsize=64)
+def _render_search_rows(item_type: str, rows: Tuple[Tuple[str, str], ...], start: int = 1) -> str:
+    """Render numbered search lines; memoized for repeated searches over the same items."""
+    line = _SEARCH_LINE_FORMATS[item_type].format
+    return "\n".join(line(i, *row) for i, row in enumerate(rows, start))
+
 
 class GeminiClient:
     """Handles AI operations using Google Gemini API (free tier)."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, model_name: str = 'gemini-1.5-flash',
+                 heavy_model_name: str = 'gemini-1.5-pro'):
         """
         Initialize Gemini client.
         
         Args:
             api_key: Google Gemini API key
+            model_name: Fast model used for short prompts (search, tags)
+            heavy_model_name: Stronger model used for long-form tasks (summaries)
         """
         try:
-            genai.configure(api_key=api_key)
-            # Use gemini-pro model (free tier)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.api_key = api_key
+            self.model_name = model_name
+            self.heavy_model_name = heavy_model_name
+            # SDK import and model construction are deferred to the first request
+            self.model = None
+            self.heavy_model = None
+            self._task_models: Optional[Dict[str, Tuple[str, Any]]] = None
+            self._init_lock = threading.Lock()
+            self.cache = LLMCache(MemoryBackend(max=1024), ttl_seconds=3600)
+            self.semantic_cache = get_semantic_cache()
+            self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
             logger.info("Gemini AI client initialized (free tier)")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini client: {e}")
             raise
     
+    def _cache_lookup(self, model_name: str, prompt: str, semantic: Optional[Tuple[str, str]]):
+        """
+        Look up a prompt in the exact and semantic caches.
+        
+        Args:
+            model_name: Name of the model that would answer the prompt
+            prompt: Full prompt text
+            semantic: Optional (namespace, text) pair; near-duplicate texts in
+                the same namespace reuse a previous answer
+            
+        Returns:
+            Tuple of (cache key, query embedding or None, cached text or None)
+        """
+        key = LLMCache.make_key(model_name, prompt)
+        if (cached := self.cache.get(key)) is not None:
+            return key, None, cached
+        
+        vector = None
+        if semantic:
+            namespace, text = semantic
+            vector = self.semantic_cache.embed(text)
+            if vector is not None and (similar := self.semantic_cache.get(namespace, vector)) is not None:
+                self.cache.set(key, similar)
+                return key, vector, similar
+        
+        return key, vector, None
+    
+    def _cache_store(self, key: str, semantic: Optional[Tuple[str, str]], vector, text: str):
+        """Store a fresh response in the exact and semantic caches."""
+        self.cache.set(key, text)
+        if vector is not None:
+            self.semantic_cache.set(semantic[0], vector, text)
+    
+    def _build_task_model(self, instruction: str, heavy: bool, schema: Optional[Dict[str, Any]]):
+        """Return (cache name, model) for a task with its instruction and output schema bound."""
+        name = self.heavy_model_name if heavy else self.model_name
+        fingerprint = json.dumps([instruction, schema], sort_keys=True)
+        cache_name = f"{name}:{hashlib.sha256(fingerprint.encode('utf-8')).hexdigest()[:16]}"
+        return cache_name, _get_model(name, instruction, schema)
+    
+    def _ensure_models(self):
+        """Configure the SDK and build the model objects once, on first use."""
+        if self._task_models is not None:
+            return
+        with self._init_lock:
+            if self._task_models is not None:
+                return
+            _configure(self.api_key)
+            self.model = _get_model(self.model_name)
+            self.heavy_model = _get_model(self.heavy_model_name)
+            self._task_models = {
+                task: self._build_task_model(instruction, heavy, schema)
+                for task, (instruction, heavy, schema) in TASKS.items()
+            }
+    
+    def _select_model(self, task: Optional[str]):
+        """Return (cache name, model) for a task, or the plain fast model."""
+        self._ensure_models()
+        if task is None:
+            return self.model_name, self.model
+        return self._task_models[task]
+    
+    def _generate(self, prompt: str, semantic: Optional[Tuple[str, str]] = None,
+                  task: Optional[str] = None) -> str:
+        """
+        Generate a response, serving cached answers when possible.
+        
+        Args:
+            prompt: Prompt text (only the dynamic part when a task is given)
+            semantic: Optional (namespace, text) pair for the semantic cache
+            task: Optional key of TASKS selecting the model and system instruction
+            
+        Returns:
+            Stripped response text
+        """
+        model_name, model = self._select_model(task)
+        key, vector, cached = self._cache_lookup(model_name, prompt, semantic)
+        if cached is not None:
+            return cached
+        
+        response = model.generate_content(prompt)
+        text = response.text.strip()
+        self._cache_store(key, semantic, vector, text)
+        return text
+    
+    async def agenerate(self, prompt: str, semantic: Optional[Tuple[str, str]] = None,
+                        task: Optional[str] = None) -> str:
+        """
+        Async version of _generate, bounded by the client's concurrency limit.
+        
+        Args:
+            prompt: Prompt text (only the dynamic part when a task is given)
+            semantic: Optional (namespace, text) pair for the semantic cache
+            task: Optional key of TASKS selecting the model and system instruction
+            
+        Returns:
+            Stripped response text
+        """
+        model_name, model = self._select_model(task)
+        if semantic:
+            # Embedding is a blocking network call
+            key, vector, cached = await asyncio.to_thread(self._cache_lookup, model_name, prompt, semantic)
+        else:
+            key, vector, cached = self._cache_lookup(model_name, prompt, semantic)
+        if cached is not None:
+            return cached
+        
+        async with self._semaphore:
+            response = await model.generate_content_async(prompt)
+        text = response.text.strip()
+        self._cache_store(key, semantic, vector, text)
+        return text
+    
+    def get_debug_info(self) -> Dict[str, Any]:
+        """Get AI client info for debugging."""
+        return {
+            'model': self.model_name,
+            'heavy_model': self.heavy_model_name,
+            'cache': self.cache.get_debug_info(),
+            'semantic_cache': self.semantic_cache.get_debug_info()
+        }
+    
+    # ==================== Sync API ====================
+    
     def search_content(self, query: str, items: List[Dict[str, Any]], item_type: str) -> List[Dict[str, Any]]:
         """
         Smart search across items using natural language.
@@ -45,55 +358,52 @@ class GeminiClient:
         if not items:
             return []
         
+        if (matches := self._trivial_search(query, items, item_type)) is not None:
+            return matches
+        
         try:
-            # Create a searchable text representation of items
-            # We need to map the 1-based index used in the prompt to the actual item ID
-            items_text, index_map = self._format_items_for_search(items, item_type)
+            prompt, semantic, index_map = self._build_search_prompt(query, items, item_type)
+            result_text = self._generate(prompt, semantic=semantic, task='search')
+            return self._parse_search_result(result_text, items, index_map)
             
-            prompt = f"""Given this search query: "{query}"
-            
-And these {item_type}:
-{items_text}
-
-Return the IDs (the numbers at the start of each line) of the most relevant items, ranked by relevance.
-Only return the numbers, separated by commas.
-If no items match, return "NONE".
-
-Example response: "1,3,5" or "NONE"
-"""
-            
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
-            
-            if result_text == "NONE":
-                return []
-            
-            # Parse the response and filter items
-            relevant_indices = [idx.strip() for idx in result_text.split(',')]
-            results = []
-            
-            for idx in relevant_indices:
-                if idx in index_map:
-                    # Find the item with this ID
-                    item_id = index_map[idx]
-                    for item in items:
-                        if item.get('id') == item_id:
-                            results.append(item)
-                            break
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            # Fallback to simple text matching
+            return self._simple_search(query, items, item_type)
+    
+    def search_all(self, query: str, groups: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Search several item types with at most one LLM call.
+        
+        Args:
+            query: Natural language search query
+            groups: Mapping of item type (passwords, tasks, files) to items
             
+        Returns:
+            Mapping of item type to relevant items ranked by relevance
+        """
+        results, pending = self._split_trivial_searches(query, groups)
+        if not pending:
             return results
+        
+        try:
+            prompt, semantic, index_map = self._build_search_all_prompt(query, pending)
+            result_text = self._generate(prompt, semantic=semantic, task='search')
+            results.update(self._parse_search_all_result(result_text, pending, index_map))
             
         except Exception as e:
             logger.error(f"Search failed: {e}")
-            # Fallback to simple text matching
-            return self._simple_search(query, items, item_type)
+            for item_type, items in pending.items():
+                results[item_type] = self._simple_search(query, items, item_type)
+        
+        return results
     
     def summarize_tasks(self, tasks: List[Dict[str, Any]]) -> str:
         """
         Generate a summary of tasks.
         
         Args:
-            tasks: List of task dictionaries
+            tasks: List of task dicts with plaintext 'content', 'priority' and 'status'
             
         Returns:
             AI-generated summary
@@ -102,25 +412,7 @@ Example response: "1,3,5" or "NONE"
             return "You have no tasks."
         
         try:
-            tasks_text = "\n".join([
-                f"- {task.get('encrypted_content', 'N/A')} (Priority: {task.get('priority', 'medium')}, Status: {task.get('status', 'pending')})"
-                for task in tasks
-            ])
-            
-            prompt = f"""Summarize these tasks in a concise, helpful way:
-
-{tasks_text}
-
-Provide:
-1. Total number of tasks
-2. Breakdown by status
-3. Priority items that need attention
-4. Brief overview
-
-Keep it under 200 words."""
-            
-            response = self.model.generate_content(prompt)
-            return response.text.strip()
+            return self._generate(self._build_summary_prompt(tasks), task='summary')
             
         except Exception as e:
             logger.error(f"Summarization failed: {e}")
@@ -138,59 +430,245 @@ Keep it under 200 words."""
             List of suggested tags
         """
         try:
-            prompt = f"""Suggest 3-5 relevant tags for this {content_type}:
-
-"{content}"
-
-Return only the tags, comma-separated, lowercase, no hashtags.
-Example: work, important, finance"""
+            prompt = self._build_tags_prompt(content, content_type)
+            tags_text = self._generate(prompt, semantic=(f"tags:{content_type}", content), task='tags')
+            return self._parse_tags(tags_text)
             
-            response = self.model.generate_content(prompt)
-            tags_text = response.text.strip()
+        except Exception as e:
+            logger.error(f"Tag suggestion failed: {e}")
+            return []
+    
+    def suggest_tags_batch(self, items: List[Tuple[str, str]]) -> List[List[str]]:
+        """
+        Suggest tags for many items, TAG_BATCH_SIZE items per API call.
+        
+        Args:
+            items: List of (content, content_type) tuples
             
-            # Parse and clean tags
-            tags = [tag.strip().lower() for tag in tags_text.split(',')]
-            return tags[:5]  # Limit to 5 tags
+        Returns:
+            List of tag lists, aligned with items
+        """
+        results: List[List[str]] = []
+        for start in range(0, len(items), TAG_BATCH_SIZE):
+            results.extend(self._suggest_tags_chunk(items[start:start + TAG_BATCH_SIZE]))
+        return results
+    
+    def _suggest_tags_chunk(self, chunk: List[Tuple[str, str]]) -> List[List[str]]:
+        """Suggest tags for up to TAG_BATCH_SIZE items in a single prompt."""
+        try:
+            prompt = TAGS_BATCH_TMPL.render(items=chunk)
+            parsed = json.loads(self._generate(prompt, task='tags_batch'))
+            if len(parsed) != len(chunk):
+                raise ValueError(f"Expected {len(chunk)} tag lists, got {len(parsed)}")
+            return [[tag.lower() for tag in tags][:5] for tags in parsed]
             
         except Exception as e:
-            logger.error(f"Tag suggestion failed: {e}")
+            logger.warning(f"Batched tag suggestion failed, falling back to per-item: {e}")
+            return [self.suggest_tags(content, content_type) for content, content_type in chunk]
+    
+    # ==================== Async API ====================
+    
+    async def asearch_content(self, query: str, items: List[Dict[str, Any]], item_type: str) -> List[Dict[str, Any]]:
+        """Async version of search_content."""
+        if not items:
             return []
+        
+        if (matches := self._trivial_search(query, items, item_type)) is not None:
+            return matches
+        
+        try:
+            prompt, semantic, index_map = self._build_search_prompt(query, items, item_type)
+            result_text = await self.agenerate(prompt, semantic=semantic, task='search')
+            return self._parse_search_result(result_text, items, index_map)
+            
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            return self._simple_search(query, items, item_type)
     
-    def _format_items_for_search(self, items: List[Dict[str, Any]], item_type: str) -> tuple[str, Dict[str, str]]:
-        """Format items for search prompt and return index mapping."""
-        formatted = []
-        index_map = {}
+    async def asearch_all(self, query: str, groups: Dict[str, List[Dict[str, Any]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Async version of search_all."""
+        results, pending = self._split_trivial_searches(query, groups)
+        if not pending:
+            return results
         
-        for i, item in enumerate(items, 1):
-            index_str = str(i)
-            index_map[index_str] = item.get('id')
+        try:
+            prompt, semantic, index_map = self._build_search_all_prompt(query, pending)
+            result_text = await self.agenerate(prompt, semantic=semantic, task='search')
+            results.update(self._parse_search_all_result(result_text, pending, index_map))
             
-            if item_type == "passwords":
-                formatted.append(f"{i}. Service: {item.get('service_name', 'N/A')}, Tags: {', '.join(item.get('tags', []))}")
-            elif item_type == "tasks":
-                formatted.append(f"{i}. Task: {item.get('encrypted_content', 'N/A')}, Priority: {item.get('priority', 'medium')}")
-            elif item_type == "files":
-                formatted.append(f"{i}. File: {item.get('file_name', 'N/A')}, Type: {item.get('file_type', 'N/A')}")
+        except Exception as e:
+            logger.error(f"Search failed: {e}")
+            for item_type, items in pending.items():
+                results[item_type] = self._simple_search(query, items, item_type)
         
-        return "\n".join(formatted), index_map
+        return results
     
-    def _simple_search(self, query: str, items: List[Dict[str, Any]], item_type: str) -> List[Dict[str, Any]]:
-        """Fallback simple text search."""
-        query_lower = query.lower()
-        results = []
+    async def asummarize_tasks(self, tasks: List[Dict[str, Any]]) -> str:
+        """Async version of summarize_tasks."""
+        if not tasks:
+            return "You have no tasks."
         
-        for item in items:
-            # Search in different fields based on item type
-            searchable_text = ""
+        try:
+            return await self.agenerate(self._build_summary_prompt(tasks), task='summary')
             
-            if item_type == "passwords":
-                searchable_text = f"{item.get('service_name', '')} {' '.join(item.get('tags', []))}"
-            elif item_type == "tasks":
-                searchable_text = f"{item.get('encrypted_content', '')} {' '.join(item.get('tags', []))}"
-            elif item_type == "files":
-                searchable_text = f"{item.get('file_name', '')} {item.get('file_type', '')}"
+        except Exception as e:
+            logger.error(f"Summarization failed: {e}")
+            return f"You have {len(tasks)} tasks. Unable to generate detailed summary."
+    
+    async def asuggest_tags(self, content: str, content_type: str) -> List[str]:
+        """Async version of suggest_tags."""
+        try:
+            prompt = self._build_tags_prompt(content, content_type)
+            tags_text = await self.agenerate(prompt, semantic=(f"tags:{content_type}", content), task='tags')
+            return self._parse_tags(tags_text)
             
-            if query_lower in searchable_text.lower():
-                results.append(item)
+        except Exception as e:
+            logger.error(f"Tag suggestion failed: {e}")
+            return []
+    
+    async def asuggest_tags_batch(self, items: List[Tuple[str, str]]) -> List[List[str]]:
+        """Async version of suggest_tags_batch; chunks are requested concurrently."""
+        chunks = [items[start:start + TAG_BATCH_SIZE] for start in range(0, len(items), TAG_BATCH_SIZE)]
+        chunk_results = await asyncio.gather(*(self._asuggest_tags_chunk(chunk) for chunk in chunks))
+        return [tags for chunk_tags in chunk_results for tags in chunk_tags]
+    
+    async def _asuggest_tags_chunk(self, chunk: List[Tuple[str, str]]) -> List[List[str]]:
+        """Async version of _suggest_tags_chunk; the per-item fallback runs concurrently."""
+        try:
+            prompt = TAGS_BATCH_TMPL.render(items=chunk)
+            parsed = json.loads(await self.agenerate(prompt, task='tags_batch'))
+            if len(parsed) != len(chunk):
+                raise ValueError(f"Expected {len(chunk)} tag lists, got {len(parsed)}")
+            return [[tag.lower() for tag in tags][:5] for tags in parsed]
+            
+        except Exception as e:
+            logger.warning(f"Batched tag suggestion failed, falling back to per-item: {e}")
+            results = await asyncio.gather(
+                *(self.asuggest_tags(content, content_type) for content, content_type in chunk),
+                return_exceptions=True
+            )
+            return [tags if isinstance(tags, list) else [] for tags in results]
+    
+    # ==================== Prompt Helpers ====================
+    
+    def _build_search_prompt(self, query: str, items: List[Dict[str, Any]], item_type: str):
+        """Build search prompt, semantic cache scope and prompt index mapping."""
+        # We need to map the 1-based index used in the prompt to the actual item ID
+        items_text, index_map = self._format_items_for_search(items, item_type)
+        
+        prompt = SEARCH_TMPL.render(query=query, item_type=item_type, items=items_text)
+        
+        # Rephrased queries over the exact same items reuse the ranking
+        context_hash = hashlib.sha256(items_text.encode('utf-8')).hexdigest()
+        return prompt, (f"search:{item_type}:{context_hash}", query), index_map
+    
+    def _split_trivial_searches(self, query: str, groups: Dict[str, List[Dict[str, Any]]]):
+        """Answer what substring matching can; return (results, groups still needing the LLM)."""
+        results: Dict[str, List[Dict[str, Any]]] = {item_type: [] for item_type in groups}
+        pending: Dict[str, List[Dict[str, Any]]] = {}
+        for item_type, items in groups.items():
+            if not items:
+                continue
+            if (matches := self._trivial_search(query, items, item_type)) is not None:
+                results[item_type] = matches
+            else:
+                pending[item_type] = items
+        return results, pending
+    
+    def _build_search_all_prompt(self, query: str, groups: Dict[str, List[Dict[str, Any]]]):
+        """Build one search prompt over several item types, numbered consecutively across sections."""
+        sections = []
+        index_map: Dict[str, Tuple[str, str]] = {}
+        start = 1
+        for item_type, items in groups.items():
+            extract = _SEARCH_ROW_EXTRACTORS[item_type]
+            sections.append((item_type, _render_search_rows(item_type, tuple(map(extract, items)), start)))
+            for i, item in enumerate(items, start):
+                index_map[str(i)] = (item_type, item.get('id'))
+            start += len(items)
+        
+        prompt = SEARCH_ALL_TMPL.render(query=query, sections=sections)
+        
+        # Rephrased queries over the exact same items reuse the ranking
+        context = "\n".join(f"{item_type}\n{text}" for item_type, text in sections)
+        context_hash = hashlib.sha256(context.encode('utf-8')).hexdigest()
+        return prompt, (f"search_all:{context_hash}", query), index_map
+    
+    def _parse_search_all_result(self, result_text: str, groups: Dict[str, List[Dict[str, Any]]],
+                                 index_map: Dict[str, Tuple[str, str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Map the ranked JSON array of indices back to items, split by item type."""
+        by_id = {
+            item_type: {item.get('id'): item for item in items}
+            for item_type, items in groups.items()
+        }
+        results: Dict[str, List[Dict[str, Any]]] = {item_type: [] for item_type in groups}
+        
+        for idx in json.loads(result_text):
+            if idx in index_map:
+                item_type, item_id = index_map[idx]
+                if (item := by_id[item_type].get(item_id)) is not None:
+                    results[item_type].append(item)
         
         return results
+    
+    def _parse_search_result(self, result_text: str, items: List[Dict[str, Any]],
+                             index_map: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Map the JSON array of indices returned by the model back to items."""
+        relevant_indices = json.loads(result_text)
+        results = []
+        
+        for idx in relevant_indices:
+            if idx in index_map:
+                # Find the item with this ID
+                item_id = index_map[idx]
+                for item in items:
+                    if item.get('id') == item_id:
+                        results.append(item)
+                        break
+        
+        return results
+    
+    def _build_summary_prompt(self, tasks: List[Dict[str, Any]]) -> str:
+        """Build task summary prompt."""
+        return SUMMARY_TMPL.render(tasks=tasks)
+    
+    def _build_tags_prompt(self, content: str, content_type: str) -> str:
+        """Build single-item tag suggestion prompt."""
+        return TAGS_TMPL.render(content=content, content_type=content_type)
+    
+    def _parse_tags(self, tags_text: str) -> List[str]:
+        """Parse a JSON array tag response."""
+        tags = [tag.lower() for tag in json.loads(tags_text)]
+        return tags[:5]  # Limit to 5 tags
+    
+    def _format_items_for_search(self, items: List[Dict[str, Any]], item_type: str) -> tuple[str, Dict[str, str]]:
+        """Format items for search prompt and return index mapping."""
+        index_map = {str(i): item.get('id') for i, item in enumerate(items, 1)}
+        
+        extract = _SEARCH_ROW_EXTRACTORS.get(item_type)
+        if extract is None:
+            return "", index_map
+        
+        return _render_search_rows(item_type, tuple(map(extract, items))), index_map
+    
+    def _trivial_search(self, query: str, items: List[Dict[str, Any]], item_type: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Answer short keyword queries by substring match, without calling the LLM.
+        
+        Args:
+            query: Search query
+            items: Items to search
+            item_type: Type of items
+            
+        Returns:
+            Matching items, or None if the query needs the LLM
+        """
+        if len(query.split()) > TRIVIAL_QUERY_MAX_WORDS:
+            return None
+        matches = self._simple_search(query, items, item_type)
+        return matches or None
+    
+    def _simple_search(self, query: str, items: List[Dict[str, Any]], item_type: str) -> List[Dict[str, Any]]:
+        """Fallback simple text search."""
+        query_lower = query.lower()
+        return [item for item in items if query_lower in get_search_blob(item, item_type)]
@@ -0,0 +1,183 @@
+"""
+QuikSafe Bot - LLM Response Cache
+Caches Gemini responses keyed by a hash of the model and prompt.
+"""
+
+from typing import Any, Dict, Optional, Protocol, Tuple
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    """Storage interface used by LLMCache."""
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """Return (expires_at, value) for key, or None if missing."""
+        ...
+
+    def set(self, key: str, expires_at: float, value: str):
+        """Store value for key until expires_at."""
+        ...
+
+    def delete(self, key: str):
+        """Remove key if present."""
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU backend built on an OrderedDict."""
+
+    def __init__(self, max: int = 1024):
+        """
+        Initialize memory backend.
+
+        Args:
+            max: Maximum number of entries before the least recently used is evicted
+        """
+        self.max = max
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[float, str]]:
+        """Return entry and mark it as most recently used."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, expires_at: float, value: str):
+        """Store entry, evicting the least recently used one when full."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        """Remove entry if present."""
+        self._entries.pop(key, None)
+
+
+class FileBackend(MemoryBackend):
+    """LRU backend that persists entries to a JSON file."""
+
+    def __init__(self, path: str = 'data/llm_cache.json', max: int = 1024):
+        """
+        Initialize file backend and load any existing entries.
+
+        Args:
+            path: Path of the JSON cache file
+            max: Maximum number of entries kept
+        """
+        super().__init__(max=max)
+        self.path = path
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for key, (expires_at, value) in json.load(f).items():
+                    self._entries[key] = (expires_at, value)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not load LLM cache file: {e}")
+
+    def set(self, key: str, expires_at: float, value: str):
+        """Store entry and flush the cache to disk."""
+        super().set(key, expires_at, value)
+        self._flush()
+
+    def delete(self, key: str):
+        """Remove entry and flush the cache to disk."""
+        super().delete(key)
+        self._flush()
+
+    def _flush(self):
+        """Write all entries to the cache file."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+        except Exception as e:
+            logger.warning(f"Could not write LLM cache file: {e}")
+
+
+class LLMCache:
+    """TTL cache for LLM responses on top of a pluggable backend."""
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: int = 3600):
+        """
+        Initialize LLM cache.
+
+        Args:
+            backend: Storage backend
+            ttl_seconds: How long a cached response stays valid
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        """
+        Build a deterministic cache key.
+
+        Args:
+            model: Model name
+            prompt: Full prompt text
+
+        Returns:
+            Hex sha256 digest of model and prompt
+        """
+        payload = json.dumps({'model': model, 'prompt': prompt}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get a cached response.
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached response text or None on miss/expiry
+        """
+        with self._lock:
+            entry = self.backend.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                self.backend.delete(key)
+                self.stats['misses'] += 1
+                return None
+
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key: str, value: str):
+        """
+        Store a response.
+
+        Args:
+            key: Cache key
+            value: Response text
+        """
+        with self._lock:
+            self.backend.set(key, time.time() + self.ttl_seconds, value)
+
+    def get_debug_info(self) -> Dict[str, Any]:
+        """Get cache statistics for debugging."""
+        return {
+            'backend': type(self.backend).__name__,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses']
+        }
@@ -0,0 +1,191 @@
+"""
+QuikSafe Bot - Semantic Response Cache
+Returns prior LLM answers for near-duplicate inputs using embedding similarity.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+from cachetools import LRUCache
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = 'models/text-embedding-004'
+
+# Recent query embeddings; one search embeds the same query once per category
+EMBEDDING_MEMO_SIZE = 1024
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def gemini_embed(text: str) -> Sequence[float]:
+    """
+    Embed text with the Gemini embedding endpoint.
+
+    Args:
+        text: Text to embed
+
+    Returns:
+        Embedding vector
+    """
+    import google.generativeai as genai
+
+    result = genai.embed_content(model=EMBEDDING_MODEL, content=text)
+    return result['embedding']
+
+
+def get_semantic_cache() -> 'SemanticCache':
+    """
+    Get the process-wide semantic cache, creating it on first use.
+
+    Returns:
+        Shared SemanticCache instance
+    """
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_lock:
+            if _shared_cache is None:
+                _shared_cache = SemanticCache(gemini_embed)
+    return _shared_cache
+
+
+class SemanticCache:
+    """Near-duplicate cache backed by a matrix of normalized embeddings."""
+
+    def __init__(self, embed_fn: Callable[[str], Sequence[float]],
+                 threshold: float = 0.92, max_entries: int = 2048):
+        """
+        Initialize semantic cache.
+
+        Args:
+            embed_fn: Function returning an embedding vector for a text
+            threshold: Minimum cosine similarity to count as a hit
+            max_entries: Maximum cached entries (oldest evicted first)
+        """
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'misses': 0}
+
+        self._embeddings: Optional[np.ndarray] = None
+        self._namespaces: List[str] = []
+        self._responses: List[str] = []
+        self._lock = threading.Lock()
+
+        self._embedding_memo = LRUCache(maxsize=EMBEDDING_MEMO_SIZE)
+        self._embedding_pending: Dict[str, threading.Event] = {}
+        self._embedding_lock = threading.Lock()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """
+        Embed and L2-normalize text, reusing recent embeddings of the same text.
+
+        Concurrent calls for the same text wait for the first one instead of
+        each hitting the embedding endpoint.
+
+        Args:
+            text: Text to embed
+
+        Returns:
+            Float32 unit vector, or None if embedding failed
+        """
+        with self._embedding_lock:
+            vector = self._embedding_memo.get(text)
+            if vector is not None:
+                return vector
+            pending = self._embedding_pending.get(text)
+            if pending is None:
+                self._embedding_pending[text] = threading.Event()
+
+        if pending is not None:
+            pending.wait()
+            with self._embedding_lock:
+                return self._embedding_memo.get(text)
+
+        try:
+            vector = self._embed_uncached(text)
+            if vector is not None:
+                with self._embedding_lock:
+                    self._embedding_memo[text] = vector
+            return vector
+        finally:
+            with self._embedding_lock:
+                self._embedding_pending.pop(text).set()
+
+    def _embed_uncached(self, text: str) -> Optional[np.ndarray]:
+        """Call the embedding function and normalize its result."""
+        try:
+            vector = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Failed to embed text for semantic cache: {e}")
+            return None
+
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return None
+        return vector / norm
+
+    def get(self, namespace: str, vector: np.ndarray) -> Optional[str]:
+        """
+        Find the closest cached response in a namespace.
+
+        Args:
+            namespace: Scope the lookup is restricted to (e.g. prompt kind + context hash)
+            vector: Normalized query embedding from embed()
+
+        Returns:
+            Cached response if similarity reaches the threshold, else None
+        """
+        with self._lock:
+            if self._embeddings is None:
+                self.stats['misses'] += 1
+                return None
+
+            scores = self._embeddings @ vector
+            mask = np.fromiter((ns == namespace for ns in self._namespaces),
+                               dtype=bool, count=len(self._namespaces))
+            scores = np.where(mask, scores, -1.0)
+
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.stats['hits'] += 1
+                return self._responses[best]
+
+            self.stats['misses'] += 1
+            return None
+
+    def set(self, namespace: str, vector: np.ndarray, response: str):
+        """
+        Store a response for an embedding.
+
+        Args:
+            namespace: Scope of the entry
+            vector: Normalized embedding from embed()
+            response: Response text
+        """
+        with self._lock:
+            row = vector.reshape(1, -1)
+            if self._embeddings is None:
+                self._embeddings = row
+            else:
+                self._embeddings = np.vstack((self._embeddings, row))
+            self._namespaces.append(namespace)
+            self._responses.append(response)
+
+            overflow = len(self._responses) - self.max_entries
+            if overflow > 0:
+                self._embeddings = self._embeddings[overflow:]
+                del self._namespaces[:overflow]
+                del self._responses[:overflow]
+
+    def get_debug_info(self) -> dict:
+        """Get cache statistics for debugging."""
+        return {
+            'entries': len(self._responses),
+            'threshold': self.threshold,
+            'hits': self.stats['hits'],
+            'misses': self.stats['misses']
+        }
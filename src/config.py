@@ -4,6 +4,8 @@ Loads and validates environment variables and bot settings.
 """
 
 import os
+from dataclasses import dataclass
+from cryptography.fernet import Fernet
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -11,75 +13,118 @@ from typing import Optional
 load_dotenv()
 
 
+def _parse_fernet(key: str) -> Optional[Fernet]:
+    """Parse a Fernet key, returning None if it is missing or malformed."""
+    try:
+        return Fernet(key.encode())
+    except Exception:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
 class Config:
     """Application configuration from environment variables."""
     
     # Telegram Configuration
-    TELEGRAM_BOT_TOKEN: str = os.getenv('TELEGRAM_BOT_TOKEN', '')
-    BOT_USERNAME: str = os.getenv('BOT_USERNAME', 'QuikSafeBot')
+    TELEGRAM_BOT_TOKEN: str
+    BOT_USERNAME: str
     
     # Supabase Configuration
-    SUPABASE_URL: str = os.getenv('SUPABASE_URL', '')
-    SUPABASE_KEY: str = os.getenv('SUPABASE_KEY', '')
+    SUPABASE_URL: str
+    SUPABASE_KEY: str
     
     # AI Configuration
-    GEMINI_API_KEY: str = os.getenv('GEMINI_API_KEY', '')
+    GEMINI_API_KEY: str
+    GEMINI_MODEL: str
+    GEMINI_HEAVY_MODEL: str
     
     # Security Configuration
-    ENCRYPTION_KEY: str = os.getenv('ENCRYPTION_KEY', '')
+    ENCRYPTION_KEY: str
+    FERNET: Optional[Fernet]  # Parsed once when the config is loaded
     
     # Storage Configuration
-    USE_SUPABASE_STORAGE: bool = os.getenv('USE_SUPABASE_STORAGE', 'false').lower() == 'true'
-    SUPABASE_STORAGE_BUCKET: str = os.getenv('SUPABASE_STORAGE_BUCKET', 'quiksafe-files')
+    USE_SUPABASE_STORAGE: bool
+    SUPABASE_STORAGE_BUCKET: str
     
     # Bot Configuration
-    DEBUG_MODE: bool = os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+    DEBUG_MODE: bool
     
     @classmethod
-    def validate(cls) -> tuple[bool, Optional[str]]:
+    def from_env(cls) -> 'Config':
+        """
+        Build configuration from environment variables.
+        
+        Returns:
+            Frozen Config instance
+        """
+        encryption_key = os.getenv('ENCRYPTION_KEY', '')
+        return cls(
+            TELEGRAM_BOT_TOKEN=os.getenv('TELEGRAM_BOT_TOKEN', ''),
+            BOT_USERNAME=os.getenv('BOT_USERNAME', 'QuikSafeBot'),
+            SUPABASE_URL=os.getenv('SUPABASE_URL', ''),
+            SUPABASE_KEY=os.getenv('SUPABASE_KEY', ''),
+            GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', ''),
+            GEMINI_MODEL=os.getenv('GEMINI_MODEL', 'gemini-1.5-flash'),
+            GEMINI_HEAVY_MODEL=os.getenv('GEMINI_HEAVY_MODEL', 'gemini-1.5-pro'),
+            ENCRYPTION_KEY=encryption_key,
+            FERNET=_parse_fernet(encryption_key),
+            USE_SUPABASE_STORAGE=os.getenv('USE_SUPABASE_STORAGE', 'false').lower() == 'true',
+            SUPABASE_STORAGE_BUCKET=os.getenv('SUPABASE_STORAGE_BUCKET', 'quiksafe-files'),
+            DEBUG_MODE=os.getenv('DEBUG_MODE', 'false').lower() == 'true'
+        )
+    
+    def validate(self) -> tuple[bool, Optional[str]]:
         """
         Validate that all required configuration is present.
         
         Returns:
             tuple: (is_valid, error_message)
         """
-        if not cls.TELEGRAM_BOT_TOKEN:
+        if not self.TELEGRAM_BOT_TOKEN:
             return False, "TELEGRAM_BOT_TOKEN is required"
         
         # Supabase is optional for now - can be added later
-        # if not cls.SUPABASE_URL:
+        # if not self.SUPABASE_URL:
         #     return False, "SUPABASE_URL is required"
         
-        # if not cls.SUPABASE_KEY:
+        # if not self.SUPABASE_KEY:
         #     return False, "SUPABASE_KEY is required"
         
-        if not cls.GEMINI_API_KEY:
+        if not self.GEMINI_API_KEY:
             return False, "GEMINI_API_KEY is required"
         
-        if not cls.ENCRYPTION_KEY:
+        if not self.ENCRYPTION_KEY:
             return False, "ENCRYPTION_KEY is required"
         
         # Validate encryption key format (Fernet key should be 44 characters)
-        if len(cls.ENCRYPTION_KEY) != 44:
+        if len(self.ENCRYPTION_KEY) != 44:
             return False, "ENCRYPTION_KEY must be a valid Fernet key (44 characters)"
         
+        if self.FERNET is None:
+            try:
+                Fernet(self.ENCRYPTION_KEY.encode())
+            except Exception as e:
+                return False, f"ENCRYPTION_KEY is not a valid Fernet key: {e}"
+        
         return True, None
     
-    @classmethod
-    def get_debug_info(cls) -> dict:
+    def get_debug_info(self) -> dict:
         """Get configuration info for debugging (without sensitive data)."""
         return {
-            'bot_username': cls.BOT_USERNAME,
-            'supabase_configured': bool(cls.SUPABASE_URL),
-            'gemini_configured': bool(cls.GEMINI_API_KEY),
-            'encryption_configured': bool(cls.ENCRYPTION_KEY),
-            'use_supabase_storage': cls.USE_SUPABASE_STORAGE,
-            'debug_mode': cls.DEBUG_MODE
+            'bot_username': self.BOT_USERNAME,
+            'supabase_configured': bool(self.SUPABASE_URL),
+            'gemini_configured': bool(self.GEMINI_API_KEY),
+            'gemini_model': self.GEMINI_MODEL,
+            'gemini_heavy_model': self.GEMINI_HEAVY_MODEL,
+            'encryption_configured': bool(self.ENCRYPTION_KEY),
+            'use_supabase_storage': self.USE_SUPABASE_STORAGE,
+            'debug_mode': self.DEBUG_MODE
         }
 
 
+CFG = Config.from_env()
+
 # Validate configuration on import
-is_valid, error = Config.validate()
+is_valid, error = CFG.validate()
 if not is_valid:
     raise ValueError(f"Configuration Error: {error}")
-
@@ -3,32 +3,149 @@ QuikSafe Bot - Database Manager
 Handles all database operations with Supabase PostgreSQL.
 """
 
-from supabase import create_client, Client
-from typing import Optional, List, Dict, Any
+from cachetools import TTLCache
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
+from src.utils.search_blob import attach_search_blobs
+import copy
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Default column projections for list/search views (detail views pass '*')
+PASSWORD_LIST_COLUMNS = 'id,service_name,tags,created_at'
+TASK_LIST_COLUMNS = 'id,encrypted_content,status,priority,due_date,tags,created_at'
+FILE_LIST_COLUMNS = 'id,file_name,file_type,file_size,tags,created_at'
+# Columns needed to send a stored file back to the chat
+FILE_SEND_COLUMNS = 'id,file_id,file_name,file_type'
+
+# Connection pool for the PostgREST HTTP/2 session
+HTTP_LIMITS = {'max_connections': 50, 'max_keepalive_connections': 20, 'keepalive_expiry': 60}
+
 
 class DatabaseManager:
     """Manages all database operations for QuikSafe Bot."""
     
     def __init__(self, supabase_url: str, supabase_key: str):
         """
-        Initialize database connection.
+        Initialize database manager. The Supabase client is created on first use.
         
         Args:
             supabase_url: Supabase project URL
             supabase_key: Supabase API key
         """
+        self.supabase_url = supabase_url
+        self.supabase_key = supabase_key
+        self._client = None
+        self._client_lock = threading.Lock()
+        # telegram_id -> user row; users rarely change within a session
+        self._user_cache = TTLCache(maxsize=10_000, ttl=300)
+        self._user_cache_lock = threading.Lock()
+        # (user_id, 'tasks') -> list rows; absorbs repeated menu taps
+        self._list_cache = TTLCache(maxsize=1024, ttl=30)
+        self._list_cache_lock = threading.Lock()
+        # key -> lock held while that list is fetched, so concurrent misses share one query
+        self._list_fetch_locks: Dict[tuple, threading.Lock] = {}
+        # user_id -> settings dict; written through on update, so it can live longer
+        self._settings_cache = TTLCache(maxsize=10_000, ttl=300)
+        self._settings_cache_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """Supabase client, connected lazily so the SDK import stays off the startup path."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+    
+    def _connect(self):
+        """
+        Import the Supabase SDK and create the client.
+        
+        Returns:
+            Supabase Client
+        """
         try:
-            self.client: Client = create_client(supabase_url, supabase_key)
+            from supabase import create_client
+            
+            client = create_client(self.supabase_url, self.supabase_key)
+            self._install_http_client(client)
             logger.info("Database connection established")
+            return client
         except Exception as e:
             logger.error(f"Failed to connect to database: {e}")
             raise
     
+    @staticmethod
+    def _install_http_client(client):
+        """Replace the PostgREST session with a pooled, keep-alive HTTP/2 client."""
+        import httpx
+        from postgrest.utils import SyncClient
+        
+        postgrest = client.postgrest
+        default_session = postgrest.session
+        postgrest.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=default_session.timeout,
+            follow_redirects=True,
+            http2=True,
+            limits=httpx.Limits(**HTTP_LIMITS)
+        )
+        default_session.close()
+    
+    # ==================== List Cache ====================
+    
+    def _cached_list(self, kind: str, user_id: str, fetch) -> List[Dict[str, Any]]:
+        """
+        Return a user's list rows from the short-TTL cache, fetching on a miss.
+        
+        Concurrent misses for the same list wait for a single fetch. Failed
+        fetches are not cached, so a transient error is not served for the TTL.
+        
+        Args:
+            kind: Cache namespace (e.g. 'tasks')
+            user_id: User UUID
+            fetch: Function fetching the rows for user_id; raises on database errors
+            
+        Returns:
+            Shallow copies of the rows, so callers may modify them freely (empty if failed)
+        """
+        key = (user_id, kind)
+        with self._list_cache_lock:
+            rows = self._list_cache.get(key)
+            if rows is None:
+                fetch_lock = self._list_fetch_locks.setdefault(key, threading.Lock())
+        
+        if rows is None:
+            with fetch_lock:
+                with self._list_cache_lock:
+                    rows = self._list_cache.get(key)
+                if rows is None:
+                    try:
+                        rows = fetch(user_id)
+                    except Exception as e:
+                        logger.error(f"Failed to get {kind}: {e}")
+                        return []
+                    finally:
+                        with self._list_cache_lock:
+                            self._list_fetch_locks.pop(key, None)
+                    with self._list_cache_lock:
+                        self._list_cache[key] = rows
+        
+        return [dict(row) for row in rows]
+    
+    def _invalidate_list(self, kind: str, user_id: Optional[str] = None):
+        """Drop a user's cached list, or every user's list of that kind if user_id is unknown."""
+        with self._list_cache_lock:
+            if user_id is not None:
+                self._list_cache.pop((user_id, kind), None)
+            else:
+                for key in [k for k in self._list_cache if k[1] == kind]:
+                    self._list_cache.pop(key, None)
+    
     # ==================== User Operations ====================
     
     def create_user(self, telegram_id: int, master_password_hash: str) -> Optional[Dict[str, Any]]:
@@ -48,7 +165,11 @@ class DatabaseManager:
                 'master_password_hash': master_password_hash
             }).execute()
             
-            return result.data[0] if result.data else None
+            user = result.data[0] if result.data else None
+            if user:
+                with self._user_cache_lock:
+                    self._user_cache[telegram_id] = user
+            return user
         except Exception as e:
             logger.error(f"Failed to create user: {e}")
             return None
@@ -63,9 +184,18 @@ class DatabaseManager:
         Returns:
             User data or None if not found
         """
+        with self._user_cache_lock:
+            user = self._user_cache.get(telegram_id)
+        if user is not None:
+            return user
+        
         try:
-            result = self.client.table('users').select('*').eq('telegram_id', telegram_id).execute()
-            return result.data[0] if result.data else None
+            result = self.client.table('users').select('*').eq('telegram_id', telegram_id).maybe_single().execute()
+            user = result.data if result else None
+            if user:
+                with self._user_cache_lock:
+                    self._user_cache[telegram_id] = user
+            return user
         except Exception as e:
             logger.error(f"Failed to get user: {e}")
             return None
@@ -85,6 +215,8 @@ class DatabaseManager:
             self.client.table('users').update({
                 'master_password_hash': new_password_hash
             }).eq('telegram_id', telegram_id).execute()
+            with self._user_cache_lock:
+                self._user_cache.pop(telegram_id, None)
             return True
         except Exception as e:
             logger.error(f"Failed to update master password: {e}")
@@ -101,13 +233,41 @@ class DatabaseManager:
             User settings dictionary
         """
         try:
-            result = self.client.table('users').select('settings').eq('id', user_id).execute()
-            if result.data and result.data[0].get('settings'):
-                return result.data[0]['settings']
-            return {}
+            return self._fetch_user_settings(user_id)
         except Exception as e:
             logger.error(f"Failed to get user settings: {e}")
             return {}
+    
+    def get_user_settings_cached(self, user_id: str) -> Dict[str, Any]:
+        """
+        Get user settings, served from a write-through cache when possible.
+        
+        Args:
+            user_id: User UUID
+            
+        Returns:
+            Copy of the user settings dictionary, so callers may modify it freely
+        """
+        with self._settings_cache_lock:
+            settings = self._settings_cache.get(user_id)
+        
+        if settings is None:
+            try:
+                settings = self._fetch_user_settings(user_id)
+            except Exception as e:
+                logger.error(f"Failed to get user settings: {e}")
+                return {}
+            with self._settings_cache_lock:
+                self._settings_cache[user_id] = settings
+        
+        return copy.deepcopy(settings)
+    
+    def _fetch_user_settings(self, user_id: str) -> Dict[str, Any]:
+        """Read a user's settings column; raises on database errors."""
+        result = self.client.table('users').select('settings').eq('id', user_id).maybe_single().execute()
+        if result and result.data.get('settings'):
+            return result.data['settings']
+        return {}
 
     def update_user_settings(self, user_id: str, settings: Dict[str, Any]) -> bool:
         """
@@ -124,11 +284,37 @@ class DatabaseManager:
             self.client.table('users').update({
                 'settings': settings
             }).eq('id', user_id).execute()
+            with self._settings_cache_lock:
+                self._settings_cache[user_id] = copy.deepcopy(settings)
             return True
         except Exception as e:
             logger.error(f"Failed to update user settings: {e}")
             return False
     
+    def update_user_settings_field(self, user_id: str, path: List[str], value: Any) -> Optional[Dict[str, Any]]:
+        """
+        Set a single settings value in one request.
+        
+        Args:
+            user_id: User UUID
+            path: Key path inside settings, up to two levels (e.g. ['security', 'auto_lock_minutes'])
+            value: New JSON-serializable value
+            
+        Returns:
+            Updated settings dictionary, or None if failed
+        """
+        try:
+            result = self.client.rpc(
+                'update_user_settings_field', {'uid': user_id, 'path': path, 'value': value}
+            ).execute()
+            settings = result.data or {}
+            with self._settings_cache_lock:
+                self._settings_cache[user_id] = copy.deepcopy(settings)
+            return settings
+        except Exception as e:
+            logger.error(f"Failed to update user settings field: {e}")
+            return None
+    
     # ==================== Password Operations ====================
     
     def save_password(self, user_id: str, service_name: str, encrypted_username: str,
@@ -162,44 +348,185 @@ class DatabaseManager:
             logger.error(f"Failed to save password: {e}")
             return None
     
-    def get_passwords(self, user_id: str, service_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _password_row(user_id: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the insert payload for one password entry."""
+        return {
+            'user_id': user_id,
+            'service_name': row['service_name'],
+            'encrypted_username': row.get('encrypted_username'),
+            'encrypted_password': row['encrypted_password'],
+            'tags': row.get('tags') or [],
+            'notes': row.get('notes')
+        }
+    
+    def save_passwords_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Save many password entries in a single insert.
+        
+        Args:
+            user_id: User UUID
+            rows: Dicts with service_name, encrypted_username, encrypted_password
+                and optional tags/notes
+            
+        Returns:
+            Created password entries (empty list if failed)
+        """
+        if not rows:
+            return []
+        
+        try:
+            result = self.client.table('passwords').insert([
+                self._password_row(user_id, row) for row in rows
+            ]).execute()
+            
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to bulk save passwords: {e}")
+            return []
+    
+    def save_passwords_batch(self, rows: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Save password entries for any number of users in a single insert.
+        
+        If the batch insert fails, rows are retried one by one so that a
+        single bad row does not fail the others.
+        
+        Args:
+            rows: Dicts with user_id, service_name, encrypted_username,
+                encrypted_password and optional tags/notes
+            
+        Returns:
+            Created entry (or None if it failed) for each row, in order
+        """
+        if not rows:
+            return []
+        
+        try:
+            result = self.client.table('passwords').insert([
+                self._password_row(row['user_id'], row) for row in rows
+            ]).execute()
+            
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to batch save passwords: {e}")
+            return [self.save_password(**row) for row in rows]
+    
+    def get_passwords(self, user_id: str, service_name: Optional[str] = None,
+                      search: Optional[str] = None,
+                      columns: str = PASSWORD_LIST_COLUMNS,
+                      limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
         """
         Get password entries for a user.
         
         Args:
             user_id: User UUID
             service_name: Optional service name filter
+            search: Optional full-text query, matched server-side on service name and tags
+            columns: Columns to select (pass '*' when encrypted fields are needed)
+            limit: Maximum number of rows to return (None for all; ignored with search)
+            offset: Number of rows to skip (used with limit)
             
         Returns:
             List of password entries
         """
         try:
-            query = self.client.table('passwords').select('*').eq('user_id', user_id)
+            if search:
+                result = self.client.rpc('search_passwords', {'q': search, 'uid': user_id}).execute()
+                return attach_search_blobs(result.data, "passwords") if result.data else []
+            
+            query = self.client.table('passwords').select(columns).eq('user_id', user_id)
             
             if service_name:
                 query = query.ilike('service_name', f'%{service_name}%')
             
-            result = query.order('created_at', desc=True).execute()
-            return result.data if result.data else []
+            query = query.order('created_at', desc=True)
+            
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
+            
+            result = query.execute()
+            return attach_search_blobs(result.data, "passwords") if result.data else []
         except Exception as e:
             logger.error(f"Failed to get passwords: {e}")
             return []
     
-    def update_password(self, password_id: str, encrypted_password: str) -> bool:
+    def count_passwords(self, user_id: str) -> int:
+        """
+        Count password entries for a user without fetching them.
+        
+        Args:
+            user_id: User UUID
+            
+        Returns:
+            Number of password entries (0 if failed)
+        """
+        try:
+            result = self.client.table('passwords').select('id', count='exact', head=True).eq('user_id', user_id).execute()
+            return result.count or 0
+        except Exception as e:
+            logger.error(f"Failed to count passwords: {e}")
+            return 0
+    
+    def get_untagged_passwords(self, user_id: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Get password entries that have no tags yet.
+        
+        Args:
+            user_id: User UUID
+            limit: Maximum number of entries to return
+            
+        Returns:
+            List of password entries (id and service_name only)
+        """
+        try:
+            result = self.client.table('passwords').select('id,service_name').eq(
+                'user_id', user_id
+            ).or_('tags.is.null,tags.eq.{}').order('created_at', desc=True).limit(limit).execute()
+            return result.data if result.data else []
+        except Exception as e:
+            logger.error(f"Failed to get untagged passwords: {e}")
+            return []
+    
+    def get_password_by_id(self, password_id: str, user_id: str, columns: str = '*') -> Optional[Dict[str, Any]]:
+        """
+        Get a specific password entry by ID.
+        
+        Args:
+            password_id: Password entry UUID
+            user_id: User UUID (for security)
+            columns: Columns to select
+            
+        Returns:
+            Password entry or None if not found
+        """
+        try:
+            result = self.client.table('passwords').select(columns).eq('id', password_id).eq('user_id', user_id).maybe_single().execute()
+            return result.data if result else None
+        except Exception as e:
+            logger.error(f"Failed to get password: {e}")
+            return None
+    
+    def update_password(self, password_id: str, encrypted_password: str,
+                        user_id: Optional[str] = None) -> bool:
         """
         Update password value.
         
         Args:
             password_id: Password entry UUID
             encrypted_password: New encrypted password
+            user_id: Optional owner UUID; when given, only that user's entry is updated
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            self.client.table('passwords').update({
+            query = self.client.table('passwords').update({
                 'encrypted_password': encrypted_password
-            }).eq('id', password_id).execute()
+            }).eq('id', password_id)
+            if user_id is not None:
+                query = query.eq('user_id', user_id)
+            query.execute()
             return True
         except Exception as e:
             logger.error(f"Failed to update password: {e}")
@@ -223,6 +550,26 @@ class DatabaseManager:
             logger.error(f"Failed to delete password: {e}")
             return False
 
+    def delete_password_and_list(self, password_id: str, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Delete a password entry and return the remaining password entries in one request.
+        
+        Args:
+            password_id: Password entry UUID
+            user_id: User UUID (for security)
+            
+        Returns:
+            Remaining password entries, or None if failed
+        """
+        try:
+            result = self.client.rpc(
+                'delete_password_and_list', {'pid': password_id, 'uid': user_id}
+            ).select(PASSWORD_LIST_COLUMNS).execute()
+            return attach_search_blobs(result.data or [], "passwords")
+        except Exception as e:
+            logger.error(f"Failed to delete password: {e}")
+            return None
+
     def update_password_tags(self, password_id: str, tags: List[str]) -> bool:
         """
         Update tags for a password entry.
@@ -243,6 +590,40 @@ class DatabaseManager:
             logger.error(f"Failed to update password tags: {e}")
             return False
     
+    def update_password_tags_batch(self, user_id: str, updates: List[Dict[str, Any]]) -> int:
+        """
+        Update tags for several of a user's password entries in one request.
+        
+        Args:
+            user_id: User UUID (for security)
+            updates: List of {'id': password UUID, 'tags': list of tags}
+            
+        Returns:
+            Number of entries updated
+        """
+        if not updates:
+            return 0
+        
+        try:
+            result = self.client.rpc(
+                'update_password_tags_batch', {'uid': user_id, 'updates': updates}
+            ).execute()
+            return result.data or 0
+        except Exception as e:
+            logger.error(f"Failed to batch update password tags: {e}")
+        
+        # Per-row fallback (e.g. migration not applied yet), still scoped to the user
+        updated = 0
+        for row in updates:
+            try:
+                result = self.client.table('passwords').update({
+                    'tags': row['tags']
+                }).eq('id', row['id']).eq('user_id', user_id).execute()
+                updated += len(result.data or [])
+            except Exception as e:
+                logger.error(f"Failed to update password tags: {e}")
+        return updated
+    
     # ==================== Task Operations ====================
     
     def create_task(self, user_id: str, encrypted_content: str, priority: str = 'medium',
@@ -269,33 +650,85 @@ class DatabaseManager:
                 'tags': tags or []
             }).execute()
             
+            self._invalidate_list('tasks', user_id)
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Failed to create task: {e}")
             return None
     
-    def get_tasks(self, user_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    def create_tasks_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Create many tasks in a single insert.
+        
+        Args:
+            user_id: User UUID
+            rows: Dicts with encrypted_content and optional priority/due_date/tags
+            
+        Returns:
+            Created tasks (empty list if failed)
+        """
+        if not rows:
+            return []
+        
+        try:
+            result = self.client.table('tasks').insert([
+                {
+                    'user_id': user_id,
+                    'encrypted_content': row['encrypted_content'],
+                    'priority': row.get('priority', 'medium'),
+                    'due_date': row['due_date'].isoformat() if row.get('due_date') else None,
+                    'tags': row.get('tags') or []
+                }
+                for row in rows
+            ]).execute()
+            
+            self._invalidate_list('tasks', user_id)
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to bulk create tasks: {e}")
+            return []
+    
+    def get_tasks(self, user_id: str, status: Optional[str] = None,
+                  columns: str = TASK_LIST_COLUMNS) -> List[Dict[str, Any]]:
         """
         Get tasks for a user.
         
         Args:
             user_id: User UUID
             status: Optional status filter (pending, in_progress, completed)
+            columns: Columns to select
             
         Returns:
             List of tasks
         """
         try:
-            query = self.client.table('tasks').select('*').eq('user_id', user_id)
-            
-            if status:
-                query = query.eq('status', status)
-            
-            result = query.order('created_at', desc=True).execute()
-            return result.data if result.data else []
+            return self._fetch_tasks(user_id, status, columns)
         except Exception as e:
             logger.error(f"Failed to get tasks: {e}")
             return []
+    
+    def _fetch_tasks(self, user_id: str, status: Optional[str] = None,
+                     columns: str = TASK_LIST_COLUMNS) -> List[Dict[str, Any]]:
+        """Query a user's tasks; raises on database errors."""
+        query = self.client.table('tasks').select(columns).eq('user_id', user_id)
+        
+        if status:
+            query = query.eq('status', status)
+        
+        result = query.order('created_at', desc=True).execute()
+        return result.data if result.data else []
+    
+    def get_tasks_cached(self, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Get all of a user's tasks, served from a 30s cache when possible.
+        
+        Args:
+            user_id: User UUID
+            
+        Returns:
+            List of tasks (list columns only)
+        """
+        return self._cached_list('tasks', user_id, self._fetch_tasks)
 
     def get_task_by_id(self, task_id: str, user_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -309,8 +742,8 @@ class DatabaseManager:
             Task data or None if not found
         """
         try:
-            result = self.client.table('tasks').select('*').eq('id', task_id).eq('user_id', user_id).execute()
-            return result.data[0] if result.data else None
+            result = self.client.table('tasks').select('*').eq('id', task_id).eq('user_id', user_id).maybe_single().execute()
+            return result.data if result else None
         except Exception as e:
             logger.error(f"Failed to get task: {e}")
             return None
@@ -333,6 +766,7 @@ class DatabaseManager:
                 update_data['completed_at'] = datetime.now().isoformat()
             
             self.client.table('tasks').update(update_data).eq('id', task_id).eq('user_id', user_id).execute()
+            self._invalidate_list('tasks', user_id)
             return True
         except Exception as e:
             logger.error(f"Failed to update task status: {e}")
@@ -351,11 +785,33 @@ class DatabaseManager:
         """
         try:
             self.client.table('tasks').delete().eq('id', task_id).eq('user_id', user_id).execute()
+            self._invalidate_list('tasks', user_id)
             return True
         except Exception as e:
             logger.error(f"Failed to delete task: {e}")
             return False
     
+    def delete_task_and_list(self, task_id: str, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Delete a task and return the remaining tasks in one request.
+        
+        Args:
+            task_id: Task UUID
+            user_id: User UUID (for security)
+            
+        Returns:
+            Remaining tasks, or None if failed
+        """
+        try:
+            result = self.client.rpc(
+                'delete_task_and_list', {'tid': task_id, 'uid': user_id}
+            ).select(TASK_LIST_COLUMNS).execute()
+            self._invalidate_list('tasks', user_id)
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to delete task: {e}")
+            return None
+    
     # ==================== File Operations ====================
     
     def save_file(self, user_id: str, file_id: str, file_name: str, file_type: str,
@@ -391,29 +847,119 @@ class DatabaseManager:
             logger.error(f"Failed to save file: {e}")
             return None
     
-    def get_files(self, user_id: str, file_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    def save_files_bulk(self, user_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Save metadata for many files in a single insert.
+        
+        Args:
+            user_id: User UUID
+            rows: Dicts with file_id, file_name, file_type, file_size and optional
+                encrypted_description/tags
+            
+        Returns:
+            Created file entries (empty list if failed)
+        """
+        if not rows:
+            return []
+        
+        try:
+            result = self.client.table('files').insert([
+                {
+                    'user_id': user_id,
+                    'file_id': row['file_id'],
+                    'file_name': row['file_name'],
+                    'file_type': row.get('file_type'),
+                    'file_size': row.get('file_size'),
+                    'encrypted_description': row.get('encrypted_description'),
+                    'tags': row.get('tags') or []
+                }
+                for row in rows
+            ]).execute()
+            
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Failed to bulk save files: {e}")
+            return []
+    
+    def get_files(self, user_id: str, file_name: Optional[str] = None,
+                  columns: str = FILE_LIST_COLUMNS, type_prefix: Optional[str] = None,
+                  limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
         """
         Get files for a user.
         
         Args:
             user_id: User UUID
             file_name: Optional file name filter
+            columns: Columns to select (pass '*' when file_id/description are needed)
+            type_prefix: Optional MIME type prefix filter (e.g. 'image')
+            limit: Maximum number of rows to return (None for all)
+            offset: Number of rows to skip (used with limit)
             
         Returns:
             List of files
         """
         try:
-            query = self.client.table('files').select('*').eq('user_id', user_id)
+            query = self.client.table('files').select(columns).eq('user_id', user_id)
             
             if file_name:
                 query = query.ilike('file_name', f'%{file_name}%')
             
-            result = query.order('created_at', desc=True).execute()
-            return result.data if result.data else []
+            if type_prefix:
+                query = query.like('file_type', f'{type_prefix}%')
+            
+            query = query.order('created_at', desc=True)
+            
+            if limit is not None:
+                query = query.range(offset, offset + limit - 1)
+            
+            result = query.execute()
+            return attach_search_blobs(result.data, "files") if result.data else []
         except Exception as e:
             logger.error(f"Failed to get files: {e}")
             return []
     
+    def count_files(self, user_id: str, type_prefix: Optional[str] = None) -> int:
+        """
+        Count files for a user without fetching them.
+        
+        Args:
+            user_id: User UUID
+            type_prefix: Optional MIME type prefix filter (e.g. 'image')
+            
+        Returns:
+            Number of matching files (0 if failed)
+        """
+        try:
+            query = self.client.table('files').select('id', count='exact', head=True).eq('user_id', user_id)
+            
+            if type_prefix:
+                query = query.like('file_type', f'{type_prefix}%')
+            
+            result = query.execute()
+            return result.count or 0
+        except Exception as e:
+            logger.error(f"Failed to count files: {e}")
+            return 0
+    
+    def get_file_by_id(self, file_id: str, user_id: str, columns: str = '*') -> Optional[Dict[str, Any]]:
+        """
+        Get a specific file entry by ID.
+        
+        Args:
+            file_id: File entry UUID
+            user_id: User UUID (for security)
+            columns: Columns to select
+            
+        Returns:
+            File entry or None if not found
+        """
+        try:
+            result = self.client.table('files').select(columns).eq('id', file_id).eq('user_id', user_id).maybe_single().execute()
+            return result.data if result else None
+        except Exception as e:
+            logger.error(f"Failed to get file: {e}")
+            return None
+    
     def delete_file(self, file_id: str, user_id: str) -> bool:
         """
         Delete a file entry.
@@ -431,3 +977,47 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Failed to delete file: {e}")
             return False
+    
+    def delete_file_and_list(self, file_id: str, user_id: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Delete a file entry and return the remaining file entries in one request.
+        
+        Args:
+            file_id: File entry UUID
+            user_id: User UUID (for security)
+            
+        Returns:
+            Remaining file entries, or None if failed
+        """
+        try:
+            result = self.client.rpc(
+                'delete_file_and_list', {'fid': file_id, 'uid': user_id}
+            ).select(FILE_LIST_COLUMNS).execute()
+            return attach_search_blobs(result.data or [], "files")
+        except Exception as e:
+            logger.error(f"Failed to delete file: {e}")
+            return None
+    
+    # ==================== Combined Operations ====================
+    
+    def get_all_user_content(self, user_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Get a user's passwords, tasks and files (list columns) in one request.
+        
+        Args:
+            user_id: User UUID
+            
+        Returns:
+            Tuple of (passwords, tasks, files); empty lists if failed
+        """
+        try:
+            result = self.client.rpc('get_user_content', {'uid': user_id}).execute()
+            content = result.data or {}
+            return (
+                attach_search_blobs(content.get('passwords') or [], "passwords"),
+                content.get('tasks') or [],
+                attach_search_blobs(content.get('files') or [], "files")
+            )
+        except Exception as e:
+            logger.error(f"Failed to get user content: {e}")
+            return [], [], []
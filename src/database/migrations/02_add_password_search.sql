@@ -0,0 +1,22 @@
+-- Migration: Add server-side full-text search for passwords
+-- Description: Adds a GIN full-text index on service names and a search_passwords function
+-- so searches only return matching rows instead of the whole vault.
+-- Notes and usernames are encrypted, so only service_name and tags are searchable.
+
+CREATE INDEX IF NOT EXISTS idx_passwords_service_name_fts
+    ON passwords USING GIN (to_tsvector('english', service_name));
+
+CREATE OR REPLACE FUNCTION search_passwords(q TEXT, uid UUID)
+RETURNS SETOF passwords
+LANGUAGE sql STABLE
+AS $$
+    SELECT *
+    FROM passwords
+    WHERE user_id = uid
+      AND (
+          to_tsvector('english', service_name) @@ websearch_to_tsquery('english', q)
+          OR tags && string_to_array(lower(q), ' ')
+      )
+    ORDER BY ts_rank(to_tsvector('english', service_name), websearch_to_tsquery('english', q)) DESC,
+             created_at DESC;
+$$;
@@ -0,0 +1,33 @@
+-- Migration: Add delete-and-list functions
+-- Description: Deletes an item and returns the user's remaining items in one request,
+-- so the bot can refresh the list view without a second round-trip.
+
+CREATE OR REPLACE FUNCTION delete_password_and_list(pid UUID, uid UUID)
+RETURNS SETOF passwords
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM passwords WHERE id = pid AND user_id = uid;
+    RETURN QUERY SELECT * FROM passwords WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION delete_task_and_list(tid UUID, uid UUID)
+RETURNS SETOF tasks
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM tasks WHERE id = tid AND user_id = uid;
+    RETURN QUERY SELECT * FROM tasks WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION delete_file_and_list(fid UUID, uid UUID)
+RETURNS SETOF files
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM files WHERE id = fid AND user_id = uid;
+    RETURN QUERY SELECT * FROM files WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
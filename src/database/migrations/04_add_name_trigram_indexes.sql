@@ -0,0 +1,12 @@
+-- Migration: Add trigram indexes for name filters
+-- Description: get_passwords(service_name=...) and get_files(file_name=...) filter with
+-- ILIKE '%term%', which a plain B-tree index cannot serve. Trigram GIN indexes let
+-- Postgres answer those substring matches (and prefix matches) from the index.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_passwords_service_name_trgm
+    ON passwords USING GIN (service_name gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_files_file_name_trgm
+    ON files USING GIN (file_name gin_trgm_ops);
@@ -0,0 +1,24 @@
+-- Migration: Add get_user_content function
+-- Description: Returns a user's password, task and file list rows as one JSON object,
+-- so search can load all three categories in a single request.
+
+CREATE OR REPLACE FUNCTION get_user_content(uid UUID)
+RETURNS JSON
+LANGUAGE sql STABLE
+AS $$
+    SELECT json_build_object(
+        'passwords', COALESCE((
+            SELECT json_agg(p ORDER BY p.created_at DESC)
+            FROM (SELECT id, service_name, tags, created_at FROM passwords WHERE user_id = uid) p
+        ), '[]'::json),
+        'tasks', COALESCE((
+            SELECT json_agg(t ORDER BY t.created_at DESC)
+            FROM (SELECT id, encrypted_content, status, priority, due_date, tags, created_at
+                  FROM tasks WHERE user_id = uid) t
+        ), '[]'::json),
+        'files', COALESCE((
+            SELECT json_agg(f ORDER BY f.created_at DESC)
+            FROM (SELECT id, file_name, file_type, file_size, tags, created_at FROM files WHERE user_id = uid) f
+        ), '[]'::json)
+    );
+$$;
@@ -0,0 +1,17 @@
+-- Migration: Add update_user_settings_field function
+-- Description: Sets one settings value in place and returns the updated settings,
+-- replacing the read-modify-write of the whole JSONB column with a single request.
+
+CREATE OR REPLACE FUNCTION update_user_settings_field(uid UUID, path TEXT[], value JSONB)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    -- The inner jsonb_set creates a missing parent object, so two-level paths always apply
+    UPDATE users
+    SET settings = jsonb_set(
+        jsonb_set(COALESCE(settings, '{}'::jsonb), path[1:1], COALESCE(settings #> path[1:1], '{}'::jsonb)),
+        path, value
+    )
+    WHERE id = uid
+    RETURNING settings;
+$$;
@@ -0,0 +1,18 @@
+-- Migration: Add update_password_tags_batch function
+-- Description: Applies tag suggestions to many of a user's passwords in one request,
+-- instead of one UPDATE round-trip per entry.
+
+CREATE OR REPLACE FUNCTION update_password_tags_batch(uid UUID, updates JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    -- updates: [{"id": "<uuid>", "tags": ["work", ...]}, ...]
+    WITH updated AS (
+        UPDATE passwords p
+        SET tags = ARRAY(SELECT jsonb_array_elements_text(u.tags))
+        FROM jsonb_to_recordset(updates) AS u(id UUID, tags JSONB)
+        WHERE p.id = u.id AND p.user_id = uid
+        RETURNING p.id
+    )
+    SELECT count(*)::INTEGER FROM updated;
+$$;
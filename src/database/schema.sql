@@ -14,6 +14,9 @@ CREATE TABLE IF NOT EXISTS users (
 -- Create index on telegram_id for faster lookups
 CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id);
 
+-- Trigram indexes back the ILIKE '%term%' name filters
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- Passwords table
 CREATE TABLE IF NOT EXISTS passwords (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -31,6 +34,8 @@ CREATE TABLE IF NOT EXISTS passwords (
 CREATE INDEX IF NOT EXISTS idx_passwords_user_id ON passwords(user_id);
 CREATE INDEX IF NOT EXISTS idx_passwords_service_name ON passwords(service_name);
 CREATE INDEX IF NOT EXISTS idx_passwords_tags ON passwords USING GIN(tags);
+CREATE INDEX IF NOT EXISTS idx_passwords_service_name_fts ON passwords USING GIN(to_tsvector('english', service_name));
+CREATE INDEX IF NOT EXISTS idx_passwords_service_name_trgm ON passwords USING GIN(service_name gin_trgm_ops);
 
 -- Tasks table
 CREATE TABLE IF NOT EXISTS tasks (
@@ -70,6 +75,7 @@ CREATE TABLE IF NOT EXISTS files (
 -- Create indexes for files
 CREATE INDEX IF NOT EXISTS idx_files_user_id ON files(user_id);
 CREATE INDEX IF NOT EXISTS idx_files_file_name ON files(file_name);
+CREATE INDEX IF NOT EXISTS idx_files_file_name_trgm ON files USING GIN(file_name gin_trgm_ops);
 CREATE INDEX IF NOT EXISTS idx_files_file_type ON files(file_type);
 CREATE INDEX IF NOT EXISTS idx_files_tags ON files USING GIN(tags);
 
@@ -95,6 +101,106 @@ CREATE TRIGGER update_tasks_updated_at BEFORE UPDATE ON tasks
 CREATE TRIGGER update_files_updated_at BEFORE UPDATE ON files
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Full-text password search (notes/usernames are encrypted, so only service_name and tags)
+CREATE OR REPLACE FUNCTION search_passwords(q TEXT, uid UUID)
+RETURNS SETOF passwords
+LANGUAGE sql STABLE
+AS $$
+    SELECT *
+    FROM passwords
+    WHERE user_id = uid
+      AND (
+          to_tsvector('english', service_name) @@ websearch_to_tsquery('english', q)
+          OR tags && string_to_array(lower(q), ' ')
+      )
+    ORDER BY ts_rank(to_tsvector('english', service_name), websearch_to_tsquery('english', q)) DESC,
+             created_at DESC;
+$$;
+
+-- Delete an item and return the user's remaining items in one request
+CREATE OR REPLACE FUNCTION delete_password_and_list(pid UUID, uid UUID)
+RETURNS SETOF passwords
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM passwords WHERE id = pid AND user_id = uid;
+    RETURN QUERY SELECT * FROM passwords WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION delete_task_and_list(tid UUID, uid UUID)
+RETURNS SETOF tasks
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM tasks WHERE id = tid AND user_id = uid;
+    RETURN QUERY SELECT * FROM tasks WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION delete_file_and_list(fid UUID, uid UUID)
+RETURNS SETOF files
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM files WHERE id = fid AND user_id = uid;
+    RETURN QUERY SELECT * FROM files WHERE user_id = uid ORDER BY created_at DESC;
+END;
+$$;
+
+-- All of a user's list rows (passwords, tasks, files) in one request
+CREATE OR REPLACE FUNCTION get_user_content(uid UUID)
+RETURNS JSON
+LANGUAGE sql STABLE
+AS $$
+    SELECT json_build_object(
+        'passwords', COALESCE((
+            SELECT json_agg(p ORDER BY p.created_at DESC)
+            FROM (SELECT id, service_name, tags, created_at FROM passwords WHERE user_id = uid) p
+        ), '[]'::json),
+        'tasks', COALESCE((
+            SELECT json_agg(t ORDER BY t.created_at DESC)
+            FROM (SELECT id, encrypted_content, status, priority, due_date, tags, created_at
+                  FROM tasks WHERE user_id = uid) t
+        ), '[]'::json),
+        'files', COALESCE((
+            SELECT json_agg(f ORDER BY f.created_at DESC)
+            FROM (SELECT id, file_name, file_type, file_size, tags, created_at FROM files WHERE user_id = uid) f
+        ), '[]'::json)
+    );
+$$;
+
+-- Set a single settings value and return the updated settings
+CREATE OR REPLACE FUNCTION update_user_settings_field(uid UUID, path TEXT[], value JSONB)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    -- The inner jsonb_set creates a missing parent object, so two-level paths always apply
+    UPDATE users
+    SET settings = jsonb_set(
+        jsonb_set(COALESCE(settings, '{}'::jsonb), path[1:1], COALESCE(settings #> path[1:1], '{}'::jsonb)),
+        path, value
+    )
+    WHERE id = uid
+    RETURNING settings;
+$$;
+
+-- Set tags on many of a user's passwords in one request
+CREATE OR REPLACE FUNCTION update_password_tags_batch(uid UUID, updates JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    -- updates: [{"id": "<uuid>", "tags": ["work", ...]}, ...]
+    WITH updated AS (
+        UPDATE passwords p
+        SET tags = ARRAY(SELECT jsonb_array_elements_text(u.tags))
+        FROM jsonb_to_recordset(updates) AS u(id UUID, tags JSONB)
+        WHERE p.id = u.id AND p.user_id = uid
+        RETURNING p.id
+    )
+    SELECT count(*)::INTEGER FROM updated;
+$$;
+
 -- Enable Row Level Security (RLS) for additional security
 ALTER TABLE users ENABLE ROW LEVEL SECURITY;
 ALTER TABLE passwords ENABLE ROW LEVEL SECURITY;
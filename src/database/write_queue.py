@@ -0,0 +1,80 @@
+"""
+QuikSafe Bot - Coalescing Write Queue
+Collects concurrent inserts and flushes them to the database in batches.
+"""
+
+from typing import Any, Callable, List, Optional
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Flush once this many writes are queued, or after this many seconds
+MAX_BATCH = 64
+MAX_DELAY = 0.02
+
+
+class WriteQueue:
+    """Async queue that turns concurrent single-row writes into batch inserts."""
+
+    def __init__(self, flush: Callable[[List[Any]], List[Any]],
+                 max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY):
+        """
+        Initialize write queue.
+
+        Args:
+            flush: Blocking function that writes a batch of items and returns
+                one result per item, in order (run in a worker thread)
+            max_batch: Maximum items written per flush
+            max_delay: Seconds to wait for more items after the first one arrives
+        """
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def put(self, item: Any) -> Any:
+        """
+        Queue an item and wait until its batch has been written.
+
+        Args:
+            item: Row to write
+
+        Returns:
+            The flush result for this item
+        """
+        if self._writer is None or self._writer.done():
+            # Started lazily: handlers are built before the event loop runs
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        """Drain the queue forever, writing one batch per iteration."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            items = [item for item, _ in batch]
+            try:
+                results = await asyncio.to_thread(self.flush, items)
+            except Exception as e:
+                logger.error(f"Batch write failed: {e}")
+                results = [None] * len(items)
+
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(results[i] if i < len(results) else None)
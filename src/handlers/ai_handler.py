@@ -5,19 +5,44 @@ Handles AI-powered features like auto-organization and summarization.
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
+from telegram.error import TelegramError
 from src.database.db_manager import DatabaseManager
 from src.security.encryption import EncryptionManager
 from src.security.auth import SessionManager
-from src.ai.gemini_client import GeminiClient
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.ai.gemini_client import GeminiClient, TAG_BATCH_SIZE
+from src.utils.keyboard_builder import KB
+from src.utils.tg_ratelimit import safe_edit
+from src.utils.formatters import bold_entities
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Static AI menu, built once at import
+_AI_MENU_MSG, _AI_MENU_ENTITIES = bold_entities(
+    "🤖 **AI Assistant**\n\n"
+    "I can help you organize and understand your data.\n\n"
+    "Choose an action:"
+)
+_AI_MENU_KB = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🏷️ Auto-Tag Items", callback_data=KB.encode_callback('ai_tag')),
+        InlineKeyboardButton("📝 Summarize Tasks", callback_data=KB.encode_callback('ai_summarize_tasks'))
+    ],
+    [
+        InlineKeyboardButton("🔍 Smart Search", callback_data=KB.encode_callback('quick_search'))
+    ],
+    [
+        InlineKeyboardButton(f"{KB.EMOJI['back']} Back to Menu", callback_data=KB.encode_callback('main_menu'))
+    ]
+])
+
 
 class AIHandler:
     """Handles AI operations."""
     
+    __slots__ = ('db', 'encryption', 'session', 'ai_client', 'kb', '_background')
+    
     def __init__(self, db: DatabaseManager, encryption: EncryptionManager, session: SessionManager, ai_client: GeminiClient):
         """
         Initialize AI handler.
@@ -32,88 +57,70 @@ class AIHandler:
         self.encryption = encryption
         self.session = session
         self.ai_client = ai_client
-        self.kb = KeyboardBuilder()
+        self.kb = KB
+        self._background = set()  # strong refs to running background jobs
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
-        
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
     
     async def show_menu(self, update: Update):
         """Show AI menu."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
-            
-        message = (
-            "🤖 **AI Assistant**\n\n"
-            "I can help you organize and understand your data.\n\n"
-            "Choose an action:"
-        )
-        
-        keyboard = [
-            [
-                InlineKeyboardButton("🏷️ Auto-Tag Items", callback_data=self.kb.encode_callback('ai_tag')),
-                InlineKeyboardButton("📝 Summarize Tasks", callback_data=self.kb.encode_callback('ai_summarize_tasks'))
-            ],
-            [
-                InlineKeyboardButton("🔍 Smart Search", callback_data=self.kb.encode_callback('quick_search'))
-            ],
-            [
-                InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Menu", callback_data=self.kb.encode_callback('main_menu'))
-            ]
-        ]
         
         if update.callback_query:
-            await update.callback_query.edit_message_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
+            await safe_edit(
+                update.callback_query,
+                _AI_MENU_MSG,
+                entities=_AI_MENU_ENTITIES,
+                reply_markup=_AI_MENU_KB
             )
         else:
             await update.message.reply_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
+                _AI_MENU_MSG,
+                entities=_AI_MENU_ENTITIES,
+                reply_markup=_AI_MENU_KB
             )
 
     async def handle_auto_tag(self, update: Update):
         """Suggest tags for untagged items."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
-            
-        await update.callback_query.edit_message_text("🤖 Analyzing your data... This may take a moment.")
         
-        # Get untagged passwords (example)
-        passwords = self.db.get_passwords(user_id)
-        untagged = [p for p in passwords if not p.get('tags')]
+        if not await self._begin_job(update, 'auto_tag', "🤖 Analyzing your data... This may take a moment."):
+            return
+        self._spawn(update, 'auto_tag', self._auto_tag(update, user_id))
+    
+    async def _auto_tag(self, update: Update, user_id: str):
+        """Build tag suggestions and replace the placeholder message."""
+        # Get one batch of untagged passwords (filtered in the database)
+        untagged = await asyncio.to_thread(self.db.get_untagged_passwords, user_id, TAG_BATCH_SIZE)
         
         if not untagged:
-            await update.callback_query.edit_message_text(
+            await safe_edit(
+                update.callback_query,
                 "✅ All your items are already tagged!",
                 reply_markup=self.kb.back_to_menu('menu_ai')
             )
             return
             
-        # Process first 3 untagged items to avoid hitting rate limits
-        suggestions = []
-        for item in untagged[:3]:
-            service_name = item['service_name']
-            suggested = self.ai_client.suggest_tags(service_name, "password")
-            suggestions.append(f"• **{service_name}**: {', '.join(suggested)}")
-            
-            # Auto-save tags (optional, for now just suggest)
-            # self.db.update_password_tags(item['id'], suggested)
+        # Process the batch of untagged items (a single AI call)
+        suggested_tags = await self.ai_client.asuggest_tags_batch(
+            [(item['service_name'], "password") for item in untagged]
+        )
+        suggestions = [
+            f"• **{item['service_name']}**: {', '.join(suggested)}"
+            for item, suggested in zip(untagged, suggested_tags)
+        ]
             
         msg = (
             "🏷️ **Tag Suggestions**\n\n"
@@ -127,7 +134,8 @@ class AIHandler:
             [InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Menu", callback_data=self.kb.encode_callback('menu_ai'))]
         ]
         
-        await update.callback_query.edit_message_text(
+        await safe_edit(
+            update.callback_query,
             msg,
             reply_markup=InlineKeyboardMarkup(keyboard),
             parse_mode='Markdown'
@@ -136,37 +144,44 @@ class AIHandler:
     async def handle_apply_tags(self, update: Update):
         """Apply suggested tags to items."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
-        await update.callback_query.edit_message_text("🤖 Applying tags... This may take a moment.")
-        
-        # Get untagged passwords
-        passwords = self.db.get_passwords(user_id)
-        untagged = [p for p in passwords if not p.get('tags')]
+        if not await self._begin_job(update, 'apply_tags', "🤖 Applying tags... This may take a moment."):
+            return
+        self._spawn(update, 'apply_tags', self._apply_tags(update, user_id))
+    
+    async def _apply_tags(self, update: Update, user_id: str):
+        """Save tag suggestions for one batch of untagged items and report the result."""
+        # Get one batch of untagged passwords (filtered in the database)
+        untagged = await asyncio.to_thread(self.db.get_untagged_passwords, user_id, TAG_BATCH_SIZE)
         
         if not untagged:
-            await update.callback_query.edit_message_text(
+            await safe_edit(
+                update.callback_query,
                 "✅ No untagged items found!",
                 reply_markup=self.kb.back_to_menu('menu_ai')
             )
             return
             
-        count = 0
-        # Process first 3 untagged items
-        for item in untagged[:3]:
-            service_name = item['service_name']
-            suggested = self.ai_client.suggest_tags(service_name, "password")
-            
-            if suggested:
-                # Update password with new tags
-                if self.db.update_password_tags(item['id'], suggested):
-                    count += 1
+        # Process the batch of untagged items (a single AI call)
+        suggested_tags = await self.ai_client.asuggest_tags_batch(
+            [(item['service_name'], "password") for item in untagged]
+        )
+        updates = [
+            {'id': item['id'], 'tags': suggested}
+            for item, suggested in zip(untagged, suggested_tags)
+            if suggested
+        ]
         
-        await update.callback_query.edit_message_text(
+        # One database request for the whole batch
+        count = await asyncio.to_thread(self.db.update_password_tags_batch, user_id, updates)
+        
+        await safe_edit(
+            update.callback_query,
             f"✅ Successfully auto-tagged {count} items!\n\n"
             "They are now organized and easier to find.",
             reply_markup=self.kb.back_to_menu('menu_ai')
@@ -175,32 +190,101 @@ class AIHandler:
     async def handle_summarize_tasks(self, update: Update):
         """Summarize tasks."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
-            
-        await update.callback_query.edit_message_text("🤖 Generating summary...")
         
-        tasks = self.db.get_tasks(user_id)
+        if not await self._begin_job(update, 'summarize', "🤖 Generating summary..."):
+            return
+        self._spawn(update, 'summarize', self._summarize_tasks(update, user_id))
+    
+    async def _summarize_tasks(self, update: Update, user_id: str):
+        """Summarize the user's tasks and replace the placeholder message."""
+        tasks = await asyncio.to_thread(self.db.get_tasks_cached, user_id)
         
-        # Decrypt content
-        for task in tasks:
-            task['encrypted_content'] = self.encryption.decrypt(task['encrypted_content'])
+        # Decrypt into a lightweight payload; the fetched rows are left untouched
+        plains = await asyncio.to_thread(
+            self.encryption.decrypt_many_cached, [task['encrypted_content'] for task in tasks]
+        )
+        payload = [
+            {'content': plain, 'priority': task.get('priority', 'medium'), 'status': task.get('status', 'pending')}
+            for task, plain in zip(tasks, plains)
+        ]
             
-        summary = self.ai_client.summarize_tasks(tasks)
+        summary = await self.ai_client.asummarize_tasks(payload)
         
-        await update.callback_query.edit_message_text(
+        await safe_edit(
+            update.callback_query,
             f"📝 **Task Summary**\n\n{summary}",
             reply_markup=self.kb.back_to_menu('menu_ai'),
             parse_mode='Markdown'
         )
 
+    async def _begin_job(self, update: Update, job: str, placeholder: str) -> bool:
+        """
+        Register a background job and show its placeholder message.
+        
+        Args:
+            update: Telegram update from the button tap
+            job: Job name
+            placeholder: Text shown while the job runs
+            
+        Returns:
+            True if the job should be spawned, False if it is already running
+        """
+        telegram_id = update.effective_user.id
+        if not self.session.begin_job(telegram_id, job):
+            try:
+                await update.callback_query.answer("⏳ Already working on it, please wait...")
+            except TelegramError as e:
+                logger.debug(f"Could not answer callback query: {e}")  # Already acknowledged
+            return False
+        
+        try:
+            await safe_edit(update.callback_query, placeholder)
+        except Exception:
+            # _spawn never runs, so release the job here or it stays locked
+            self.session.end_job(telegram_id, job)
+            raise
+        return True
+    
+    def _spawn(self, update: Update, job: str, coro):
+        """
+        Run a slow AI job in the background so the callback returns immediately.
+        
+        Args:
+            update: Telegram update (the job was registered with begin_job)
+            job: Job name
+            coro: Coroutine doing the work and editing the message when done
+        """
+        telegram_id = update.effective_user.id
+        
+        async def runner():
+            try:
+                await coro
+            except Exception as e:
+                logger.error(f"Background AI job '{job}' failed: {e}", exc_info=True)
+                try:
+                    await safe_edit(
+                        update.callback_query,
+                        "❌ Something went wrong. Please try again.",
+                        reply_markup=self.kb.back_to_menu('menu_ai')
+                    )
+                except Exception:
+                    logger.debug("Could not edit message to show error")
+            finally:
+                self.session.end_job(telegram_id, job)
+        
+        task = asyncio.create_task(runner())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
     async def _send_auth_error(self, update: Update):
         """Send authentication error message."""
         msg = "❌ Session expired. Please /start again."
         if update.callback_query:
-            await update.callback_query.edit_message_text(msg)
+            await safe_edit(update.callback_query, msg)
         else:
             await update.message.reply_text(msg)
@@ -3,18 +3,81 @@ QuikSafe Bot - Callback Query Handler
 Central router for handling inline keyboard callbacks.
 """
 
-from telegram import Update, CallbackQuery
+from telegram import Update, CallbackQuery, MessageEntity
 from telegram.ext import ContextTypes
 from telegram.error import BadRequest
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
+from src.utils.tg_ratelimit import safe_edit
+from src.utils.formatters import bold_entities, utf16_len
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Static menu messages and keyboards, built once at import. Bold spans are sent
+# as precomputed entities instead of having Telegram parse Markdown.
+_MAIN_MENU_PREFIX = "👋 "
+_MAIN_MENU_SUFFIX = (
+    "\n\n"
+    "What would you like to do today?\n\n"
+    "Choose a category below:"
+)
+_MAIN_MENU_TITLE_OFFSET = utf16_len(_MAIN_MENU_PREFIX)
+_MAIN_MENU_KB = KB.main_menu()
+
+_PASSWORD_MENU_MSG, _PASSWORD_MENU_ENTITIES = bold_entities(
+    "🔐 **Password Management**\n\n"
+    "Securely manage your passwords with AES-256 encryption.\n\n"
+    "What would you like to do?"
+)
+_PASSWORD_MENU_KB = KB.password_menu()
+
+_TASK_MENU_MSG, _TASK_MENU_ENTITIES = bold_entities(
+    "✅ **Task Management**\n\n"
+    "Organize and track your tasks efficiently.\n\n"
+    "Choose an option:"
+)
+_TASK_MENU_KB = KB.task_menu()
+
+_FILE_MENU_MSG, _FILE_MENU_ENTITIES = bold_entities(
+    "📁 **File Management**\n\n"
+    "Store and organize your files securely.\n\n"
+    "Browse by category or view all:"
+)
+_FILE_MENU_KB = KB.file_menu()
+
+_SEARCH_MENU_MSG, _SEARCH_MENU_ENTITIES = bold_entities(
+    "🔍 **Smart Search**\n\n"
+    "Search across all your passwords, tasks, and files.\n\n"
+    "Type your search query or use /search <query>"
+)
+_SEARCH_MENU_KB = KB.back_to_menu('main')
+
+_UPLOAD_FILE_MSG, _UPLOAD_FILE_ENTITIES = bold_entities(
+    "📁 **Upload File**\n\n"
+    "Simply send any file, photo, or video to this chat.\n"
+    "I'll save it securely for you!"
+)
+_QUICK_SEARCH_MSG, _QUICK_SEARCH_ENTITIES = bold_entities(
+    "🔍 **Smart Search**\n\n"
+    "Search across all your data.\n\n"
+    "Use: /search <your query>\n"
+    "Example: /search work passwords"
+)
+
+# Actions allowed without an authenticated session
+_PUBLIC_ACTIONS = frozenset({'main_menu', 'noop'})
+
 
 class CallbackHandler:
     """Central handler for all callback queries from inline keyboards."""
     
+    __slots__ = (
+        'db', 'encryption', 'session', 'ai_client', 'kb',
+        'password_handler', 'task_handler', 'file_handler', 'ai_handler',
+        'search_handler', 'settings_handler', 'scene_manager',
+        '_exact', '_prefix',
+    )
+    
     def __init__(self, db, encryption, session, ai_client, password_handler=None, task_handler=None, file_handler=None, ai_handler=None, search_handler=None, settings_handler=None, scene_manager=None):
         """
         Initialize callback handler.
@@ -35,7 +98,7 @@ class CallbackHandler:
         self.encryption = encryption
         self.session = session
         self.ai_client = ai_client
-        self.kb = KeyboardBuilder()
+        self.kb = KB
         
         self.password_handler = password_handler
         self.task_handler = task_handler
@@ -44,6 +107,34 @@ class CallbackHandler:
         self.search_handler = search_handler
         self.settings_handler = settings_handler
         self.scene_manager = scene_manager
+        
+        # Dispatch tables, built once: exact actions take (update, context),
+        # prefix/wizard actions take (update, context, action, data)
+        self._exact = {
+            'main_menu': self._show_main_menu,
+            'menu_passwords': self._show_password_menu,
+            'menu_tasks': self._show_task_menu,
+            'menu_files': self._show_file_menu,
+            'menu_search': self._show_search_menu,
+            'menu_ai': self._show_ai_menu,
+            'menu_settings': self._show_settings_menu,
+            'quick_save_password': self._quick_save_password,
+            'quick_add_task': self._quick_add_task,
+            'quick_upload_file': self._quick_upload_file,
+            'quick_search': self._quick_search,
+            'cancel': self._handle_cancel,
+        }
+        self._prefix = {
+            'password': self._handle_password_action,
+            'task': self._handle_task_action,
+            'file': self._handle_file_action,
+            'ai': self._handle_ai_action,
+            'settings': self._handle_settings_action,
+            # Wizard actions (skip buttons, priority selection, etc.)
+            'set': self._handle_wizard_action,
+            'wizard': self._handle_wizard_action,
+            'select': self._handle_wizard_action,
+        }
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -61,198 +152,133 @@ class CallbackHandler:
         action = data.get('a', '')
         
         # Check authentication for protected actions
-        if not action.startswith('main_menu') and action != 'noop':
-            if not self._check_auth(update.effective_user.id):
-                await query.edit_message_text(
+        if action not in _PUBLIC_ACTIONS:
+            if self._check_auth(update.effective_user.id) is None:
+                await safe_edit(
+                    query,
                     "❌ Session expired. Please /start again to authenticate."
                 )
                 return
         
+        # Any screen change on this message supersedes a pending password redaction;
+        # copy only replies below, so the details stay up and still need masking
+        if self.password_handler and action != 'password_copy':
+            self.password_handler.cancel_redaction(query.message)
+        
         # Route to appropriate handler
         try:
             if action == 'noop':
                 # No operation (e.g., page indicator button)
                 return
             
-            # Main menu actions
-            elif action == 'main_menu':
-                await self._show_main_menu(update, context)
-            
-            # Category menus
-            elif action == 'menu_passwords':
-                await self._show_password_menu(update, context)
-            elif action == 'menu_tasks':
-                await self._show_task_menu(update, context)
-            elif action == 'menu_files':
-                await self._show_file_menu(update, context)
-            elif action == 'menu_search':
-                await self._show_search_menu(update, context)
-            elif action == 'menu_ai':
-                await self._show_ai_menu(update, context)
-            elif action == 'menu_settings':
-                await self._show_settings_menu(update, context)
-            
-            # Quick actions
-            elif action == 'quick_save_password':
-                await self._quick_save_password(update, context)
-            elif action == 'quick_add_task':
-                await self._quick_add_task(update, context)
-            elif action == 'quick_upload_file':
-                await self._quick_upload_file(update, context)
-            elif action == 'quick_search':
-                await self._quick_search(update, context)
-            
-            # Password actions
-            elif action.startswith('password_'):
-                await self._handle_password_action(update, context, action, data)
-            
-            # Task actions
-            elif action.startswith('task_'):
-                await self._handle_task_action(update, context, action, data)
-            
-            # File actions
-            elif action.startswith('file_'):
-                await self._handle_file_action(update, context, action, data)
-            
-            # AI actions
-            elif action.startswith('ai_'):
-                await self._handle_ai_action(update, context, action, data)
-            
-            # Settings actions
-            elif action.startswith('settings_'):
-                await self._handle_settings_action(update, context, action, data)
-            
-            # Wizard actions (skip buttons, priority selection, etc.)
-            elif action == 'wizard_skip' or action.startswith('set_') or action == 'select_priority':
-                await self._handle_wizard_action(update, context, action, data)
-            
-            # Generic actions
-            elif action == 'cancel':
-                await self._handle_cancel(update, context)
+            handler = self._exact.get(action)
+            if handler is not None:
+                await handler(update, context)
+                return
             
+            handler = self._prefix.get(action.partition('_')[0])
+            if handler is not None:
+                await handler(update, context, action, data)
             else:
                 logger.warning(f"Unknown callback action: {action}")
-                await query.edit_message_text(
+                await safe_edit(
+                    query,
                     f"⚠️ Unknown action. Please try again or /start to return to main menu."
                 )
         
-        except BadRequest as e:
-            # Handle the case where message content is identical (user clicked same button twice)
-            if "message is not modified" in str(e).lower():
-                logger.debug(f"Message not modified for action '{action}' - content is identical")
-                # Just answer the callback query without editing the message
-                return
-            else:
-                # Other BadRequest errors should still be logged
-                user_id = update.effective_user.id if update.effective_user else 'unknown'
-                logger.error(f"BadRequest handling callback '{action}' for user {user_id}: {e}", exc_info=True)
-                logger.error(f"Callback data: {data}")
-                try:
-                    await query.edit_message_text(
-                        "❌ An error occurred. Please try again or /start to return to main menu."
-                    )
-                except BadRequest:
-                    # If we can't edit the message, just log it
-                    logger.debug("Could not edit message to show error")
-        
         except Exception as e:
-            user_id = update.effective_user.id if update.effective_user else 'unknown'
-            logger.error(f"Error handling callback '{action}' for user {user_id}: {e}", exc_info=True)
-            logger.error(f"Callback data: {data}")
-            try:
-                await query.edit_message_text(
-                    "❌ An error occurred. Please try again or /start to return to main menu."
-                )
-            except BadRequest:
-                # If we can't edit the message, just log it
-                logger.debug("Could not edit message to show error")
+            await self._report_error(update, action, data, e)
     
-    def _check_auth(self, telegram_id: int) -> bool:
-        """Check if user is authenticated."""
-        return self.session.is_authenticated(telegram_id)
+    async def _report_error(self, update: Update, action: str, data: dict, exc: Exception):
+        """
+        Log a failed callback and tell the user, kept off the handle_callback fast path.
+        
+        Args:
+            update: Telegram update
+            action: Decoded callback action
+            data: Decoded callback data
+            exc: Raised exception
+        """
+        bad_request = isinstance(exc, BadRequest)
+        
+        # Handle the case where message content is identical (user clicked same button twice)
+        if bad_request and "message is not modified" in str(exc).lower():
+            logger.debug(f"Message not modified for action '{action}' - content is identical")
+            return
+        
+        user_id = update.effective_user.id if update.effective_user else 'unknown'
+        kind = "BadRequest handling" if bad_request else "Error handling"
+        logger.error(f"{kind} callback '{action}' for user {user_id}: {exc}", exc_info=exc)
+        logger.error(f"Callback data: {data}")
+        try:
+            await safe_edit(
+                update.callback_query,
+                "❌ An error occurred. Please try again or /start to return to main menu."
+            )
+        except BadRequest:
+            # If we can't edit the message, just log it
+            logger.debug("Could not edit message to show error")
     
-    def _get_user_id(self, telegram_id: int) -> str:
-        """Get user ID from session."""
-        session_data = self.session.get_session(telegram_id)
-        return session_data.get('user_id') if session_data else None
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
     
     # ==================== Menu Handlers ====================
     
     async def _show_main_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show main menu."""
         query = update.callback_query
-        user_name = query.from_user.first_name
-        
-        message = (
-            f"👋 **Welcome back, {user_name}!**\n\n"
-            "What would you like to do today?\n\n"
-            "Choose a category below:"
-        )
+        title = f"Welcome back, {query.from_user.first_name}!"
         
-        await query.edit_message_text(
-            message,
-            reply_markup=self.kb.main_menu(),
-            parse_mode='Markdown'
+        await safe_edit(
+            query,
+            _MAIN_MENU_PREFIX + title + _MAIN_MENU_SUFFIX,
+            entities=[MessageEntity(MessageEntity.BOLD, _MAIN_MENU_TITLE_OFFSET, utf16_len(title))],
+            reply_markup=_MAIN_MENU_KB
         )
     
     async def _show_password_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show password management menu."""
         query = update.callback_query
-        message = (
-            "🔐 **Password Management**\n\n"
-            "Securely manage your passwords with AES-256 encryption.\n\n"
-            "What would you like to do?"
-        )
         
-        await query.edit_message_text(
-            message,
-            reply_markup=self.kb.password_menu(),
-            parse_mode='Markdown'
+        await safe_edit(
+            query,
+            _PASSWORD_MENU_MSG,
+            entities=_PASSWORD_MENU_ENTITIES,
+            reply_markup=_PASSWORD_MENU_KB
         )
     
     async def _show_task_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show task management menu."""
         query = update.callback_query
-        message = (
-            "✅ **Task Management**\n\n"
-            "Organize and track your tasks efficiently.\n\n"
-            "Choose an option:"
-        )
         
-        await query.edit_message_text(
-            message,
-            reply_markup=self.kb.task_menu(),
-            parse_mode='Markdown'
+        await safe_edit(
+            query,
+            _TASK_MENU_MSG,
+            entities=_TASK_MENU_ENTITIES,
+            reply_markup=_TASK_MENU_KB
         )
     
     async def _show_file_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show file management menu."""
         query = update.callback_query
-        message = (
-            "📁 **File Management**\n\n"
-            "Store and organize your files securely.\n\n"
-            "Browse by category or view all:"
-        )
         
-        await query.edit_message_text(
-            message,
-            reply_markup=self.kb.file_menu(),
-            parse_mode='Markdown'
+        await safe_edit(
+            query,
+            _FILE_MENU_MSG,
+            entities=_FILE_MENU_ENTITIES,
+            reply_markup=_FILE_MENU_KB
         )
     
     async def _show_search_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show search menu."""
         query = update.callback_query
-        message = (
-            "🔍 **Smart Search**\n\n"
-            "Search across all your passwords, tasks, and files.\n\n"
-            "Type your search query or use /search <query>"
-        )
         
-        await query.edit_message_text(
-            message,
-            reply_markup=self.kb.back_to_menu('main'),
-            parse_mode='Markdown'
+        await safe_edit(
+            query,
+            _SEARCH_MENU_MSG,
+            entities=_SEARCH_MENU_ENTITIES,
+            reply_markup=_SEARCH_MENU_KB
         )
     
     async def _show_ai_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -260,14 +286,14 @@ class CallbackHandler:
         if self.ai_handler:
             await self.ai_handler.show_menu(update)
         else:
-            await query.edit_message_text("❌ AI handler not initialized.")
+            await safe_edit(query, "❌ AI handler not initialized.")
     
     async def _show_settings_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show settings menu."""
         if self.settings_handler:
             await self.settings_handler.show_menu(update)
         else:
-            await update.callback_query.edit_message_text("❌ Settings handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Settings handler not initialized.")
     
     # ==================== Quick Actions ====================
     
@@ -276,31 +302,22 @@ class CallbackHandler:
         if self.password_handler:
             await self.password_handler.start_save_wizard(update)
         else:
-            await update.callback_query.edit_message_text("❌ Handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Handler not initialized.")
     
     async def _quick_add_task(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Quick action: Add task."""
         if self.task_handler:
             await self.task_handler.start_add_wizard(update)
         else:
-            await update.callback_query.edit_message_text("❌ Handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Handler not initialized.")
     
     async def _quick_upload_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Quick action: Upload file."""
-        await update.callback_query.edit_message_text(
-            "📁 **Upload File**\n\n"
-            "Simply send any file, photo, or video to this chat.\n"
-            "I'll save it securely for you!"
-        )
+        await safe_edit(update.callback_query, _UPLOAD_FILE_MSG, entities=_UPLOAD_FILE_ENTITIES)
     
     async def _quick_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Quick action: Search."""
-        await update.callback_query.edit_message_text(
-            "🔍 **Smart Search**\n\n"
-            "Search across all your data.\n\n"
-            "Use: /search <your query>\n"
-            "Example: /search work passwords"
-        )
+        await safe_edit(update.callback_query, _QUICK_SEARCH_MSG, entities=_QUICK_SEARCH_ENTITIES)
     
     # ==================== Action Handlers ====================
     
@@ -308,7 +325,7 @@ class CallbackHandler:
                                       action: str, data: dict):
         """Handle password-related actions."""
         if not self.password_handler:
-            await update.callback_query.edit_message_text("❌ Password handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Password handler not initialized.")
             return
 
         if action == 'password_save_start':
@@ -337,16 +354,16 @@ class CallbackHandler:
             
         elif action == 'password_search':
             # TODO: Implement search
-            await update.callback_query.edit_message_text("Search coming soon!")
+            await safe_edit(update.callback_query, "Search coming soon!")
             
         else:
-            await update.callback_query.edit_message_text(f"Unknown password action: {action}")
+            await safe_edit(update.callback_query, f"Unknown password action: {action}")
     
     async def _handle_task_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                   action: str, data: dict):
         """Handle task-related actions."""
         if not self.task_handler:
-            await update.callback_query.edit_message_text("❌ Task handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Task handler not initialized.")
             return
 
         if action == 'task_add_start':
@@ -383,13 +400,13 @@ class CallbackHandler:
             await update.callback_query.answer("Edit task coming soon!", show_alert=True)
             
         else:
-            await update.callback_query.edit_message_text(f"Unknown task action: {action}")
+            await safe_edit(update.callback_query, f"Unknown task action: {action}")
     
     async def _handle_file_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                   action: str, data: dict):
         """Handle file-related actions."""
         if not self.file_handler:
-            await update.callback_query.edit_message_text("❌ File handler not initialized.")
+            await safe_edit(update.callback_query, "❌ File handler not initialized.")
             return
 
         if action == 'file_list':
@@ -402,7 +419,7 @@ class CallbackHandler:
             
         elif action == 'file_view':
             fid = data.get('file_id')
-            await self.file_handler.show_file_details(update, fid)
+            await self.file_handler.show_file_details(update, fid, data.get('page', 0), data.get('filter'))
             
         elif action == 'file_download':
             fid = data.get('file_id')
@@ -410,7 +427,7 @@ class CallbackHandler:
             
         elif action == 'file_delete':
             fid = data.get('file_id')
-            await self.file_handler.delete_file(update, fid)
+            await self.file_handler.delete_file(update, fid, data.get('page', 0), data.get('filter'))
             
         elif action == 'file_share':
             fid = data.get('file_id')
@@ -421,7 +438,7 @@ class CallbackHandler:
             await update.callback_query.answer("Edit file info coming soon!", show_alert=True)
             
         else:
-            await update.callback_query.edit_message_text(f"Unknown file action: {action}")
+            await safe_edit(update.callback_query, f"Unknown file action: {action}")
     
     async def _handle_ai_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                 action: str, data: dict):
@@ -439,13 +456,13 @@ class CallbackHandler:
             await self.ai_handler.handle_apply_tags(update)
             
         else:
-            await update.callback_query.edit_message_text(f"Unknown AI action: {action}")
+            await safe_edit(update.callback_query, f"Unknown AI action: {action}")
 
     async def _handle_settings_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                       action: str, data: dict):
         """Handle settings-related actions."""
         if not self.settings_handler:
-            await update.callback_query.edit_message_text("❌ Settings handler not initialized.")
+            await safe_edit(update.callback_query, "❌ Settings handler not initialized.")
             return
 
         if action == 'settings_logout':
@@ -470,7 +487,7 @@ class CallbackHandler:
             await self.settings_handler.start_change_password_wizard(update)
             
         else:
-            await update.callback_query.edit_message_text(f"Unknown settings action: {action}")
+            await safe_edit(update.callback_query, f"Unknown settings action: {action}")
 
     async def _handle_wizard_action(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                     action: str, data: dict):
@@ -513,7 +530,8 @@ class CallbackHandler:
         if self.scene_manager:
             self.scene_manager.cancel_scene(update.effective_user.id)
             
-        await update.callback_query.edit_message_text(
+        await safe_edit(
+            update.callback_query,
             "❌ Operation cancelled.\n\n"
             "Use /start to return to the main menu."
         )
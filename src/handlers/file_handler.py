@@ -3,23 +3,56 @@ QuikSafe Bot - File Handler
 Handles file storage and retrieval with modern inline UI.
 """
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import Update, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CommandHandler, MessageHandler, filters
-from src.database.db_manager import DatabaseManager
+from src.database.db_manager import DatabaseManager, FILE_SEND_COLUMNS
 from src.security.encryption import EncryptionManager
 from src.security.auth import SessionManager
 from src.utils.validators import validate_file_name, parse_tags_from_text
 from src.utils.formatters import format_file_list, format_file_details
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
 from src.utils.scene_manager import SceneManager
+from src.utils.tg_ratelimit import safe_edit
+import asyncio
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
+# Characters escaped for Markdown, matched in a single pass
+_MD_ESCAPE_RE = re.compile(r'[_*\[\]()~`>#+\-=|{}.!]')
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+FILES_PER_PAGE = 5
+
+# Reply method and argument used to resend a file, by MIME type
+_SEND_BY_TYPE = (
+    ('image', 'reply_photo', 'photo'),
+    ('video', 'reply_video', 'video'),
+    ('audio', 'reply_audio', 'audio')
+)
+
+# Static button rows, built once at import
+_FILTER_ROW = (
+    InlineKeyboardButton("All", callback_data=KB.encode_callback('file_list', p=0)),
+    InlineKeyboardButton("Images", callback_data=KB.encode_callback('file_list', p=0, f='image')),
+    InlineKeyboardButton("Docs", callback_data=KB.encode_callback('file_list', p=0, f='application'))
+)
+_BACK_TO_MENU_ROW = (
+    InlineKeyboardButton(f"{KB.EMOJI['back']} Back to Menu", callback_data=KB.encode_callback('main_menu')),
+)
+_FILE_SAVED_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton(f"{KB.EMOJI['view']} View List", callback_data=KB.encode_callback('file_list', p=0)),
+    InlineKeyboardButton(f"{KB.EMOJI['add']} Upload Another", callback_data=KB.encode_callback('quick_upload_file'))
+]])
+
 
 class FileHandler:
     """Handles file storage and retrieval operations."""
     
+    __slots__ = ('db', 'encryption', 'session', 'kb', 'scene_manager')
+    
     def __init__(self, db: DatabaseManager, encryption: EncryptionManager, session: SessionManager, scene_manager: SceneManager):
         """
         Initialize file handler.
@@ -33,131 +66,126 @@ class FileHandler:
         self.db = db
         self.encryption = encryption
         self.session = session
-        self.kb = KeyboardBuilder()
+        self.kb = KB
         self.scene_manager = scene_manager
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
+    
+    async def _require_auth(self, update) -> str | None:
+        """
+        Resolve the user's ID, sending the session-expired message if not authenticated.
         
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+        Args:
+            update: Telegram Update or CallbackQuery
+            
+        Returns:
+            User UUID, or None if the caller should stop
+        """
+        user_id = self._check_auth(self._user(update).id)
+        if user_id is None:
+            await self._send_auth_error(update)
+        return user_id
+    
+    @staticmethod
+    def _user(update):
+        """Return the Telegram user behind an Update or a bare CallbackQuery."""
+        return update.effective_user if isinstance(update, Update) else update.from_user
     
     # ==================== Inline UI Methods ====================
     
     async def show_file_list(self, update: Update, page: int = 0, type_filter: str = None):
         """Show paginated list of files."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
-        
-        if not is_auth:
-            await self._send_auth_error(update)
+        user_id = await self._require_auth(update)
+        if user_id is None:
             return
         
-        # Get files (TODO: Add type filter in DB)
-        files = self.db.get_files(user_id)
+        total_files = self.db.count_files(user_id, type_prefix=type_filter)
+        page = self._clamp_page(page, total_files)
         
-        # Filter by type if requested
-        if type_filter:
-            files = [f for f in files if type_filter in f['file_type']]
-        
-        # Pagination logic
-        items_per_page = 5
-        total_pages = (len(files) + items_per_page - 1) // items_per_page
+        if total_files:
+            current_page_items = self.db.get_files(
+                user_id, type_prefix=type_filter, limit=FILES_PER_PAGE, offset=page * FILES_PER_PAGE
+            )
+        else:
+            current_page_items = []
         
-        if page >= total_pages and total_pages > 0:
-            page = total_pages - 1
+        await self._render_file_list(update, current_page_items, page, total_files, type_filter)
+
+    async def _render_file_list(self, update: Update, current_page_items: list, page: int,
+                                total_files: int, type_filter: str = None):
+        """
+        Render one page of the file list from already-fetched rows.
         
-        start_idx = page * items_per_page
-        end_idx = start_idx + items_per_page
-        current_page_items = files[start_idx:end_idx]
+        Args:
+            update: Telegram Update or CallbackQuery
+            current_page_items: File entries on this page
+            page: Page number (0-indexed, already clamped)
+            total_files: Total number of files across all pages
+            type_filter: Optional MIME type prefix the list is filtered by
+        """
+        total_pages = (total_files + FILES_PER_PAGE - 1) // FILES_PER_PAGE
         
-        # Build message
+        # Build message and item buttons in one pass
         filter_text = f" ({type_filter})" if type_filter else ""
-        if not files:
+        keyboard = []
+        if not total_files:
             message = f"📁 **No files found{filter_text}.**\n\nSend any file to the bot to save it!"
         else:
-            message = f"📁 **Your Files**{filter_text} ({len(files)} total)\n\n"
+            # Bind per-row helpers once for the loop
+            encode = self.kb.encode_callback
+            escape = self._escape_markdown
+            format_size = self._format_size
+            
+            parts = [f"📁 **Your Files**{filter_text} ({total_files} total)\n"]
             for i, f in enumerate(current_page_items, 1):
+                name = f['file_name']
                 icon = "🖼️" if "image" in f['file_type'] else "📄"
-                escaped_name = self._escape_markdown(f['file_name'])
-                message += f"{i}. {icon} **{escaped_name}** ({self._format_size(f['file_size'])})\n"
-        
-        # Build keyboard
-        keyboard = []
-        
-        # Item buttons
-        for f in current_page_items:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"👁️ {f['file_name'][:20]}...",
-                    callback_data=self.kb.encode_callback('file_view', fid=f['id'])
-                )
-            ])
+                parts.append(f"{i}. {icon} **{escape(name)}** ({format_size(f['file_size'])})")
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"👁️ {name[:20]}...",
+                        callback_data=encode('file_view', fid=f['id'], p=page, f=type_filter)
+                    )
+                ])
+            message = "\n".join(parts)
         
         # Pagination buttons
         if total_pages > 1:
-            pagination = self.kb.pagination(page, total_pages, 'file_list')
+            pagination = self.kb.pagination(page, total_pages, 'file_list', f=type_filter)
             keyboard.append(pagination)
         
-        # Filter buttons
-        keyboard.append([
-            InlineKeyboardButton("All", callback_data=self.kb.encode_callback('file_list', p=0)),
-            InlineKeyboardButton("Images", callback_data=self.kb.encode_callback('file_list', p=0, f='image')),
-            InlineKeyboardButton("Docs", callback_data=self.kb.encode_callback('file_list', p=0, f='application'))
-        ])
-        
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['back']} Back to Menu",
-                callback_data=self.kb.encode_callback('main_menu')
-            )
-        ])
+        # Filter and back buttons
+        keyboard.append(_FILTER_ROW)
+        keyboard.append(_BACK_TO_MENU_ROW)
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        # Handle both Update and CallbackQuery objects
-        if hasattr(update, 'callback_query') and update.callback_query:
-            # update is an Update object
-            await update.callback_query.edit_message_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        elif hasattr(update, 'edit_message_text'):
-            # update is a CallbackQuery object
-            await update.edit_message_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        else:
-            # update is a Message object
-            await update.message.reply_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
+        await self._reply(update, message, reply_markup)
 
-    async def show_file_details(self, update: Update, file_id: str):
-        """Show details for a specific file."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
-        
-        if not is_auth:
-            await self._send_auth_error(update)
+    @staticmethod
+    def _clamp_page(page: int, total_files: int) -> int:
+        """Clamp a page number to the last page that has files."""
+        total_pages = (total_files + FILES_PER_PAGE - 1) // FILES_PER_PAGE
+        if page >= total_pages and total_pages > 0:
+            return total_pages - 1
+        return page
+
+    async def show_file_details(self, update: Update, file_id: str, page: int = 0, type_filter: str = None):
+        """Show details for a specific file (page and type_filter describe the list to return to)."""
+        user_id = await self._require_auth(update)
+        if user_id is None:
             return
         
         # Get file details
-        files = self.db.get_files(user_id)
-        file_entry = next((f for f in files if str(f['id']) == str(file_id)), None)
+        file_entry = self.db.get_file_by_id(file_id, user_id)
         
         if not file_entry:
             await self._send_error(update, "File not found.")
             return
         
-        # Decrypt description
+        # Decrypt description only when there is one to show
         description = ""
         if file_entry.get('encrypted_description'):
             description = self.encryption.decrypt(file_entry['encrypted_description'])
@@ -165,108 +193,85 @@ class FileHandler:
         message = format_file_details(file_entry, description)
         
         # Action buttons
-        reply_markup = self.kb.file_actions(file_id)
+        reply_markup = self.kb.file_actions(file_id, page, type_filter)
         
-        # Handle both Update and CallbackQuery objects
-        if hasattr(update, 'callback_query') and update.callback_query:
-            await update.callback_query.edit_message_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        elif hasattr(update, 'edit_message_text'):
-            await update.edit_message_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
-        else:
-            await update.message.reply_text(
-                message,
-                reply_markup=reply_markup,
-                parse_mode='Markdown'
-            )
+        await self._reply(update, message, reply_markup)
 
     async def download_file(self, update: Update, file_id: str):
         """Send the file to the user."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = await self._require_auth(update)
+        if user_id is None:
+            return
         
-        # Get file details
-        files = self.db.get_files(user_id)
-        file_entry = next((f for f in files if str(f['id']) == str(file_id)), None)
+        # Only what is needed to resend the file; the description stays encrypted in the DB
+        file_entry = self.db.get_file_by_id(file_id, user_id, columns=FILE_SEND_COLUMNS)
         
         if not file_entry:
             await update.callback_query.answer("File not found", show_alert=True)
             return
             
-        tg_file_id = file_entry['file_id']
-        caption = f"📎 {file_entry['file_name']}"
-        
-        try:
-            # Send file based on type
-            if 'image' in file_entry['file_type']:
-                await update.callback_query.message.reply_photo(photo=tg_file_id, caption=caption)
-            elif 'video' in file_entry['file_type']:
-                await update.callback_query.message.reply_video(video=tg_file_id, caption=caption)
-            elif 'audio' in file_entry['file_type']:
-                await update.callback_query.message.reply_audio(audio=tg_file_id, caption=caption)
-            else:
-                await update.callback_query.message.reply_document(document=tg_file_id, caption=caption)
-            
-            await update.callback_query.answer("File sent!")
-        except Exception as e:
-            logger.error(f"Failed to send file: {e}")
-            await update.callback_query.answer("Failed to retrieve file", show_alert=True)
+        await self._send_file(update.callback_query, file_entry, "File sent!", "Failed to retrieve file")
 
-    async def delete_file(self, update: Update, file_id: str):
-        """Delete a file."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+    async def delete_file(self, update: Update, file_id: str, page: int = 0, type_filter: str = None):
+        """Delete a file and re-render the (filtered) list page it was opened from."""
+        user_id = await self._require_auth(update)
+        if user_id is None:
+            return
         
         if self.db.delete_file(file_id, user_id):
             await update.callback_query.answer("File deleted")
-            await self.show_file_list(update, 0)
+            # Only the page being shown is fetched, with the same filter as before
+            await self.show_file_list(update, page, type_filter)
         else:
             await update.callback_query.answer("Failed to delete", show_alert=True)
 
     async def share_file(self, update: Update, file_id: str):
         """Share a file (send it to the chat)."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = await self._require_auth(update)
+        if user_id is None:
+            return
         
-        # Get file details
-        files = self.db.get_files(user_id)
-        file_entry = next((f for f in files if str(f['id']) == str(file_id)), None)
+        # Only what is needed to resend the file; the description stays encrypted in the DB
+        file_entry = self.db.get_file_by_id(file_id, user_id, columns=FILE_SEND_COLUMNS)
         
         if not file_entry:
             await update.callback_query.answer("File not found", show_alert=True)
             return
             
+        await self._send_file(update.callback_query, file_entry, "File shared!", "Failed to share file")
+
+    async def _send_file(self, query, file_entry: dict, ok_text: str, fail_text: str):
+        """
+        Send a stored file back to the chat with the reply method for its type.
+        
+        Args:
+            query: Telegram CallbackQuery
+            file_entry: File entry with file_id, file_name and file_type
+            ok_text: Callback answer on success
+            fail_text: Callback answer on failure
+        """
         tg_file_id = file_entry['file_id']
         caption = f"📎 {file_entry['file_name']}"
+        file_type = file_entry['file_type']
+        
+        method, kwarg = 'reply_document', 'document'
+        for prefix, send_method, send_kwarg in _SEND_BY_TYPE:
+            if prefix in file_type:
+                method, kwarg = send_method, send_kwarg
+                break
         
         try:
-            # Send file based on type
-            if 'image' in file_entry['file_type']:
-                await update.callback_query.message.reply_photo(photo=tg_file_id, caption=caption)
-            elif 'video' in file_entry['file_type']:
-                await update.callback_query.message.reply_video(video=tg_file_id, caption=caption)
-            elif 'audio' in file_entry['file_type']:
-                await update.callback_query.message.reply_audio(audio=tg_file_id, caption=caption)
-            else:
-                await update.callback_query.message.reply_document(document=tg_file_id, caption=caption)
-            
-            await update.callback_query.answer("File shared!")
+            await getattr(query.message, method)(caption=caption, **{kwarg: tg_file_id})
+            await query.answer(ok_text)
         except Exception as e:
-            logger.error(f"Failed to share file: {e}")
-            await update.callback_query.answer("Failed to share file", show_alert=True)
+            logger.error("Failed to send file: %s", e)
+            await query.answer(fail_text, show_alert=True)
 
     async def handle_file_upload(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle file upload (direct message)."""
-        is_auth, user_id = self._check_auth(update.effective_user.id)
+        user_id = self._check_auth(update.effective_user.id)
         
-        if not is_auth:
+        if user_id is None:
             await update.message.reply_text("❌ Please /start and authenticate first.")
             return
         
@@ -307,11 +312,18 @@ class FileHandler:
         
         # Get caption as description
         description = update.message.caption or ""
-        tags = parse_tags_from_text(description) if description else []
-        encrypted_description = self.encryption.encrypt(description) if description else ""
+        if description:
+            # Encrypt off the event loop while tags are parsed
+            encrypting = asyncio.create_task(asyncio.to_thread(self.encryption.encrypt, description))
+            tags = parse_tags_from_text(description)
+            encrypted_description = await encrypting
+        else:
+            tags = []
+            encrypted_description = ""
         
         # Save file metadata
-        result = self.db.save_file(
+        result = await asyncio.to_thread(
+            self.db.save_file,
             user_id=user_id,
             file_id=file.file_id,
             file_name=file_name,
@@ -332,20 +344,9 @@ class FileHandler:
                 f"Tags: {', '.join(escaped_tags) if escaped_tags else 'None'}"
             )
             
-            keyboard = [[
-                InlineKeyboardButton(
-                    f"{self.kb.EMOJI['view']} View List",
-                    callback_data=self.kb.encode_callback('file_list', p=0)
-                ),
-                InlineKeyboardButton(
-                    f"{self.kb.EMOJI['add']} Upload Another",
-                    callback_data=self.kb.encode_callback('quick_upload_file')
-                )
-            ]]
-            
             await update.message.reply_text(
                 msg,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_FILE_SAVED_KB,
                 parse_mode='Markdown'
             )
             
@@ -353,26 +354,37 @@ class FileHandler:
             try:
                 await update.message.delete()
             except Exception as e:
-                logger.warning(f"Could not delete file message: {e}")
+                logger.warning("Could not delete file message: %s", e)
                 
         else:
             await update.message.reply_text("❌ Failed to save file. Please try again.")
 
     def _format_size(self, size_bytes: int) -> str:
         """Format file size."""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024.0:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024.0
-        return f"{size_bytes:.1f} TB"
+        if size_bytes <= 0:
+            return "0.0 B"
+        idx = min((int(size_bytes).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+        return f"{size_bytes / (1 << (idx * 10)):.1f} {_SIZE_UNITS[idx]}"
+
+    async def _reply(self, update, text: str, reply_markup=None, parse_mode: str | None = 'Markdown'):
+        """
+        Edit the callback message, or reply to the user's message.
+        
+        Args:
+            update: Telegram Update or CallbackQuery
+            text: Message text
+            reply_markup: Optional inline keyboard
+            parse_mode: Parse mode for the text
+        """
+        query = update if isinstance(update, CallbackQuery) else update.callback_query
+        if query is not None:
+            await safe_edit(query, text, reply_markup=reply_markup, parse_mode=parse_mode)
+        else:
+            await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
 
     async def _send_auth_error(self, update: Update):
         """Send authentication error message."""
-        msg = "❌ Session expired. Please /start again."
-        if update.callback_query:
-            await update.callback_query.edit_message_text(msg)
-        else:
-            await update.message.reply_text(msg)
+        await self._reply(update, "❌ Session expired. Please /start again.", parse_mode=None)
 
     async def _send_error(self, update: Update, text: str):
         """Send generic error message."""
@@ -400,7 +412,4 @@ class FileHandler:
 
     def _escape_markdown(self, text: str) -> str:
         """Escape special characters for Markdown."""
-        special_chars = ['_', '*', '[', ']', '(', ')', '~', '`', '>', '#', '+', '-', '=', '|', '{', '}', '.', '!']
-        for char in special_chars:
-            text = text.replace(char, f"\\{char}")
-        return text
+        return _MD_ESCAPE_RE.sub(r'\\\g<0>', text)
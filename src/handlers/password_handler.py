@@ -3,20 +3,113 @@ QuikSafe Bot - Password Handler
 Handles password management with modern inline UI and wizards.
 """
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import Update, Message, MessageEntity, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters
+from telegram.error import TelegramError
 from src.database.db_manager import DatabaseManager
+from src.database.write_queue import WriteQueue
 from src.security.encryption import EncryptionManager
 from src.security.auth import SessionManager
 from src.utils.validators import validate_service_name, validate_username, validate_password, parse_tags_from_text, check_password_strength
-from src.utils.formatters import format_password_list, format_password_details
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.formatters import format_password_list, format_password_details, bold_entities, utf16_len
+from src.utils.keyboard_builder import KB
 from src.utils.scene_manager import SceneManager
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Seconds before a message showing a decrypted password is deleted
+SECRET_MESSAGE_TTL = 60
+
+# Password list text pieces; bold spans are sent as entities
+_EMPTY_LIST_MSG, _EMPTY_LIST_ENTITIES = bold_entities(
+    "🔐 **No passwords saved yet.**\n\nUse 'Save New Password' to add one!"
+)
+_LIST_TITLE_PREFIX = "🔐 "
+_LIST_TITLE = "Your Passwords"
+_LIST_TITLE_OFFSET = utf16_len(_LIST_TITLE_PREFIX)
+_LIST_TITLE_LENGTH = utf16_len(_LIST_TITLE)
+
+# Static button rows, built once at import
+_LIST_ACTIONS_ROW = (
+    InlineKeyboardButton(f"{KB.EMOJI['add']} Add New", callback_data=KB.encode_callback('password_save_start')),
+    InlineKeyboardButton(f"{KB.EMOJI['search']} Search", callback_data=KB.encode_callback('password_search'))
+)
+_BACK_TO_MENU_ROW = (
+    InlineKeyboardButton(f"{KB.EMOJI['back']} Back to Menu", callback_data=KB.encode_callback('main_menu')),
+)
+_PASSWORD_SAVED_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton(f"{KB.EMOJI['view']} View List", callback_data=KB.encode_callback('password_list', p=0)),
+    InlineKeyboardButton(f"{KB.EMOJI['add']} Add Another", callback_data=KB.encode_callback('password_save_start'))
+]])
+
+_SKIP_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton("Skip", callback_data=KB.encode_callback('wizard_skip'))
+]])
+_CANCEL_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton(f"{KB.EMOJI['cancel']} Cancel", callback_data=KB.encode_callback('cancel'))
+]])
+
+# Wizard message templates, filled with str.format_map per request
+_SAVE_WIZARD_START_MSG = (
+    "🔐 **Save New Password**\n\n"
+    "Step 1/4: **Service Name**\n"
+    "Enter the name of the service (e.g., Gmail, Netflix):"
+)
+_SERVICE_ACCEPTED_TMPL = (
+    "✅ Service: **{value}**\n\n"
+    "Step 2/4: **Username/Email**\n"
+    "Enter username (or type 'skip'):"
+).format_map
+_PASSWORD_STEP_MSG = (
+    "Step 3/4: **Password**\n"
+    "Enter the password:"
+)
+_TAGS_STEP_TMPL = (
+    "Password Strength: {strength}\n\n"
+    "Step 4/4: **Tags**\n"
+    "Enter tags (e.g. #work) or skip:"
+).format_map
+_SAVE_SUCCESS_TMPL = (
+    "✅ **Password Saved!**\n\n"
+    "Service: {service}\n"
+    "Tags: {tags}"
+).format_map
+
+
+@dataclass(frozen=True, slots=True)
+class WizardStep:
+    """One data-entry step of the save password wizard."""
+    
+    key: str  # Scene data key the accepted value is stored under
+    validator: Callable[[str], Tuple[bool, Optional[str]]]
+    prompt: Callable[[str], str]  # Builds the next step's prompt from the accepted value
+    reply_markup: Optional[InlineKeyboardMarkup] = None
+    skippable: bool = False  # 'skip' stores an empty value without validation
+
+
+# Steps before the terminal 'tags' step, which saves the entry
+_SAVE_WIZARD_STEPS = {
+    'service_name': WizardStep(
+        'service_name', validate_service_name,
+        lambda value: _SERVICE_ACCEPTED_TMPL({'value': value}),
+        reply_markup=_SKIP_KB
+    ),
+    'username': WizardStep(
+        'username', validate_username,
+        lambda value: _PASSWORD_STEP_MSG,
+        skippable=True
+    ),
+    'password': WizardStep(
+        'password', validate_password,
+        lambda value: _TAGS_STEP_TMPL({'strength': check_password_strength(value)[1]}),
+        reply_markup=_SKIP_KB
+    ),
+}
+
 # Legacy conversation states (kept for backward compatibility if needed)
 AWAITING_SERVICE, AWAITING_USERNAME, AWAITING_PASSWORD, AWAITING_TAGS = range(4)
 
@@ -37,52 +130,73 @@ class PasswordHandler:
         self.db = db
         self.encryption = encryption
         self.session = session
-        self.kb = KeyboardBuilder()
+        self.kb = KB
         self.scene_manager = scene_manager
+        self.save_queue = WriteQueue(db.save_passwords_batch)
+        self._background = set()  # strong refs to scheduled message deletions
+        self._redactions = {}  # (chat_id, message_id) -> pending redaction task
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
-        
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
+    
+    @staticmethod
+    def _user(update):
+        """Return the Telegram user behind an Update or a bare CallbackQuery."""
+        return update.effective_user if isinstance(update, Update) else update.from_user
     
     # ==================== Inline UI Methods ====================
     
-    async def show_password_list(self, update: Update, page: int = 0):
-        """Show paginated list of passwords."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+    async def show_password_list(self, update: Update, page: int = 0, passwords: list = None):
+        """Show paginated list of passwords (optionally from an already-fetched list)."""
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
         
-        # Get all passwords
-        passwords = self.db.get_passwords(user_id)
-        
-        # Pagination logic
         items_per_page = 5
-        total_pages = (len(passwords) + items_per_page - 1) // items_per_page
         
-        if page >= total_pages and total_pages > 0:
-            page = total_pages - 1
+        if passwords is not None:
+            # Already-fetched list (e.g. returned by delete_password_and_list)
+            total_passwords = len(passwords)
+            page = self._clamp_page(page, total_passwords, items_per_page)
+            start_idx = page * items_per_page
+            current_page_items = passwords[start_idx:start_idx + items_per_page]
+        else:
+            # Count and page fetch run concurrently; refetch only if the page ran past the end
+            total_passwords, current_page_items = await asyncio.gather(
+                asyncio.to_thread(self.db.count_passwords, user_id),
+                asyncio.to_thread(self.db.get_passwords, user_id, limit=items_per_page, offset=page * items_per_page)
+            )
+            clamped = self._clamp_page(page, total_passwords, items_per_page)
+            if clamped != page:
+                page = clamped
+                current_page_items = await asyncio.to_thread(
+                    self.db.get_passwords, user_id, limit=items_per_page, offset=page * items_per_page
+                )
         
-        start_idx = page * items_per_page
-        end_idx = start_idx + items_per_page
-        current_page_items = passwords[start_idx:end_idx]
+        total_pages = (total_passwords + items_per_page - 1) // items_per_page
         
         # Build message
-        if not passwords:
-            message = "🔐 **No passwords saved yet.**\n\nUse 'Save New Password' to add one!"
+        # Plain text with bold entities: service names need no Markdown escaping
+        if not total_passwords:
+            message, entities = _EMPTY_LIST_MSG, _EMPTY_LIST_ENTITIES
         else:
-            message = f"🔐 **Your Passwords** ({len(passwords)} total)\n\n"
+            parts = [f"{_LIST_TITLE_PREFIX}{_LIST_TITLE} ({total_passwords} total)\n"]
+            entities = [MessageEntity(MessageEntity.BOLD, _LIST_TITLE_OFFSET, _LIST_TITLE_LENGTH)]
+            offset = utf16_len(parts[0]) + 1
             for i, pwd in enumerate(current_page_items, 1):
-                service = pwd.get('service_name', 'Unknown')
+                service = pwd.get('service_name') or 'Unknown'
                 tags = pwd.get('tags', [])
                 tag_str = f" {', '.join(tags)}" if tags else ""
-                message += f"{i}. **{service}**{tag_str}\n"
+                prefix = f"{i}. "
+                line = f"{prefix}{service}{tag_str}"
+                entities.append(MessageEntity(MessageEntity.BOLD, offset + utf16_len(prefix), utf16_len(service)))
+                parts.append(line)
+                offset += utf16_len(line) + 1
+            message = "\n".join(parts)
         
         # Build keyboard
         keyboard = []
@@ -101,24 +215,9 @@ class PasswordHandler:
             pagination = self.kb.pagination(page, total_pages, 'password_list')
             keyboard.append(pagination)
         
-        # Action buttons
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['add']} Add New",
-                callback_data=self.kb.encode_callback('password_save_start')
-            ),
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['search']} Search",
-                callback_data=self.kb.encode_callback('password_search')
-            )
-        ])
-        
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['back']} Back to Menu",
-                callback_data=self.kb.encode_callback('main_menu')
-            )
-        ])
+        # Action and back buttons
+        keyboard.append(_LIST_ACTIONS_ROW)
+        keyboard.append(_BACK_TO_MENU_ROW)
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         
@@ -127,46 +226,45 @@ class PasswordHandler:
             await update.callback_query.edit_message_text(
                 message,
                 reply_markup=reply_markup,
-                parse_mode='Markdown'
+                entities=entities
             )
         elif hasattr(update, 'edit_message_text'):
             await update.edit_message_text(
                 message,
                 reply_markup=reply_markup,
-                parse_mode='Markdown'
+                entities=entities
             )
         else:
             await update.message.reply_text(
                 message,
                 reply_markup=reply_markup,
-                parse_mode='Markdown'
+                entities=entities
             )
 
     async def show_password_details(self, update: Update, password_id: str):
         """Show details for a specific password."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
         
-        # Get password details
-        # Note: We need a method to get by ID, currently using get_passwords filter
-        # Assuming get_passwords can filter or we iterate. 
-        # Ideally DB manager should have get_password_by_id. 
-        # For now, let's fetch all and find (inefficient but works for prototype)
-        # TODO: Add get_password_by_id to DB manager
-        passwords = self.db.get_passwords(user_id)
-        password_entry = next((p for p in passwords if str(p['id']) == str(password_id)), None)
+        # Get password details (auth is an in-memory lookup the query depends on,
+        # so only the round trip itself is moved off the event loop)
+        password_entry = await asyncio.to_thread(self.db.get_password_by_id, password_id, user_id)
         
         if not password_entry:
             await self._send_error(update, "Password not found.")
             return
         
         # Decrypt
-        decrypted_username = self.encryption.decrypt(password_entry['encrypted_username']) if password_entry['encrypted_username'] else 'N/A'
-        decrypted_password = self.encryption.decrypt(password_entry['encrypted_password'])
+        # One worker-thread hop for both fields keeps Fernet off the event loop
+        ciphertexts = (password_entry['encrypted_username'], password_entry['encrypted_password'])
+        decrypted_username, decrypted_password = await asyncio.to_thread(
+            lambda: [self.encryption.decrypt_cached(c) for c in ciphertexts]
+        )
+        decrypted_username = decrypted_username or 'N/A'
         
         message = format_password_details(password_entry, decrypted_username, decrypted_password)
         
@@ -175,58 +273,48 @@ class PasswordHandler:
         
         # Handle both Update and CallbackQuery objects
         if hasattr(update, 'callback_query') and update.callback_query:
-            await update.callback_query.edit_message_text(
+            sent = await update.callback_query.edit_message_text(
                 message,
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
         elif hasattr(update, 'edit_message_text'):
-            await update.edit_message_text(
+            sent = await update.edit_message_text(
                 message,
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
         else:
-            await update.message.reply_text(
+            sent = await update.message.reply_text(
                 message,
                 reply_markup=reply_markup,
                 parse_mode='Markdown'
             )
         
+        # The message is also the menu, so mask the credentials rather than delete it
+        self._redact_later(sent, format_password_details(password_entry, '', '', hidden=True), reply_markup)
+        
     async def start_save_wizard(self, update: Update):
         """Start the save password wizard."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
         self.scene_manager.start_scene(user.id, 'save_password')
         
-        message = (
-            "🔐 **Save New Password**\n\n"
-            "Step 1/4: **Service Name**\n"
-            "Enter the name of the service (e.g., Gmail, Netflix):"
-        )
-        
-        keyboard = [[
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['cancel']} Cancel",
-                callback_data=self.kb.encode_callback('cancel')
-            )
-        ]]
-        
         if update.callback_query:
             await update.callback_query.edit_message_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                _SAVE_WIZARD_START_MSG,
+                reply_markup=_CANCEL_KB,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                _SAVE_WIZARD_START_MSG,
+                reply_markup=_CANCEL_KB,
                 parse_mode='Markdown'
             )
 
@@ -247,62 +335,22 @@ class PasswordHandler:
             logger.warning(f"Could not delete wizard input message: {e}")
 
         if scene.scene_id == 'save_password':
-            if current_step == 'service_name':
-                is_valid, error = validate_service_name(text)
-                if not is_valid:
-                    await update.message.reply_text(f"❌ {error}\nPlease try again:")
-                    return True
-                    
-                self.scene_manager.set_scene_data(user.id, 'service_name', text)
-                self.scene_manager.advance_scene(user.id)
-                
-                await update.message.reply_text(
-                    f"✅ Service: **{text}**\n\n"
-                    "Step 2/4: **Username/Email**\n"
-                    "Enter username (or type 'skip'):",
-                    parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("Skip", callback_data=self.kb.encode_callback('wizard_skip'))
-                    ]])
-                )
-                
-            elif current_step == 'username':
-                username = text if text.lower() != 'skip' else ''
-                if username:
-                    is_valid, error = validate_username(username)
+            step = _SAVE_WIZARD_STEPS.get(current_step)
+            if step is not None:
+                value = '' if step.skippable and text.lower() == 'skip' else text
+                if value or not step.skippable:
+                    is_valid, error = step.validator(value)
                     if not is_valid:
                         await update.message.reply_text(f"❌ {error}\nPlease try again:")
                         return True
                 
-                self.scene_manager.set_scene_data(user.id, 'username', username)
-                self.scene_manager.advance_scene(user.id)
-                
-                await update.message.reply_text(
-                    "Step 3/4: **Password**\n"
-                    "Enter the password:",
-                    parse_mode='Markdown'
-                )
-                
-            elif current_step == 'password':
-                is_valid, error = validate_password(text)
-                if not is_valid:
-                    await update.message.reply_text(f"❌ {error}\nPlease try again:")
-                    return True
-                
-                # Check strength
-                score, strength_msg = check_password_strength(text)
-                    
-                self.scene_manager.set_scene_data(user.id, 'password', text)
+                self.scene_manager.set_scene_data(user.id, step.key, value)
                 self.scene_manager.advance_scene(user.id)
                 
                 await update.message.reply_text(
-                    f"Password Strength: {strength_msg}\n\n"
-                    "Step 4/4: **Tags**\n"
-                    "Enter tags (e.g. #work) or skip:",
+                    step.prompt(value),
                     parse_mode='Markdown',
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("Skip", callback_data=self.kb.encode_callback('wizard_skip'))
-                    ]])
+                    reply_markup=step.reply_markup
                 )
                 
             elif current_step == 'tags':
@@ -321,7 +369,7 @@ class PasswordHandler:
                 return True
             
             password_id = scene.get_data('password_id')
-            encrypted_password = self.encryption.encrypt(text)
+            encrypted_password = await asyncio.to_thread(self.encryption.encrypt, text)
             
             # Update in DB (we need a method for this, or use raw query)
             # For now, let's assume we can update just the password
@@ -350,13 +398,14 @@ class PasswordHandler:
             
         current_step = scene.get_current_step()
         
-        if current_step == 'username':
-            self.scene_manager.set_scene_data(user.id, 'username', '')
+        step = _SAVE_WIZARD_STEPS.get(current_step)
+        if step is not None and step.skippable:
+            self.scene_manager.set_scene_data(user.id, step.key, '')
             self.scene_manager.advance_scene(user.id)
             await update.callback_query.message.reply_text(
-                "Step 3/4: **Password**\n"
-                "Enter the password:",
-                parse_mode='Markdown'
+                step.prompt(''),
+                parse_mode='Markdown',
+                reply_markup=step.reply_markup
             )
             
         elif current_step == 'tags':
@@ -366,83 +415,74 @@ class PasswordHandler:
 
     async def _save_password_data(self, update: Update, data: dict):
         """Internal method to save password to DB."""
-        is_auth, user_id = self._check_auth(update.effective_user.id)
+        user_id = self._check_auth(update.effective_user.id)
         
         service_name = data['service_name']
         username = data.get('username', '')
         password = data['password']
         tags = data.get('tags', [])
         
-        encrypted_username = self.encryption.encrypt(username) if username else ''
-        encrypted_password = self.encryption.encrypt(password)
-        
-        result = self.db.save_password(
-            user_id=user_id,
-            service_name=service_name,
-            encrypted_username=encrypted_username,
-            encrypted_password=encrypted_password,
-            tags=tags
+        encrypted_username, encrypted_password = await asyncio.to_thread(
+            self.encryption.encrypt_many, [username, password]
         )
         
-        msg = (
-            f"✅ **Password Saved!**\n\n"
-            f"Service: {service_name}\n"
-            f"Tags: {', '.join(tags) if tags else 'None'}"
-        )
+        # Concurrent saves are coalesced into one insert
+        result = await self.save_queue.put({
+            'user_id': user_id,
+            'service_name': service_name,
+            'encrypted_username': encrypted_username,
+            'encrypted_password': encrypted_password,
+            'tags': tags
+        })
         
-        keyboard = [[
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['view']} View List",
-                callback_data=self.kb.encode_callback('password_list', p=0)
-            ),
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['add']} Add Another",
-                callback_data=self.kb.encode_callback('password_save_start')
-            )
-        ]]
+        msg = _SAVE_SUCCESS_TMPL({'service': service_name, 'tags': ', '.join(tags) or 'None'})
         
         if update.callback_query:
             await update.callback_query.message.reply_text(
                 msg, 
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_PASSWORD_SAVED_KB,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
                 msg, 
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_PASSWORD_SAVED_KB,
                 parse_mode='Markdown'
             )
 
     async def copy_password(self, update: Update, password_id: str):
         """Copy a password to clipboard (send as monospaced text)."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        # Get password details
-        passwords = self.db.get_passwords(user_id)
-        password_entry = next((p for p in passwords if str(p['id']) == str(password_id)), None)
+        # Only the ciphertext is needed to send the password
+        password_entry = await asyncio.to_thread(
+            self.db.get_password_by_id, password_id, user_id, columns='id,encrypted_password'
+        )
         
         if not password_entry:
             await update.callback_query.answer("Password not found", show_alert=True)
             return
         
         # Decrypt
-        decrypted_password = self.encryption.decrypt(password_entry['encrypted_password'])
+        decrypted_password = await asyncio.to_thread(
+            self.encryption.decrypt_cached, password_entry['encrypted_password']
+        )
         
         # Send as copyable text
         await update.callback_query.answer("Password sent below")
-        await update.callback_query.message.reply_text(
+        sent = await update.callback_query.message.reply_text(
             f"`{decrypted_password}`",
             parse_mode='MarkdownV2'
         )
+        self._delete_later(sent)
 
     async def start_edit_wizard(self, update: Update, password_id: str):
         """Start the edit password wizard."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
@@ -470,9 +510,14 @@ class PasswordHandler:
 
     async def _update_password_value(self, update: Update, password_id: str, encrypted_password: str):
         """Internal method to update password value."""
-        is_auth, user_id = self._check_auth(update.effective_user.id)
+        user_id = self._check_auth(update.effective_user.id)
+        
+        if user_id is None:
+            await self._send_auth_error(update)
+            return
         
-        if self.db.update_password(password_id, encrypted_password):
+        # Scoped to the owner so a stale or forged ID cannot touch another user's entry
+        if await asyncio.to_thread(self.db.update_password, password_id, encrypted_password, user_id):
             msg = "✅ **Password Updated!**"
             await self.show_password_details(update, password_id)
         else:
@@ -480,15 +525,96 @@ class PasswordHandler:
 
     async def delete_password(self, update: Update, password_id: str):
         """Delete a password."""
-        user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user = self._user(update)
+        user_id = self._check_auth(user.id)
         
-        if self.db.delete_password(password_id, user_id):
+        remaining = await asyncio.to_thread(self.db.delete_password_and_list, password_id, user_id)
+        if remaining is not None:
             await update.callback_query.answer("Password deleted")
-            await self.show_password_list(update, 0)
+            await self.show_password_list(update, 0, passwords=remaining)
         else:
             await update.callback_query.answer("Failed to delete", show_alert=True)
 
+    def _delete_later(self, message, delay: float = SECRET_MESSAGE_TTL):
+        """
+        Schedule deletion of a message that shows a secret, without blocking the handler.
+        
+        Args:
+            message: Sent Telegram Message (other edit results are ignored)
+            delay: Seconds to wait before deleting
+        """
+        if not isinstance(message, Message):
+            return  # Inline message edits return True instead of a Message
+        
+        task = asyncio.create_task(self._delete_after(message, delay))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def _redact_later(self, message, redacted_text: str, reply_markup: InlineKeyboardMarkup,
+                      delay: float = SECRET_MESSAGE_TTL):
+        """
+        Schedule an edit that masks the credentials shown in a details message.
+        
+        Args:
+            message: Sent Telegram Message (other edit results are ignored)
+            redacted_text: Text to show once the delay has passed
+            reply_markup: Buttons to keep on the message
+            delay: Seconds to wait before redacting
+        """
+        if not isinstance(message, Message):
+            return  # Inline message edits return True instead of a Message
+        
+        self.cancel_redaction(message)
+        key = (message.chat_id, message.message_id)
+        task = asyncio.create_task(self._redact_after(message, redacted_text, reply_markup, delay))
+        self._redactions[key] = task
+        
+        def _forget(done):
+            if self._redactions.get(key) is done:
+                del self._redactions[key]
+        task.add_done_callback(_forget)
+    
+    def cancel_redaction(self, message: Optional[Message]):
+        """
+        Drop a pending redaction once the message is about to show something else.
+        
+        Args:
+            message: Message a callback button was pressed on
+        """
+        if message is None:
+            return
+        task = self._redactions.pop((message.chat_id, message.message_id), None)
+        if task is not None:
+            task.cancel()
+    
+    @staticmethod
+    async def _redact_after(message: Message, text: str, reply_markup: InlineKeyboardMarkup, delay: float):
+        """Sleep, then replace the details with the masked version."""
+        await asyncio.sleep(delay)
+        try:
+            await message.edit_text(text, reply_markup=reply_markup, parse_mode='Markdown')
+        except TelegramError as e:
+            # Usually deleted by the user in the meantime
+            logger.debug(f"Could not redact secret message: {e}")
+    
+    @staticmethod
+    async def _delete_after(message: Message, delay: float):
+        """Sleep, then delete the message if it still exists."""
+        await asyncio.sleep(delay)
+        try:
+            await message.delete()
+        except TelegramError as e:
+            # Usually already deleted by the user; anything else still propagates
+            logger.debug(f"Could not delete secret message: {e}")
+    
+    @staticmethod
+    def _clamp_page(page: int, total: int, items_per_page: int) -> int:
+        """Clamp a page number to the last page that has entries."""
+        total_pages = (total + items_per_page - 1) // items_per_page
+        if page >= total_pages and total_pages > 0:
+            return total_pages - 1
+        return page
+
     async def _send_auth_error(self, update: Update):
         """Send authentication error message."""
         msg = "❌ Session expired. Please /start again."
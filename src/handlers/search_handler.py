@@ -3,17 +3,38 @@ QuikSafe Bot - Search Handler
 Handles AI-powered search with interactive inline results.
 """
 
-from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram import Update, Message, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes, CommandHandler
 from src.database.db_manager import DatabaseManager
 from src.security.encryption import EncryptionManager
 from src.security.auth import SessionManager
 from src.ai.gemini_client import GeminiClient
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
+from src.utils.search_blob import get_search_blob
+from src.utils.tg_ratelimit import limiter
+from cachetools import TTLCache
+import asyncio
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Search results per (user, query, content fingerprint); only item IDs are kept
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_TTL = 300
+
+SEARCH_TYPES = ("passwords", "tasks", "files")
+
+
+def _content_fingerprint(groups) -> bytes:
+    """Hash the IDs and searchable text of every item, so any edit changes the key."""
+    h = hashlib.blake2b(digest_size=16)
+    for item_type, items in zip(SEARCH_TYPES, groups):
+        h.update(item_type.encode('utf-8'))
+        for item in items:
+            h.update(f"\x1f{item['id']}\x1f{get_search_blob(item, item_type)}".encode('utf-8'))
+    return h.digest()
+
 
 class SearchHandler:
     """Handles AI-powered search and summarization."""
@@ -25,24 +46,21 @@ class SearchHandler:
         self.encryption = encryption
         self.session = session
         self.ai = ai_client
-        self.kb = KeyboardBuilder()
+        self.kb = KB
+        self._results = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL)
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
-        
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
     
     # ==================== Search ====================
     
     async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """AI-powered search across all data."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
         
@@ -59,84 +77,43 @@ class SearchHandler:
             )
             return
         
-        await update.message.reply_text(f"🔍 Searching for '{query}'...")
+        status = await update.message.reply_text(f"🔍 Searching for '{query}'...")
         
-        # Get all data
-        passwords = self.db.get_passwords(user_id)
-        tasks = self.db.get_tasks(user_id)
-        files = self.db.get_files(user_id)
+        # Get all data in one round trip
+        passwords, tasks, files = await asyncio.to_thread(self.db.get_all_user_content, user_id)
         
-        # Decrypt task content for search
-        for task in tasks:
-            task['encrypted_content'] = self.encryption.decrypt(task['encrypted_content'])
+        # Decrypt task content for search, in one worker-thread hop off the event loop
+        plains = await asyncio.to_thread(
+            self.encryption.decrypt_many_cached, [task['encrypted_content'] for task in tasks]
+        )
+        for task, plain in zip(tasks, plains):
+            task['encrypted_content'] = plain
+        
+        groups = (passwords, tasks, files)
         
         # Search using AI
         try:
-            password_results = self.ai.search_content(query, passwords, "passwords")
-            task_results = self.ai.search_content(query, tasks, "tasks")
-            file_results = self.ai.search_content(query, files, "files")
+            key = (user_id, query.strip().casefold(), _content_fingerprint(groups))
+            results = self._cached_results(key, groups)
             
-            total_results = len(password_results) + len(task_results) + len(file_results)
+            if results is None:
+                # Show literal matches right away while the AI ranking runs
+                preview = self._local_matches(query, groups)
+                if any(preview):
+                    await self._edit_status(status, *self._render_results(query, preview, refining=True))
+                results = await self._ai_search(key, query, groups)
             
-            if total_results == 0:
-                await update.message.reply_text(
+            if not any(results):
+                await self._edit_status(
+                    status,
                     f"❌ No results found for '{query}'.\n"
                     "Try different keywords or browse categories.",
-                    reply_markup=self.kb.back_to_menu('main')
+                    self.kb.back_to_menu('main'),
+                    parse_mode=None
                 )
                 return
             
-            message = f"🔍 **Found {total_results} results for '{query}'**\n\n"
-            keyboard = []
-            
-            # Passwords
-            if password_results:
-                message += "**🔐 Passwords**\n"
-                for p in password_results[:3]:  # Limit to 3 inline
-                    message += f"• {p['service_name']}\n"
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            f"🔐 {p['service_name']}",
-                            callback_data=self.kb.encode_callback('password_view', password_id=p['id'])
-                        )
-                    ])
-                message += "\n"
-            
-            # Tasks
-            if task_results:
-                message += "**✅ Tasks**\n"
-                for t in task_results[:3]:
-                    content = t['encrypted_content']
-                    message += f"• {content[:30]}...\n"
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            f"✅ {content[:20]}...",
-                            callback_data=self.kb.encode_callback('task_view', task_id=t['id'])
-                        )
-                    ])
-                message += "\n"
-            
-            # Files
-            if file_results:
-                message += "**📁 Files**\n"
-                for f in file_results[:3]:
-                    message += f"• {f['file_name']}\n"
-                    keyboard.append([
-                        InlineKeyboardButton(
-                            f"📁 {f['file_name'][:20]}...",
-                            callback_data=self.kb.encode_callback('file_view', file_id=f['id'])
-                        )
-                    ])
-            
-            keyboard.append([
-                InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Menu", callback_data=self.kb.encode_callback('main_menu'))
-            ])
-            
-            await update.message.reply_text(
-                message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
-                parse_mode='Markdown'
-            )
+            await self._edit_status(status, *self._render_results(query, results))
             
         except Exception as e:
             logger.error(f"Search failed: {e}")
@@ -144,6 +121,127 @@ class SearchHandler:
                 "❌ Search failed. Please try again later."
             )
     
+    def _render_results(self, query: str, results, refining: bool = False):
+        """
+        Build the search results message and keyboard.
+        
+        Args:
+            query: Search query
+            results: (passwords, tasks, files) result lists
+            refining: Whether these are quick literal matches still being ranked by AI
+            
+        Returns:
+            Tuple of (message text, reply markup)
+        """
+        password_results, task_results, file_results = results
+        total_results = len(password_results) + len(task_results) + len(file_results)
+        
+        if refining:
+            message = f"🔍 **{total_results} quick matches for '{query}'**\n\n"
+        else:
+            message = f"🔍 **Found {total_results} results for '{query}'**\n\n"
+        keyboard = []
+        
+        # Passwords
+        if password_results:
+            message += "**🔐 Passwords**\n"
+            for p in password_results[:3]:  # Limit to 3 inline
+                message += f"• {p['service_name']}\n"
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"🔐 {p['service_name']}",
+                        callback_data=self.kb.encode_callback('password_view', password_id=p['id'])
+                    )
+                ])
+            message += "\n"
+        
+        # Tasks
+        if task_results:
+            message += "**✅ Tasks**\n"
+            for t in task_results[:3]:
+                content = t['encrypted_content']
+                message += f"• {content[:30]}...\n"
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"✅ {content[:20]}...",
+                        callback_data=self.kb.encode_callback('task_view', task_id=t['id'])
+                    )
+                ])
+            message += "\n"
+        
+        # Files
+        if file_results:
+            message += "**📁 Files**\n"
+            for f in file_results[:3]:
+                message += f"• {f['file_name']}\n"
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"📁 {f['file_name'][:20]}...",
+                        callback_data=self.kb.encode_callback('file_view', file_id=f['id'])
+                    )
+                ])
+        
+        if refining:
+            message = message.rstrip("\n") + "\n\n⏳ Refining with AI..."
+        
+        keyboard.append([
+            InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Menu", callback_data=self.kb.encode_callback('main_menu'))
+        ])
+        return message, InlineKeyboardMarkup(keyboard)
+    
+    @staticmethod
+    async def _edit_status(status: Message, text: str, reply_markup=None, parse_mode: str | None = 'Markdown'):
+        """Replace the "Searching..." message, paced by the chat rate limiter."""
+        await limiter.acquire(status.chat_id)
+        await status.edit_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    
+    @staticmethod
+    def _local_matches(query: str, groups):
+        """Literal substring matches per category; instant, used as a preview."""
+        query_lower = query.lower()
+        return tuple(
+            [item for item in items if query_lower in get_search_blob(item, item_type)]
+            for item_type, items in zip(SEARCH_TYPES, groups)
+        )
+    
+    def _cached_results(self, key, groups):
+        """
+        Look up results of a repeated query over unchanged items.
+        
+        Args:
+            key: (user_id, normalized query, content fingerprint)
+            groups: (passwords, tasks, files) item lists
+            
+        Returns:
+            Tuple of result lists, or None on a miss
+        """
+        cached = self._results.get(key)
+        if cached is None:
+            return None
+        # Map IDs back to this request's rows (decrypted content is never cached)
+        return tuple(
+            [by_id[item_id] for item_id in ids if item_id in by_id]
+            for ids, by_id in zip(cached, ({item['id']: item for item in items} for items in groups))
+        )
+    
+    async def _ai_search(self, key, query: str, groups):
+        """
+        Rank every category with AI and cache the result IDs.
+        
+        Args:
+            key: Result cache key from search()
+            query: Search query
+            groups: (passwords, tasks, files) item lists
+            
+        Returns:
+            Tuple of result lists, in the same order as groups
+        """
+        # All categories share one Gemini round trip
+        by_type = await self.ai.asearch_all(query, dict(zip(SEARCH_TYPES, groups)))
+        results = tuple(by_type[item_type] for item_type in SEARCH_TYPES)
+        self._results[key] = tuple(tuple(item['id'] for item in result) for result in results)
+        return results
+    
     # ==================== Summarize ====================
     
     async def summarize(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -151,9 +249,9 @@ class SearchHandler:
         # Redirect to AI handler's summarize feature
         # This command is kept for backward compatibility
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
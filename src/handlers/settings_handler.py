@@ -7,13 +7,63 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import ContextTypes
 from src.database.db_manager import DatabaseManager
 from src.security.auth import SessionManager
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
 from src.utils.scene_manager import SceneManager
 from src.security.auth import AuthManager
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Static keyboards, built once at import
+_SETTINGS_MENU_KB = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔒 Security Settings", callback_data=KB.encode_callback('settings_security')),
+        InlineKeyboardButton("🔔 Notifications", callback_data=KB.encode_callback('settings_notifications'))
+    ],
+    [
+        InlineKeyboardButton("🗑️ Clear Session (Logout)", callback_data=KB.encode_callback('settings_logout'))
+    ],
+    [
+        InlineKeyboardButton("🆘 Contact Support", url="https://t.me/Billaden5")
+    ],
+    [
+        InlineKeyboardButton(f"{KB.EMOJI['back']} Back to Menu", callback_data=KB.encode_callback('main_menu'))
+    ]
+])
+_BACK_TO_SETTINGS_ROW = (
+    InlineKeyboardButton(f"{KB.EMOJI['back']} Back to Settings", callback_data=KB.encode_callback('menu_settings')),
+)
+_SECURITY_MENU_KB = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("⏱️ Change Auto-Lock", callback_data=KB.encode_callback('settings_autolock')),
+        InlineKeyboardButton("🔑 Change Master Pass", callback_data=KB.encode_callback('settings_changepass'))
+    ],
+    _BACK_TO_SETTINGS_ROW
+])
+_CANCEL_KB = InlineKeyboardMarkup([[
+    InlineKeyboardButton(f"{KB.EMOJI['cancel']} Cancel", callback_data=KB.encode_callback('cancel'))
+]])
+
+
+def _toggle_icon(enabled: bool) -> str:
+    """Icon shown next to a notification toggle."""
+    return "✅" if enabled else "❌"
+
+
+# Notification menu keyboards for each (reminders on, summary on) state
+_NOTIFICATIONS_MENU_KBS = {
+    (tasks_on, summary_on): InlineKeyboardMarkup([
+        [
+            InlineKeyboardButton(f"{_toggle_icon(tasks_on)} Toggle Reminders", callback_data=KB.encode_callback('settings_toggle_reminders')),
+            InlineKeyboardButton(f"{_toggle_icon(summary_on)} Toggle Summary", callback_data=KB.encode_callback('settings_toggle_summary'))
+        ],
+        _BACK_TO_SETTINGS_ROW
+    ])
+    for tasks_on in (True, False)
+    for summary_on in (True, False)
+}
+
 
 class SettingsHandler:
     """Handles user settings and preferences."""
@@ -32,27 +82,23 @@ class SettingsHandler:
         self.session = session
         self.scene_manager = scene_manager
         self.auth = auth
-        self.kb = KeyboardBuilder()
+        self.kb = KB
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
-        
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
     
     async def show_menu(self, update: Update):
         """Show settings menu."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
         # Get current settings
-        settings = self.db.get_user_settings(user_id)
+        settings = self.db.get_user_settings_cached(user_id)
         
         # Defaults
         security = settings.get('security', {})
@@ -73,32 +119,16 @@ class SettingsHandler:
             f"• Weekly Summary: {weekly_summary}"
         )
         
-        keyboard = [
-            [
-                InlineKeyboardButton("🔒 Security Settings", callback_data=self.kb.encode_callback('settings_security')),
-                InlineKeyboardButton("🔔 Notifications", callback_data=self.kb.encode_callback('settings_notifications'))
-            ],
-            [
-                InlineKeyboardButton("🗑️ Clear Session (Logout)", callback_data=self.kb.encode_callback('settings_logout'))
-            ],
-            [
-                InlineKeyboardButton("🆘 Contact Support", url="https://t.me/Billaden5")
-            ],
-            [
-                InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Menu", callback_data=self.kb.encode_callback('main_menu'))
-            ]
-        ]
-        
         if update.callback_query:
             await update.callback_query.edit_message_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_SETTINGS_MENU_KB,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_SETTINGS_MENU_KB,
                 parse_mode='Markdown'
             )
 
@@ -113,16 +143,17 @@ class SettingsHandler:
             "Use /start to log in again."
         )
 
-    async def show_security_menu(self, update: Update):
-        """Show security settings menu."""
+    async def show_security_menu(self, update: Update, settings: dict | None = None):
+        """Show security settings menu, using already-loaded settings when given."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
-        settings = self.db.get_user_settings(user_id)
+        if settings is None:
+            settings = self.db.get_user_settings_cached(user_id)
         auto_lock = settings.get('security', {}).get('auto_lock_minutes', 60)
             
         message = (
@@ -133,32 +164,22 @@ class SettingsHandler:
             "• **Biometric**: Disabled (Coming Soon)"
         )
         
-        keyboard = [
-            [
-                InlineKeyboardButton("⏱️ Change Auto-Lock", callback_data=self.kb.encode_callback('settings_autolock')),
-                InlineKeyboardButton("🔑 Change Master Pass", callback_data=self.kb.encode_callback('settings_changepass'))
-            ],
-            [
-                InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Settings", callback_data=self.kb.encode_callback('menu_settings'))
-            ]
-        ]
-        
         await update.callback_query.edit_message_text(
             message,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_SECURITY_MENU_KB,
             parse_mode='Markdown'
         )
 
     async def change_auto_lock(self, update: Update):
         """Cycle through auto-lock durations."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
-        settings = self.db.get_user_settings(user_id)
+        settings = self.db.get_user_settings_cached(user_id)
         current = settings.get('security', {}).get('auto_lock_minutes', 60)
         
         # Cycle: 15 -> 30 -> 60 -> 120 -> 15
@@ -169,33 +190,30 @@ class SettingsHandler:
         except ValueError:
             new_duration = 60
             
-        # Update settings
-        if 'security' not in settings:
-            settings['security'] = {}
-        settings['security']['auto_lock_minutes'] = new_duration
-        
-        self.db.update_user_settings(user_id, settings)
+        # Update the single field; the returned settings feed the refreshed menu
+        settings = self.db.update_user_settings_field(user_id, ['security', 'auto_lock_minutes'], new_duration)
         
         # Refresh menu
-        await self.show_security_menu(update)
+        await self.show_security_menu(update, settings)
 
-    async def show_notifications_menu(self, update: Update):
-        """Show notification settings menu."""
+    async def show_notifications_menu(self, update: Update, settings: dict | None = None):
+        """Show notification settings menu, using already-loaded settings when given."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
-        settings = self.db.get_user_settings(user_id)
+        if settings is None:
+            settings = self.db.get_user_settings_cached(user_id)
         notifications = settings.get('notifications', {})
         
-        tasks_on = notifications.get('tasks', True)
-        summary_on = notifications.get('summary', False)
+        tasks_on = bool(notifications.get('tasks', True))
+        summary_on = bool(notifications.get('summary', False))
         
-        tasks_icon = "✅" if tasks_on else "❌"
-        summary_icon = "✅" if summary_on else "❌"
+        tasks_icon = _toggle_icon(tasks_on)
+        summary_icon = _toggle_icon(summary_on)
             
         message = (
             "🔔 **Notification Settings**\n\n"
@@ -205,51 +223,40 @@ class SettingsHandler:
             "• **Security Alerts**: ✅ On"
         )
         
-        keyboard = [
-            [
-                InlineKeyboardButton(f"{tasks_icon} Toggle Reminders", callback_data=self.kb.encode_callback('settings_toggle_reminders')),
-                InlineKeyboardButton(f"{summary_icon} Toggle Summary", callback_data=self.kb.encode_callback('settings_toggle_summary'))
-            ],
-            [
-                InlineKeyboardButton(f"{self.kb.EMOJI['back']} Back to Settings", callback_data=self.kb.encode_callback('menu_settings'))
-            ]
-        ]
-        
         await update.callback_query.edit_message_text(
             message,
-            reply_markup=InlineKeyboardMarkup(keyboard),
+            reply_markup=_NOTIFICATIONS_MENU_KBS[tasks_on, summary_on],
             parse_mode='Markdown'
         )
 
     async def toggle_setting(self, update: Update, setting_type: str):
         """Toggle a notification setting."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
-        settings = self.db.get_user_settings(user_id)
-        if 'notifications' not in settings:
-            settings['notifications'] = {'tasks': True, 'summary': False}
-            
-        if setting_type == 'tasks':
-            settings['notifications']['tasks'] = not settings['notifications'].get('tasks', True)
-        elif setting_type == 'summary':
-            settings['notifications']['summary'] = not settings['notifications'].get('summary', False)
-            
-        self.db.update_user_settings(user_id, settings)
+        defaults = {'tasks': True, 'summary': False}
+        if setting_type not in defaults:
+            return
+        
+        notifications = self.db.get_user_settings_cached(user_id).get('notifications', {})
+        current = notifications.get(setting_type, defaults[setting_type])
+        
+        # Update the single field; the returned settings feed the refreshed menu
+        settings = self.db.update_user_settings_field(user_id, ['notifications', setting_type], not current)
         
         # Refresh menu
-        await self.show_notifications_menu(update)
+        await self.show_notifications_menu(update, settings)
 
     async def start_change_password_wizard(self, update: Update):
         """Start the change password wizard."""
         user = update.effective_user
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
@@ -261,23 +268,16 @@ class SettingsHandler:
             "Please enter your current master password:"
         )
         
-        keyboard = [[
-            InlineKeyboardButton(
-                f"{self.kb.EMOJI['cancel']} Cancel",
-                callback_data=self.kb.encode_callback('cancel')
-            )
-        ]]
-        
         if update.callback_query:
             await update.callback_query.edit_message_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_CANCEL_KB,
                 parse_mode='Markdown'
             )
         else:
             await update.message.reply_text(
                 message,
-                reply_markup=InlineKeyboardMarkup(keyboard),
+                reply_markup=_CANCEL_KB,
                 parse_mode='Markdown'
             )
 
@@ -301,18 +301,11 @@ class SettingsHandler:
             logger.warning(f"Could not delete password input: {e}")
             
         if current_step == 'current_password':
-            # Verify current password
-            is_auth, user_id = self._check_auth(user.id)
-            user_data = self.db.get_user(user.id) # Need to get by telegram_id or user_id
-            # Wait, get_user takes telegram_id usually? Let's check db_manager.
-            # Assuming get_user_by_telegram_id or similar. 
-            # Actually session has user_id. Let's use that.
-            # But we need the hash from DB.
-            # Let's assume db.get_user_by_id(user_id) exists or similar.
-            # Checking db_manager.py... it has get_user(telegram_id).
-            
-            db_user = self.db.get_user(user.id)
-            if not db_user or not self.auth.verify_password(text, db_user['password_hash']):
+            # Verify current password; Argon2 runs in a worker thread, off the event loop
+            db_user = self.db.get_user_by_telegram_id(user.id)
+            if not db_user or not await asyncio.to_thread(
+                self.auth.verify_password, text, db_user['master_password_hash']
+            ):
                 await update.message.reply_text("❌ Incorrect password. Please try again:")
                 return True
                 
@@ -340,16 +333,15 @@ class SettingsHandler:
             )
             
         elif current_step == 'confirm_password':
-            new_password = scene.get_data().get('new_password')
+            new_password = scene.get_data('new_password')
             if text != new_password:
                 await update.message.reply_text("❌ Passwords do not match. Please try again:")
                 return True
             
             # Update password
-            is_auth, user_id = self._check_auth(user.id)
-            new_hash = self.auth.hash_password(new_password)
+            new_hash = await asyncio.to_thread(self.auth.hash_password, new_password)
             
-            if self.db.update_user_password(user_id, new_hash):
+            if self.db.update_master_password(user.id, new_hash):
                 self.scene_manager.complete_scene(user.id)
                 await update.message.reply_text(
                     "✅ **Success!**\n\n"
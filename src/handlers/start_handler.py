@@ -8,8 +8,9 @@ from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, Mess
 from src.database.db_manager import DatabaseManager
 from src.security.auth import AuthManager, SessionManager
 from src.utils.formatters import format_welcome_message
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
 from src.utils.deep_links import DeepLinkManager
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -123,7 +124,8 @@ class StartHandler:
             # Verify password
             stored_hash = existing_user['master_password_hash']
             
-            if self.auth.verify_password(master_password, stored_hash):
+            # Argon2 is deliberately slow; keep it off the event loop
+            if await asyncio.to_thread(self.auth.verify_password, master_password, stored_hash):
                 # Create session
                 self.session.create_session(telegram_id, {
                     'user_id': existing_user['id'],
@@ -158,7 +160,7 @@ class StartHandler:
                 return AWAITING_MASTER_PASSWORD
             
             # Hash password and create user
-            password_hash = self.auth.hash_password(master_password)
+            password_hash = await asyncio.to_thread(self.auth.hash_password, master_password)
             new_user = self.db.create_user(telegram_id, password_hash)
             
             if new_user:
@@ -195,7 +197,7 @@ class StartHandler:
             user_name: User's first name
             deep_link_data: Optional deep link data to handle
         """
-        kb = KeyboardBuilder()
+        kb = KB
         
         # If deep link action provided, show targeted message
         if deep_link_data:
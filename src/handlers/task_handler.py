@@ -10,7 +10,7 @@ from src.security.encryption import EncryptionManager
 from src.security.auth import SessionManager
 from src.utils.validators import validate_task_content, validate_priority, validate_due_date, parse_tags_from_text
 from src.utils.formatters import format_task_list, format_task_details
-from src.utils.keyboard_builder import KeyboardBuilder
+from src.utils.keyboard_builder import KB
 from src.utils.scene_manager import SceneManager
 import logging
 import asyncio
@@ -38,30 +38,27 @@ class TaskHandler:
         self.db = db
         self.encryption = encryption
         self.session = session
-        self.kb = KeyboardBuilder()
+        self.kb = KB
         self.scene_manager = scene_manager
     
-    def _check_auth(self, telegram_id: int) -> tuple[bool, str]:
-        """Check if user is authenticated."""
-        if not self.session.is_authenticated(telegram_id):
-            return False, None
-        
-        session_data = self.session.get_session(telegram_id)
-        return True, session_data.get('user_id')
+    def _check_auth(self, telegram_id: int) -> str | None:
+        """Return the user's ID if authenticated, else None."""
+        return self.session.resolve(telegram_id)
     
     # ==================== Inline UI Methods ====================
     
-    async def show_task_list(self, update: Update, page: int = 0, status_filter: str = None):
-        """Show paginated list of tasks."""
+    async def show_task_list(self, update: Update, page: int = 0, status_filter: str = None, tasks: list = None):
+        """Show paginated list of tasks (optionally from an already-fetched list)."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
         
         # Get tasks
-        tasks = self.db.get_tasks(user_id, status_filter)
+        if tasks is None:
+            tasks = self.db.get_tasks(user_id, status_filter)
         
         # Decrypt content for display
         for task in tasks:
@@ -153,9 +150,9 @@ class TaskHandler:
     async def show_task_details(self, update: Update, task_id: str):
         """Show details for a specific task."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
         
@@ -197,9 +194,9 @@ class TaskHandler:
     async def start_add_wizard(self, update: Update):
         """Start the add task wizard."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if not is_auth:
+        if user_id is None:
             await self._send_auth_error(update)
             return
             
@@ -360,7 +357,7 @@ class TaskHandler:
 
     async def _save_task_data(self, update: Update, data: dict):
         """Internal method to save task to DB."""
-        is_auth, user_id = self._check_auth(update.effective_user.id)
+        user_id = self._check_auth(update.effective_user.id)
         
         content = data['content']
         priority = data.get('priority', 'medium')
@@ -411,7 +408,7 @@ class TaskHandler:
     async def toggle_task_status(self, update: Update, task_id: str):
         """Toggle task status (pending/completed)."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
         # Get current status
         task = self.db.get_task_by_id(task_id, user_id)
@@ -431,18 +428,19 @@ class TaskHandler:
     async def delete_task(self, update: Update, task_id: str):
         """Delete a task."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
-        if self.db.delete_task(task_id, user_id):
+        remaining = self.db.delete_task_and_list(task_id, user_id)
+        if remaining is not None:
             await update.callback_query.answer("Task deleted")
-            await self.show_task_list(update, 0)
+            await self.show_task_list(update, 0, tasks=remaining)
         else:
             await update.callback_query.answer("Failed to delete", show_alert=True)
 
     async def change_task_status(self, update: Update, task_id: str, new_status: str):
         """Change task status to a specific status."""
         user = getattr(update, 'effective_user', None) or getattr(update, 'from_user', None)
-        is_auth, user_id = self._check_auth(user.id)
+        user_id = self._check_auth(user.id)
         
         if self.db.update_task_status(task_id, user_id, new_status):
             status_msg = {
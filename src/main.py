@@ -5,7 +5,7 @@ Secure Telegram bot for managing passwords, tasks, and files.
 
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters
 from telegram import Update
-from src.config import Config
+from src.config import CFG
 from src.database import DatabaseManager
 from src.security import EncryptionManager, AuthManager, SessionManager
 from src.ai import GeminiClient
@@ -21,33 +21,46 @@ from src.handlers import (
 )
 from src.handlers.callback_handler import CallbackHandler
 from src.utils.scene_manager import SceneManager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO if not Config.DEBUG_MODE else logging.DEBUG
+    level=logging.INFO if not CFG.DEBUG_MODE else logging.DEBUG
 )
 logger = logging.getLogger(__name__)
 
+# Worker threads for asyncio.to_thread (encryption and blocking DB calls)
+WORKER_THREADS = min(32, (os.cpu_count() or 1) * 4)
+
+
+async def _configure_executor(application: Application):
+    """Size the default executor used by asyncio.to_thread."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix='worker')
+    )
+
 
 def main():
     """Start the bot."""
     
     # Validate configuration
-    is_valid, error = Config.validate()
+    is_valid, error = CFG.validate()
     if not is_valid:
         logger.error(f"Configuration error: {error}")
         logger.error("Please check your .env file and ensure all required variables are set.")
         return
     
     logger.info("Starting QuikSafe Bot...")
-    logger.info(f"Configuration: {Config.get_debug_info()}")
+    logger.info(f"Configuration: {CFG.get_debug_info()}")
     
     # Initialize components
     try:
         # Check if Supabase is configured
-        if Config.SUPABASE_URL == 'your_supabase_project_url' or not Config.SUPABASE_URL:
+        if CFG.SUPABASE_URL == 'your_supabase_project_url' or not CFG.SUPABASE_URL:
             logger.warning("⚠️  Supabase is not configured yet!")
             logger.warning("The bot will not function properly without a database.")
             logger.warning("Please set up Supabase and update your .env file:")
@@ -58,11 +71,11 @@ def main():
             logger.warning("Press Ctrl+C to stop the bot.")
             return
         
-        db = DatabaseManager(Config.SUPABASE_URL, Config.SUPABASE_KEY)
-        encryption = EncryptionManager(Config.ENCRYPTION_KEY)
+        db = DatabaseManager(CFG.SUPABASE_URL, CFG.SUPABASE_KEY)
+        encryption = EncryptionManager(CFG.ENCRYPTION_KEY, cipher=CFG.FERNET)
         auth = AuthManager()
         session = SessionManager()
-        ai_client = GeminiClient(Config.GEMINI_API_KEY)
+        ai_client = GeminiClient(CFG.GEMINI_API_KEY, CFG.GEMINI_MODEL, CFG.GEMINI_HEAVY_MODEL)
         scene_manager = SceneManager()
         
         logger.info("All components initialized successfully")
@@ -72,7 +85,7 @@ def main():
         return
     
     # Create application
-    application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+    application = Application.builder().token(CFG.TELEGRAM_BOT_TOKEN).post_init(_configure_executor).build()
     
     # Initialize handlers
     start_handler = StartHandler(db, auth, session)
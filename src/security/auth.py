@@ -6,6 +6,8 @@ Handles user authentication with master password hashing using Argon2.
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, InvalidHash
 from typing import Optional
+from collections import OrderedDict
+import time
 
 
 class AuthManager:
@@ -98,6 +100,11 @@ class AuthManager:
         return True, None
 
 
+# Memo of recent telegram_id -> user_id resolutions
+RESOLVE_CACHE_SIZE = 4096
+RESOLVE_CACHE_TTL = 60  # seconds
+
+
 # User session storage (in-memory for simplicity, use Redis in production)
 class SessionManager:
     """Manages user sessions."""
@@ -105,6 +112,8 @@ class SessionManager:
     def __init__(self):
         """Initialize session storage."""
         self.sessions = {}  # telegram_id -> user_data
+        self._resolved = OrderedDict()  # telegram_id -> (user_id, monotonic expiry)
+        self._jobs = set()  # (telegram_id, job name) currently running
     
     def create_session(self, telegram_id: int, user_data: dict):
         """
@@ -115,6 +124,7 @@ class SessionManager:
             user_data: User data to store in session
         """
         self.sessions[telegram_id] = user_data
+        self._resolved.pop(telegram_id, None)
     
     def get_session(self, telegram_id: int) -> Optional[dict]:
         """
@@ -138,6 +148,8 @@ class SessionManager:
         """
         if telegram_id in self.sessions:
             self.sessions[telegram_id].update(data)
+            if 'user_id' in data:
+                self._resolved.pop(telegram_id, None)
     
     def delete_session(self, telegram_id: int):
         """
@@ -148,168 +160,71 @@ class SessionManager:
         """
         if telegram_id in self.sessions:
             del self.sessions[telegram_id]
+        self._resolved.pop(telegram_id, None)
     
-    def is_authenticated(self, telegram_id: int) -> bool:
+    def logout(self, telegram_id: int):
         """
-        Check if user is authenticated.
+        Log a user out, clearing their session.
         
         Args:
             telegram_id: Telegram user ID
-            
-        Returns:
-            True if user has an active session
         """
-        return telegram_id in self.sessions
-"""
-QuikSafe Bot - Authentication Module
-Handles user authentication with master password hashing using Argon2.
-"""
-
-from argon2 import PasswordHasher
-from argon2.exceptions import VerifyMismatchError, InvalidHash
-from typing import Optional
-
-
-class AuthManager:
-    """Handles password hashing and verification using Argon2."""
+        self.delete_session(telegram_id)
     
-    def __init__(self):
-        """Initialize password hasher with secure defaults."""
-        self.ph = PasswordHasher(
-            time_cost=2,  # Number of iterations
-            memory_cost=65536,  # Memory usage in KiB (64 MB)
-            parallelism=4,  # Number of parallel threads
-            hash_len=32,  # Length of hash in bytes
-            salt_len=16  # Length of salt in bytes
-        )
-    
-    def hash_password(self, password: str) -> str:
+    def begin_job(self, telegram_id: int, job: str) -> bool:
         """
-        Hash a password using Argon2.
+        Mark a background job as running for a user.
         
         Args:
-            password: Plain text password to hash
-            
-        Returns:
-            Hashed password string
-        """
-        if not password:
-            raise ValueError("Password cannot be empty")
-        
-        return self.ph.hash(password)
-    
-    def verify_password(self, password: str, password_hash: str) -> bool:
-        """
-        Verify a password against its hash.
-        
-        Args:
-            password: Plain text password to verify
-            password_hash: Hashed password to verify against
+            telegram_id: Telegram user ID
+            job: Job name
             
         Returns:
-            True if password matches, False otherwise
+            False if the same job is already running for this user
         """
-        if not password or not password_hash:
+        key = (telegram_id, job)
+        if key in self._jobs:
             return False
-        
-        try:
-            self.ph.verify(password_hash, password)
-            
-            # Check if hash needs rehashing (parameters changed)
-            if self.ph.check_needs_rehash(password_hash):
-                # In production, you'd update the hash in the database here
-                pass
-            
-            return True
-        except (VerifyMismatchError, InvalidHash):
-            return False
-    
-    def validate_password_strength(self, password: str) -> tuple[bool, Optional[str]]:
-        """
-        Validate password strength.
-        
-        Args:
-            password: Password to validate
-            
-        Returns:
-            tuple: (is_valid, error_message)
-        """
-        if len(password) < 8:
-            return False, "Password must be at least 8 characters long"
-        
-        if len(password) > 128:
-            return False, "Password must be less than 128 characters"
-        
-        # Check for at least one uppercase letter
-        if not any(c.isupper() for c in password):
-            return False, "Password must contain at least one uppercase letter"
-        
-        # Check for at least one lowercase letter
-        if not any(c.islower() for c in password):
-            return False, "Password must contain at least one lowercase letter"
-        
-        # Check for at least one digit
-        if not any(c.isdigit() for c in password):
-            return False, "Password must contain at least one number"
-        
-        # Check for at least one special character
-        special_chars = "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        if not any(c in special_chars for c in password):
-            return False, "Password must contain at least one special character"
-        
-        return True, None
-
-
-# User session storage (in-memory for simplicity, use Redis in production)
-class SessionManager:
-    """Manages user sessions."""
+        self._jobs.add(key)
+        return True
     
-    def __init__(self):
-        """Initialize session storage."""
-        self.sessions = {}  # telegram_id -> user_data
-    
-    def create_session(self, telegram_id: int, user_data: dict):
+    def end_job(self, telegram_id: int, job: str):
         """
-        Create a new user session.
+        Mark a background job as finished.
         
         Args:
             telegram_id: Telegram user ID
-            user_data: User data to store in session
+            job: Job name
         """
-        self.sessions[telegram_id] = user_data
+        self._jobs.discard((telegram_id, job))
     
-    def get_session(self, telegram_id: int) -> Optional[dict]:
+    def resolve(self, telegram_id: int) -> Optional[str]:
         """
-        Get user session data.
+        Resolve the database user ID of an authenticated user in one lookup.
         
         Args:
             telegram_id: Telegram user ID
             
         Returns:
-            User session data or None if not found
-        """
-        return self.sessions.get(telegram_id)
-    
-    def update_session(self, telegram_id: int, data: dict):
-        """
-        Update user session data.
-        
-        Args:
-            telegram_id: Telegram user ID
-            data: Data to update in session
-        """
-        if telegram_id in self.sessions:
-            self.sessions[telegram_id].update(data)
-    
-    def delete_session(self, telegram_id: int):
-        """
-        Delete user session.
-        
-        Args:
-            telegram_id: Telegram user ID
-        """
-        if telegram_id in self.sessions:
-            del self.sessions[telegram_id]
+            User ID, or None if the user has no active session
+        """
+        now = time.monotonic()
+        entry = self._resolved.get(telegram_id)
+        if entry is not None and entry[1] > now:
+            self._resolved.move_to_end(telegram_id)
+            return entry[0]
+        
+        session_data = self.sessions.get(telegram_id)
+        if session_data is None:
+            self._resolved.pop(telegram_id, None)
+            return None
+        
+        user_id = session_data.get('user_id')
+        self._resolved[telegram_id] = (user_id, now + RESOLVE_CACHE_TTL)
+        self._resolved.move_to_end(telegram_id)
+        if len(self._resolved) > RESOLVE_CACHE_SIZE:
+            self._resolved.popitem(last=False)
+        return user_id
     
     def is_authenticated(self, telegram_id: int) -> bool:
         """
@@ -4,20 +4,37 @@ Provides AES-256 encryption/decryption using Fernet for sensitive data.
 """
 
 from cryptography.fernet import Fernet
+from cachetools import TTLCache
 from typing import Optional
 import base64
+import hashlib
+import threading
+
+# Decrypted values are kept in memory briefly so that reopening an entry
+# does not repeat HMAC verification and AES. The cache is bounded in both
+# size and time because it holds plaintext.
+DECRYPT_CACHE_SIZE = 512
+DECRYPT_CACHE_TTL = 120
 
 
 class EncryptionManager:
     """Handles encryption and decryption of sensitive data."""
     
-    def __init__(self, encryption_key: str):
+    def __init__(self, encryption_key: str, cipher: Optional[Fernet] = None):
         """
         Initialize encryption manager with a Fernet key.
         
         Args:
             encryption_key: Base64-encoded Fernet key (44 characters)
+            cipher: Optional already-parsed Fernet instance for the same key
         """
+        self._decrypted = TTLCache(maxsize=DECRYPT_CACHE_SIZE, ttl=DECRYPT_CACHE_TTL)
+        self._decrypted_lock = threading.Lock()
+        
+        if cipher is not None:
+            self.cipher = cipher
+            return
+        
         try:
             self.cipher = Fernet(encryption_key.encode())
         except Exception as e:
@@ -61,6 +78,87 @@ class EncryptionManager:
         except Exception as e:
             raise ValueError(f"Decryption failed: {e}")
     
+    def encrypt_many(self, plaintexts: list[str]) -> list[str]:
+        """
+        Encrypt a list of strings in one pass.
+        
+        Args:
+            plaintexts: Strings to encrypt (empty strings stay empty)
+            
+        Returns:
+            Base64-encoded encrypted strings, in the same order
+        """
+        encrypt = self.cipher.encrypt
+        try:
+            return [encrypt(p.encode('utf-8')).decode('utf-8') if p else "" for p in plaintexts]
+        except Exception as e:
+            raise ValueError(f"Encryption failed: {e}")
+    
+    def decrypt_cached(self, ciphertext: str) -> str:
+        """
+        Decrypt an encrypted string, reusing a recent result for the same ciphertext.
+        
+        Entries are keyed by a digest of the ciphertext, so an updated value
+        (which always has a new ciphertext) never returns stale plaintext.
+        
+        Args:
+            ciphertext: Base64-encoded encrypted string
+            
+        Returns:
+            Decrypted plaintext string
+        """
+        if not ciphertext:
+            return ""
+        
+        key = hashlib.blake2b(ciphertext.encode('utf-8'), digest_size=16).digest()
+        with self._decrypted_lock:
+            plaintext = self._decrypted.get(key)
+        if plaintext is not None:
+            return plaintext
+        
+        plaintext = self.decrypt(ciphertext)
+        with self._decrypted_lock:
+            self._decrypted[key] = plaintext
+        return plaintext
+    
+    def decrypt_many_cached(self, ciphertexts: list[str]) -> list[str]:
+        """
+        Decrypt a list of encrypted strings, reusing recent results per ciphertext.
+        
+        Args:
+            ciphertexts: Base64-encoded encrypted strings
+            
+        Returns:
+            Decrypted plaintext strings, in the same order
+        """
+        keys = [hashlib.blake2b(c.encode('utf-8'), digest_size=16).digest() if c else None for c in ciphertexts]
+        with self._decrypted_lock:
+            plaintexts = [self._decrypted.get(key, "") if key else "" for key in keys]
+        
+        misses = [i for i, key in enumerate(keys) if key and not plaintexts[i]]
+        if misses:
+            decrypted = self.decrypt_many([ciphertexts[i] for i in misses])
+            with self._decrypted_lock:
+                for i, plaintext in zip(misses, decrypted):
+                    plaintexts[i] = self._decrypted[keys[i]] = plaintext
+        return plaintexts
+    
+    def decrypt_many(self, ciphertexts: list[str]) -> list[str]:
+        """
+        Decrypt a list of encrypted strings in one pass.
+        
+        Args:
+            ciphertexts: Base64-encoded encrypted strings
+            
+        Returns:
+            Decrypted plaintext strings, in the same order
+        """
+        decrypt = self.cipher.decrypt
+        try:
+            return [decrypt(c.encode('utf-8')).decode('utf-8') if c else "" for c in ciphertexts]
+        except Exception as e:
+            raise ValueError(f"Decryption failed: {e}")
+    
     def encrypt_dict(self, data: dict, fields: list[str]) -> dict:
         """
         Encrypt specific fields in a dictionary.
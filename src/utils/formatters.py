@@ -3,8 +3,9 @@ QuikSafe Bot - Message Formatters
 Formats messages for clean Telegram responses.
 """
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
+from telegram import MessageEntity
 
 
 def format_password_list(passwords: List[Dict[str, Any]]) -> str:
@@ -36,7 +37,8 @@ def format_password_list(passwords: List[Dict[str, Any]]) -> str:
     return message
 
 
-def format_password_details(password: Dict[str, Any], decrypted_username: str, decrypted_password: str) -> str:
+def format_password_details(password: Dict[str, Any], decrypted_username: str, decrypted_password: str,
+                            hidden: bool = False) -> str:
     """
     Format password details for display.
     
@@ -44,6 +46,7 @@ def format_password_details(password: Dict[str, Any], decrypted_username: str, d
         password: Password entry
         decrypted_username: Decrypted username
         decrypted_password: Decrypted password
+        hidden: Mask the credentials (used once the display timeout has passed)
         
     Returns:
         Formatted message string
@@ -51,6 +54,9 @@ def format_password_details(password: Dict[str, Any], decrypted_username: str, d
     service = password.get('service_name', 'Unknown')
     tags = password.get('tags', [])
     
+    if hidden:
+        decrypted_username = decrypted_password = '••••••••'
+    
     message = f"🔐 **{service}**\n\n"
     message += f"👤 Username: `{decrypted_username}`\n"
     message += f"🔑 Password: `{decrypted_password}`\n\n"
@@ -58,7 +64,10 @@ def format_password_details(password: Dict[str, Any], decrypted_username: str, d
     if tags:
         message += f"🏷️ Tags: {', '.join(tags)}\n"
     
-    message += f"\n⚠️ This message will be deleted in 60 seconds for security."
+    if hidden:
+        message += f"\n🙈 Credentials hidden. Tap View to show them again."
+    else:
+        message += f"\n⚠️ Credentials will be hidden in 60 seconds for security."
     
     return message
 
@@ -140,6 +149,34 @@ def escape_markdown(text: str) -> str:
     return text
 
 
+def utf16_len(text: str) -> int:
+    """Length of text in UTF-16 code units, the unit of Telegram entity offsets."""
+    return len(text.encode('utf-16-le')) // 2
+
+
+def bold_entities(text: str) -> Tuple[str, List[MessageEntity]]:
+    """
+    Turn **bold** spans into plain text plus bold entities.
+    
+    Args:
+        text: Text using ** pairs for bold
+        
+    Returns:
+        Tuple of (text without markers, bold MessageEntity list)
+    """
+    parts = text.split('**')
+    plain = []
+    entities = []
+    offset = 0
+    for i, part in enumerate(parts):
+        length = utf16_len(part)
+        if i % 2 and length:
+            entities.append(MessageEntity(MessageEntity.BOLD, offset, length))
+        plain.append(part)
+        offset += length
+    return ''.join(plain), entities
+
+
 def format_task_details(task: Dict[str, Any]) -> str:
     """
     Format task details for display.
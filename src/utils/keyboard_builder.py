@@ -5,7 +5,59 @@ Utility for creating consistent, beautiful inline keyboards.
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from typing import List, Dict, Any, Optional, Tuple
+from functools import lru_cache
+import base64
 import json
+import struct
+import uuid
+
+# Callback payload layout (base64url, unpadded):
+#   action:  1 byte action id (0 = inline name: 1 byte length + UTF-8)
+#   fields:  repeated [1 byte key id (0 = inline name), 1 byte type tag, value]
+# IDs are append-only: never reorder these tuples or old buttons decode wrongly.
+CALLBACK_ACTIONS = (
+    'main_menu', 'menu_passwords', 'menu_tasks', 'menu_files', 'menu_search',
+    'menu_ai', 'menu_settings',
+    'quick_save_password', 'quick_add_task', 'quick_upload_file', 'quick_search',
+    'password_view', 'password_list', 'password_delete', 'password_edit',
+    'password_copy', 'password_save_start', 'password_search',
+    'task_view', 'task_list', 'task_delete', 'task_edit', 'task_status',
+    'task_add_start', 'task_toggle',
+    'file_view', 'file_list', 'file_delete', 'file_edit', 'file_download',
+    'file_share', 'file_upload_start',
+    'ai_tag', 'ai_summarize_tasks', 'ai_apply_tags',
+    'settings_logout', 'settings_security', 'settings_notifications',
+    'settings_autolock', 'settings_toggle_reminders', 'settings_toggle_summary',
+    'settings_changepass',
+    'wizard_skip', 'select_priority', 'select_date', 'set_priority',
+    'cancel', 'noop',
+)
+CALLBACK_KEYS = ('pid', 'tid', 'fid', 'p', 'f', 's', 'pr', 'd', 'id', 't')
+
+_ACTION_IDS = {name: i for i, name in enumerate(CALLBACK_ACTIONS, 1)}
+_KEY_IDS = {name: i for i, name in enumerate(CALLBACK_KEYS, 1)}
+
+# Long key names are shortened on encode and expanded again on decode
+_KEY_ABBREV = {
+    'password_id': 'pid',
+    'task_id': 'tid',
+    'file_id': 'fid',
+    'page': 'p',
+    'filter': 'f',
+    'status': 's',
+    'priority': 'pr',
+}
+_KEY_EXPAND = {short: full for full, short in _KEY_ABBREV.items()}
+
+# Value type tags
+_T_UUID, _T_INT, _T_STR = 1, 2, 3
+_INT = struct.Struct('<i')
+
+# Keys holding per-item IDs; payloads containing them are not memoized
+_ID_KEYS = frozenset({'pid', 'tid', 'fid', 'id'})
+
+# Pre-encoded payloads for every argument-free action (filled at the end of the module)
+CONST_CB: Dict[str, str] = {}
 
 
 class KeyboardBuilder:
@@ -56,75 +108,30 @@ class KeyboardBuilder:
     @staticmethod
     def encode_callback(action: str, **kwargs) -> str:
         """
-        Encode callback data as JSON string.
+        Encode callback data in the compact binary format.
         
         Args:
             action: Action identifier
-            **kwargs: Additional data
+            **kwargs: Additional data (UUID strings, ints or short strings)
             
         Returns:
             Encoded callback data (max 64 bytes)
         """
-        # Action abbreviations to save space
-        action_map = {
-            'password_view': 'pv',
-            'password_list': 'pl',
-            'password_delete': 'pd',
-            'password_edit': 'pe',
-            'password_copy': 'pc',
-            'password_save_start': 'pss',
-            'password_search': 'ps',
-            
-            'task_view': 'tv',
-            'task_list': 'tl',
-            'task_delete': 'td',
-            'task_edit': 'te',
-            'task_status': 'ts',
-            'task_add_start': 'tas',
-            
-            'file_view': 'fv',
-            'file_list': 'fl',
-            'file_delete': 'fd',
-            'file_edit': 'fe',
-            'file_download': 'fdown',
-            'file_share': 'fs',
-            'file_upload_start': 'fus',
-        }
-        
-        # Use abbreviation if available
-        short_action = action_map.get(action, action)
-        
-        data = {'a': short_action, **kwargs}
-        encoded = json.dumps(data, separators=(',', ':'))
-        
-        # Telegram callback data limit is 64 bytes
-        if len(encoded.encode('utf-8')) > 64:
-            # Use abbreviations for common keys
-            abbrev_map = {
-                'password_id': 'pid',
-                'task_id': 'tid',
-                'file_id': 'fid',
-                'page': 'p',
-                'filter': 'f',
-                'status': 's',
-                'priority': 'pr',
-            }
-            for old, new in abbrev_map.items():
-                if old in data:
-                    data[new] = data.pop(old)
-            
-            # Also check if keys are ALREADY abbreviated (e.g. passed as 'pid')
-            # This ensures we don't double-abbreviate or miss them
-            # No action needed as they are already short, but good to note.
-            
-            encoded = json.dumps(data, separators=(',', ':'))
+        if not kwargs and (cached := CONST_CB.get(action)) is not None:
+            return cached
         
-        return encoded[:64]  # Ensure limit
+        fields = tuple(
+            (_KEY_ABBREV.get(key, key), value)
+            for key, value in kwargs.items() if value is not None
+        )
+        if any(key in _ID_KEYS for key, _ in fields):
+            return _encode(action, fields)
+        return _encode_cached(action, fields)
     
     @staticmethod
     def decode_callback(callback_data: str) -> Dict[str, Any]:
         """
-        Decode callback data from JSON string.
+        Decode callback data (binary format, or legacy JSON from old messages).
         
         Args:
             callback_data: Encoded callback data
@@ -132,53 +139,19 @@ class KeyboardBuilder:
         Returns:
             Decoded data dictionary
         """
+        if callback_data.startswith('{'):
+            return _decode_legacy_callback(callback_data)
+        
         try:
-            data = json.loads(callback_data)
-            
-            # Expand action abbreviations
-            action_map_rev = {
-                'pv': 'password_view',
-                'pl': 'password_list',
-                'pd': 'password_delete',
-                'pe': 'password_edit',
-                'pc': 'password_copy',
-                'pss': 'password_save_start',
-                'ps': 'password_search',
-                
-                'tv': 'task_view',
-                'tl': 'task_list',
-                'td': 'task_delete',
-                'te': 'task_edit',
-                'ts': 'task_status',
-                'tas': 'task_add_start',
-                
-                'fv': 'file_view',
-                'fl': 'file_list',
-                'fd': 'file_delete',
-                'fe': 'file_edit',
-                'fdown': 'file_download',
-                'fs': 'file_share',
-                'fus': 'file_upload_start',
-            }
-            
-            if 'a' in data and data['a'] in action_map_rev:
-                data['a'] = action_map_rev[data['a']]
-            
-            # Expand key abbreviations
-            abbrev_map = {
-                'pid': 'password_id',
-                'tid': 'task_id',
-                'fid': 'file_id',
-                'p': 'page',
-                'f': 'filter',
-                's': 'status',
-                'pr': 'priority',
-            }
-            for abbrev, full in abbrev_map.items():
-                if abbrev in data:
-                    data[full] = data.pop(abbrev)
+            raw = base64.urlsafe_b64decode(callback_data + '=' * (-len(callback_data) % 4))
+            action, pos = _unpack_name(raw, 0, CALLBACK_ACTIONS)
+            data = {'a': action}
+            while pos < len(raw):
+                key, pos = _unpack_name(raw, pos, CALLBACK_KEYS)
+                value, pos = _unpack_value(raw, pos)
+                data[_KEY_EXPAND.get(key, key)] = value
             return data
-        except json.JSONDecodeError:
+        except Exception:
             return {'a': 'error'}
     
     @classmethod
@@ -188,31 +161,31 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['password']} Passwords",
-                    callback_data=cls.encode_callback('menu_passwords')
+                    callback_data=CONST_CB['menu_passwords']
                 ),
                 InlineKeyboardButton(
                     f"{cls.EMOJI['task']} Tasks",
-                    callback_data=cls.encode_callback('menu_tasks')
+                    callback_data=CONST_CB['menu_tasks']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['file']} Files",
-                    callback_data=cls.encode_callback('menu_files')
+                    callback_data=CONST_CB['menu_files']
                 ),
                 InlineKeyboardButton(
                     f"{cls.EMOJI['search']} Search",
-                    callback_data=cls.encode_callback('menu_search')
+                    callback_data=CONST_CB['menu_search']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['ai']} AI Assistant",
-                    callback_data=cls.encode_callback('menu_ai')
+                    callback_data=CONST_CB['menu_ai']
                 ),
                 InlineKeyboardButton(
                     f"{cls.EMOJI['settings']} Settings",
-                    callback_data=cls.encode_callback('menu_settings')
+                    callback_data=CONST_CB['menu_settings']
                 ),
             ],
         ]
@@ -225,31 +198,31 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['add']} Save Password",
-                    callback_data=cls.encode_callback('quick_save_password')
+                    callback_data=CONST_CB['quick_save_password']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['add']} Add Task",
-                    callback_data=cls.encode_callback('quick_add_task')
+                    callback_data=CONST_CB['quick_add_task']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['upload']} Upload File",
-                    callback_data=cls.encode_callback('quick_upload_file')
+                    callback_data=CONST_CB['quick_upload_file']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['search']} Smart Search",
-                    callback_data=cls.encode_callback('quick_search')
+                    callback_data=CONST_CB['quick_search']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['home']} Main Menu",
-                    callback_data=cls.encode_callback('main_menu')
+                    callback_data=CONST_CB['main_menu']
                 ),
             ],
         ]
@@ -262,7 +235,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['add']} Save New Password",
-                    callback_data=cls.encode_callback('password_save_start')
+                    callback_data=CONST_CB['password_save_start']
                 ),
             ],
             [
@@ -274,13 +247,13 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['search']} Search Passwords",
-                    callback_data=cls.encode_callback('password_search')
+                    callback_data=CONST_CB['password_search']
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['back']} Back to Main Menu",
-                    callback_data=cls.encode_callback('main_menu')
+                    callback_data=CONST_CB['main_menu']
                 ),
             ],
         ]
@@ -293,7 +266,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['add']} Add New Task",
-                    callback_data=cls.encode_callback('task_add_start')
+                    callback_data=CONST_CB['task_add_start']
                 ),
             ],
             [
@@ -319,7 +292,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['back']} Back to Main Menu",
-                    callback_data=cls.encode_callback('main_menu')
+                    callback_data=CONST_CB['main_menu']
                 ),
             ],
         ]
@@ -332,7 +305,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['upload']} Upload File",
-                    callback_data=cls.encode_callback('file_upload_start')
+                    callback_data=CONST_CB['file_upload_start']
                 ),
             ],
             [
@@ -364,7 +337,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['back']} Back to Main Menu",
-                    callback_data=cls.encode_callback('main_menu')
+                    callback_data=CONST_CB['main_menu']
                 ),
             ],
         ]
@@ -439,15 +412,15 @@ class KeyboardBuilder:
         keyboard.append([
             InlineKeyboardButton(
                 f"{cls.EMOJI['back']} Back to Tasks",
-                callback_data=cls.encode_callback('menu_tasks')
+                callback_data=CONST_CB['menu_tasks']
             ),
         ])
         
         return InlineKeyboardMarkup(keyboard)
     
     @classmethod
-    def file_actions(cls, file_id: str) -> InlineKeyboardMarkup:
-        """Create action buttons for a file entry."""
+    def file_actions(cls, file_id: str, page: int = 0, type_filter: Optional[str] = None) -> InlineKeyboardMarkup:
+        """Create action buttons for a file entry (page and type_filter describe the list it was opened from)."""
         keyboard = [
             [
                 InlineKeyboardButton(
@@ -466,13 +439,13 @@ class KeyboardBuilder:
                 ),
                 InlineKeyboardButton(
                     f"{cls.EMOJI['delete']} Delete",
-                    callback_data=cls.encode_callback('file_delete', fid=file_id)
+                    callback_data=cls.encode_callback('file_delete', fid=file_id, p=page, f=type_filter)
                 ),
             ],
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['back']} Back to Files",
-                    callback_data=cls.encode_callback('menu_files')
+                    callback_data=CONST_CB['menu_files']
                 ),
             ],
         ]
@@ -503,7 +476,7 @@ class KeyboardBuilder:
         # Page indicator
         buttons.append(InlineKeyboardButton(
             f"📄 {current_page + 1}/{total_pages}",
-            callback_data=cls.encode_callback('noop')
+            callback_data=CONST_CB['noop']
         ))
         
         if current_page < total_pages - 1:
@@ -535,7 +508,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['cancel']} Cancel",
-                    callback_data=cls.encode_callback('cancel')
+                    callback_data=CONST_CB['cancel']
                 ),
             ],
         ]
@@ -578,7 +551,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['cancel']} Cancel",
-                    callback_data=cls.encode_callback('cancel')
+                    callback_data=CONST_CB['cancel']
                 ),
             ],
         ]
@@ -597,7 +570,7 @@ class KeyboardBuilder:
             [
                 InlineKeyboardButton(
                     f"{cls.EMOJI['cancel']} No, Cancel",
-                    callback_data=cls.encode_callback('cancel')
+                    callback_data=CONST_CB['cancel']
                 ),
             ],
         ]
@@ -615,3 +588,126 @@ class KeyboardBuilder:
             ],
         ]
         return InlineKeyboardMarkup(keyboard)
+
+
+# ==================== Callback Encoding Helpers ====================
+
+def _encode(action: str, fields: Tuple[Tuple[str, Any], ...]) -> str:
+    """Encode an action and its (short key, value) fields."""
+    buf = bytearray()
+    _pack_name(buf, action, _ACTION_IDS)
+    for key, value in fields:
+        _pack_name(buf, key, _KEY_IDS)
+        _pack_value(buf, value)
+    
+    # Telegram callback data limit is 64 bytes
+    return base64.urlsafe_b64encode(bytes(buf)).rstrip(b'=').decode('ascii')[:64]
+
+
+# Static-ish payloads (pages, filters, statuses) come from a small keyspace
+_encode_cached = lru_cache(maxsize=2048)(_encode)
+
+
+def _pack_name(buf: bytearray, name: str, ids: Dict[str, int]):
+    """Append a table id, or 0 followed by the length-prefixed name."""
+    name_id = ids.get(name)
+    if name_id is not None:
+        buf.append(name_id)
+    else:
+        raw = name.encode('utf-8')
+        buf.append(0)
+        buf.append(len(raw))
+        buf += raw
+
+
+def _unpack_name(raw: bytes, pos: int, names: Tuple[str, ...]) -> Tuple[str, int]:
+    """Read a name written by _pack_name; returns (name, next position)."""
+    name_id = raw[pos]
+    if name_id:
+        return names[name_id - 1], pos + 1
+    length = raw[pos + 1]
+    return raw[pos + 2:pos + 2 + length].decode('utf-8'), pos + 2 + length
+
+
+def _pack_value(buf: bytearray, value: Any):
+    """Append a type-tagged value; canonical UUID strings pack to 16 bytes."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        buf.append(_T_INT)
+        buf += _INT.pack(value)
+        return
+    
+    text = str(value)
+    try:
+        parsed = uuid.UUID(text)
+    except ValueError:
+        parsed = None
+    
+    if parsed is not None and str(parsed) == text:
+        buf.append(_T_UUID)
+        buf += parsed.bytes
+    else:
+        raw = text.encode('utf-8')
+        buf.append(_T_STR)
+        buf.append(len(raw))
+        buf += raw
+
+
+def _unpack_value(raw: bytes, pos: int) -> Tuple[Any, int]:
+    """Read a value written by _pack_value; returns (value, next position)."""
+    tag = raw[pos]
+    pos += 1
+    if tag == _T_UUID:
+        return str(uuid.UUID(bytes=raw[pos:pos + 16])), pos + 16
+    if tag == _T_INT:
+        return _INT.unpack_from(raw, pos)[0], pos + _INT.size
+    length = raw[pos]
+    return raw[pos + 1:pos + 1 + length].decode('utf-8'), pos + 1 + length
+
+
+# Action abbreviations used by the legacy JSON callback format
+_LEGACY_ACTIONS = {
+    'pv': 'password_view',
+    'pl': 'password_list',
+    'pd': 'password_delete',
+    'pe': 'password_edit',
+    'pc': 'password_copy',
+    'pss': 'password_save_start',
+    'ps': 'password_search',
+    
+    'tv': 'task_view',
+    'tl': 'task_list',
+    'td': 'task_delete',
+    'te': 'task_edit',
+    'ts': 'task_status',
+    'tas': 'task_add_start',
+    
+    'fv': 'file_view',
+    'fl': 'file_list',
+    'fd': 'file_delete',
+    'fe': 'file_edit',
+    'fdown': 'file_download',
+    'fs': 'file_share',
+    'fus': 'file_upload_start',
+}
+
+
+def _decode_legacy_callback(callback_data: str) -> Dict[str, Any]:
+    """Decode JSON callback data from buttons sent before the binary format."""
+    try:
+        data = json.loads(callback_data)
+    except json.JSONDecodeError:
+        return {'a': 'error'}
+    
+    if 'a' in data and data['a'] in _LEGACY_ACTIONS:
+        data['a'] = _LEGACY_ACTIONS[data['a']]
+    
+    for abbrev, full in _KEY_EXPAND.items():
+        if abbrev in data:
+            data[full] = data.pop(abbrev)
+    return data
+
+
+CONST_CB.update({action: _encode(action, ()) for action in CALLBACK_ACTIONS})
+
+# Shared instance used by all handlers
+KB = KeyboardBuilder()
@@ -138,6 +138,13 @@ class SceneManager:
                 'confirm'
             ],
             
+            # Change master password wizard
+            'change_password': [
+                'current_password',
+                'new_password',
+                'confirm_password'
+            ],
+            
 
         }
     
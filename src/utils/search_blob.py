@@ -0,0 +1,63 @@
+"""
+QuikSafe Bot - Search Blobs
+Precomputed lowercased text used for local substring search.
+"""
+
+from typing import Any, Dict, List
+
+BLOB_KEY = '_search_blob'
+
+
+def build_search_blob(item: Dict[str, Any], item_type: str) -> str:
+    """
+    Build the lowercased searchable text for an item.
+    
+    Args:
+        item: Item dictionary
+        item_type: Type of item (passwords, tasks, files)
+        
+    Returns:
+        Lowercased searchable text
+    """
+    if item_type == "passwords":
+        text = f"{item.get('service_name', '')} {' '.join(item.get('tags') or [])}"
+    elif item_type == "tasks":
+        text = f"{item.get('encrypted_content', '')} {' '.join(item.get('tags') or [])}"
+    elif item_type == "files":
+        text = f"{item.get('file_name', '')} {item.get('file_type', '')}"
+    else:
+        text = ""
+    return text.lower()
+
+
+def attach_search_blobs(items: List[Dict[str, Any]], item_type: str) -> List[Dict[str, Any]]:
+    """
+    Cache the search blob on each item in place.
+    
+    Args:
+        items: Item dictionaries
+        item_type: Type of items (passwords, tasks, files)
+        
+    Returns:
+        The same list, for chaining
+    """
+    for item in items:
+        item[BLOB_KEY] = build_search_blob(item, item_type)
+    return items
+
+
+def get_search_blob(item: Dict[str, Any], item_type: str) -> str:
+    """
+    Get an item's search blob, building and caching it on first use.
+    
+    Args:
+        item: Item dictionary
+        item_type: Type of item (passwords, tasks, files)
+        
+    Returns:
+        Lowercased searchable text
+    """
+    blob = item.get(BLOB_KEY)
+    if blob is None:
+        blob = item[BLOB_KEY] = build_search_blob(item, item_type)
+    return blob
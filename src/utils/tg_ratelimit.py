@@ -0,0 +1,171 @@
+"""
+QuikSafe Bot - Telegram Rate Limiting
+Paces outgoing message edits to stay under Telegram's flood limits and
+skips edits that would not change the message.
+"""
+
+from typing import Optional
+from collections import OrderedDict
+from datetime import timedelta
+from cachetools import TTLCache
+from telegram.error import RetryAfter
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Telegram allows ~30 messages/sec overall; keep a little headroom
+GLOBAL_RATE = 28.0
+GLOBAL_BURST = 28
+
+# Per-chat pacing: sustained 1 edit/sec with room for a burst of button taps
+CHAT_RATE = 1.0
+CHAT_BURST = 20
+
+
+class TokenBucket:
+    """Async token bucket."""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Initialize token bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of stored tokens
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ChatRateLimiter:
+    """Global token bucket plus one bucket per chat."""
+
+    def __init__(self, rate: float = CHAT_RATE, burst: int = CHAT_BURST,
+                 global_rate: float = GLOBAL_RATE, global_burst: int = GLOBAL_BURST):
+        """
+        Initialize rate limiter.
+
+        Args:
+            rate: Sustained edits per second per chat
+            burst: Burst size per chat
+            global_rate: Sustained edits per second across all chats
+            global_burst: Global burst size
+        """
+        self.rate = rate
+        self.burst = burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        # Idle chats expire; a recreated bucket simply starts full
+        self._chats = TTLCache(maxsize=10_000, ttl=600)
+        # Chats Telegram told us to back off from, mapped to when the ban ends
+        self._penalties = TTLCache(maxsize=10_000, ttl=600)
+
+    async def acquire(self, chat_id: Optional[int]):
+        """
+        Wait until both the chat and the global budget allow a request.
+
+        Args:
+            chat_id: Telegram chat ID, or None for inline messages
+        """
+        if chat_id is not None:
+            until = self._penalties.get(chat_id)
+            if until is not None:
+                delay = until - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self._penalties.pop(chat_id, None)
+
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                bucket = self._chats[chat_id] = TokenBucket(self.rate, self.burst)
+            await bucket.acquire()
+        await self.global_bucket.acquire()
+
+    def penalize(self, chat_id: Optional[int], seconds: float):
+        """
+        Hold back further requests for a chat after a flood-control error.
+
+        Args:
+            chat_id: Telegram chat ID, or None for inline messages
+            seconds: Back-off reported by Telegram
+        """
+        if chat_id is not None:
+            self._penalties[chat_id] = time.monotonic() + seconds
+
+
+limiter = ChatRateLimiter()
+
+# IDs of callback queries that already edited their message; once edited,
+# query.message no longer reflects what the user sees
+_EDITED_QUERIES_MAX = 8192
+_edited_queries = OrderedDict()
+
+
+def _is_unchanged(query, text: str, kwargs: dict) -> bool:
+    """Whether an edit would leave the query's message exactly as it is."""
+    message = query.message
+    if getattr(message, 'text', None) is None or kwargs.get('parse_mode') or query.id in _edited_queries:
+        return False  # Inaccessible/media message, unknown Markdown output, or already edited
+    return (
+        message.text == text
+        and tuple(message.entities) == tuple(kwargs.get('entities') or ())
+        and message.reply_markup == kwargs.get('reply_markup')
+    )
+
+
+async def safe_edit(query, text: str, **kwargs):
+    """
+    Edit a callback query's message once the rate limiter allows it.
+
+    Edits that would not change the message (e.g. a double tap on the same
+    button) are skipped instead of costing a round trip that Telegram rejects
+    with "message is not modified". If Telegram still answers with RetryAfter,
+    the chat is held back for the reported time and the edit is retried once.
+
+    Args:
+        query: Telegram CallbackQuery
+        text: New message text
+        **kwargs: Keyword arguments for edit_message_text
+
+    Returns:
+        Result of edit_message_text, or None if the edit was skipped
+    """
+    if _is_unchanged(query, text, kwargs):
+        logger.debug("Skipping edit: message is not modified")
+        return None
+
+    chat_id = query.message.chat.id if query.message else None
+    await limiter.acquire(chat_id)
+    try:
+        result = await query.edit_message_text(text, **kwargs)
+    except RetryAfter as e:
+        # Flood control hit anyway: back off this chat and retry once
+        retry_after = e.retry_after
+        if isinstance(retry_after, timedelta):
+            retry_after = retry_after.total_seconds()
+        logger.warning(f"Flood control on chat {chat_id}, retrying in {retry_after}s")
+        limiter.penalize(chat_id, retry_after)
+        await limiter.acquire(chat_id)
+        result = await query.edit_message_text(text, **kwargs)
+
+    _edited_queries[query.id] = None
+    if len(_edited_queries) > _EDITED_QUERIES_MAX:
+        _edited_queries.popitem(last=False)
+    return result
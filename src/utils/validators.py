@@ -7,6 +7,11 @@ import re
 from typing import Tuple, Optional
 from datetime import datetime
 
+_HASHTAG_RE = re.compile(r'#(\w+)')
+_UPPERCASE_RE = re.compile(r'[A-Z]')
+_DIGIT_RE = re.compile(r'[0-9]')
+_SPECIAL_CHAR_RE = re.compile(r'[!@#$%^&*(),.?":{}|<>]')
+
 
 def validate_service_name(service_name: str) -> Tuple[bool, Optional[str]]:
     """
@@ -92,17 +97,17 @@ def check_password_strength(password: str) -> Tuple[int, str]:
         feedback.append("Too short")
         
     # Complexity checks
-    if re.search(r'[A-Z]', password):
+    if _UPPERCASE_RE.search(password):
         score += 1
     else:
         feedback.append("No uppercase")
         
-    if re.search(r'[0-9]', password):
+    if _DIGIT_RE.search(password):
         score += 1
     else:
         feedback.append("No numbers")
         
-    if re.search(r'[!@#$%^&*(),.?":{}|<>]', password):
+    if _SPECIAL_CHAR_RE.search(password):
         score += 1
     else:
         feedback.append("No special chars")
@@ -267,10 +272,14 @@ def parse_tags_from_text(text: str) -> list:
     Returns:
         List of parsed tags
     """
+    # Plain captions have neither hashtags nor commas
+    if '#' not in text and ',' not in text:
+        return []
+    
     tags = []
     
     # Extract hashtags
-    hashtags = re.findall(r'#(\w+)', text)
+    hashtags = _HASHTAG_RE.findall(text)
     tags.extend(hashtags)
     
     # If no hashtags, try comma-separated